@@ -0,0 +1,61 @@
+"""
+ad_catalog.py
+Règles de fusion du catalogue de publicités (une publicité par ad_id)
+
+Une même publicité apparaît dans plusieurs scrapings (pays, dates,
+termes de recherche). Le catalogue en garde une seule version, mise à
+jour à chaque enregistrement de publicités (cf. storage ; avec Supabase,
+les mêmes règles sont appliquées par la base, migrations/009) :
+- les champs vides ('N/A', '', None) sont complétés par les valeurs
+  trouvées ensuite
+- scraped_at garde la date de scraping la plus récente
+
+La vue globale de l'historique et ses exports lisent directement le
+catalogue : plus de fusion de toutes les publicités à chaque affichage.
+"""
+
+EMPTY_VALUES = ('N/A', '', None)
+
+
+def catalog_key(ad):
+    """Clé du catalogue (None : publicité sans identifiant, ignorée)"""
+    ad_id = ad.get('ad_id')
+    if not ad_id or ad_id == 'N/A':
+        return None
+    return str(ad_id)
+
+
+def merge_ad(existing, ad):
+    """Fusionne ad dans existing (modifié sur place) ; retourne existing"""
+    for key, value in ad.items():
+        if existing.get(key) in EMPTY_VALUES and value not in EMPTY_VALUES:
+            existing[key] = value
+
+    # Garder la date de scraping la plus récente
+    if (ad.get('scraped_at') or '') > (existing.get('scraped_at') or ''):
+        existing['scraped_at'] = ad['scraped_at']
+    return existing
+
+
+def merge_ads(ads, catalog=None):
+    """
+    Fusionne des publicités dans un catalogue {ad_id: publicité}
+
+    Args:
+        ads: publicités dans l'ordre d'enregistrement (doublons possibles)
+        catalog: versions déjà connues, complétées sur place (nouveau dict si None)
+
+    Returns:
+        Le catalogue
+    """
+    if catalog is None:
+        catalog = {}
+    for ad in ads:
+        key = catalog_key(ad)
+        if key is None:
+            continue
+        if key in catalog:
+            merge_ad(catalog[key], ad)
+        else:
+            catalog[key] = dict(ad)
+    return catalog
@@ -0,0 +1,52 @@
+"""
+ad_search.py
+Recherche plein texte dans les publicités (annonceur, texte, CTA, page ID...)
+
+La recherche passe par un index plein texte tenu à jour à l'enregistrement
+des publicités : FTS5 pour le stockage SQLite, tsvector pour Supabase
+(cf. migrations/005_ads_search.sql). Ce module traduit la saisie de
+l'utilisateur dans la syntaxe de chacun :
+- minuscules et sans accents ("Café" trouve "cafe" et inversement)
+- chaque mot est un préfixe ("caf" trouve "café", "cafeteria")
+- tous les mots doivent être présents, dans n'importe quel ordre
+- résultats classés par pertinence
+"""
+
+import re
+
+from page_matcher import fold_text
+
+# Champs indexés
+AD_SEARCH_FIELDS = ('advertiser', 'page_id', 'country', 'text', 'cta_text', 'search_term')
+
+# Mots : lettres et chiffres (apostrophes, tirets, '_'... séparent les mots,
+# comme dans les deux index)
+_WORD = re.compile(r'[^\W_]+')
+
+
+def search_terms(search):
+    """Mots recherchés, en minuscules sans accents"""
+    return _WORD.findall(fold_text(search))
+
+
+def fts5_query(search):
+    """Requête FTS5 (None si la saisie ne contient aucun mot)"""
+    terms = search_terms(search)
+    return ' AND '.join(f'"{term}"*' for term in terms) or None
+
+
+def tsquery(search):
+    """Requête to_tsquery PostgreSQL (None si la saisie ne contient aucun mot)"""
+    terms = search_terms(search)
+    return ' & '.join(f'{term}:*' for term in terms) or None
+
+
+def search_document(ad):
+    """Texte indexé d'une publicité"""
+    return ' '.join(str(ad.get(field) or '') for field in AD_SEARCH_FIELDS)
+
+
+def matches(ad, search):
+    """Même règle que les index, pour les publicités hors base (anciens résultats JSON)"""
+    words = search_terms(search_document(ad))
+    return all(any(word.startswith(term) for word in words) for term in search_terms(search))
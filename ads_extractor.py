@@ -0,0 +1,395 @@
+"""
+ads_extractor.py
+Moteur d'extraction des publicités de la Facebook Ads Library
+
+Au lieu de parcourir toutes les <div> de la page et de lire leur innerText
+(coût quadratique avec l'imbrication), on repère chaque marqueur
+"ID dans la bibliothèque / Library ID" une seule fois, on remonte jusqu'à
+la racine de la carte et on lit le texte de la carte une seule fois.
+
+Le script est une bibliothèque versionnée, installée une fois par page et
+partagée par FacebookAdsLibraryScraper et CompetitiveIntelligenceScraper
+(API async). Deux modes :
+- extraction de toute la page (mode 'full', utilisé par benchmarks.py)
+- cartes apparues depuis l'appel précédent (drain_ads)
+"""
+
+import json
+
+# ============================================
+# FRAGMENTS JS PARTAGÉS
+# ============================================
+
+# Champs d'une publicité, dans l'ordre : objet construit par parseCard,
+# décodage réseau (ads_network.py) et colonnes des exports (exports.py)
+AD_FIELDS = (
+    'ad_id', 'page_id', 'advertiser', 'country', 'ad_status', 'search_term',
+    'text', 'start_date', 'platforms', 'media_type', 'media_url',
+    'cta_text', 'cta_url', 'ad_library_url', 'scraped_at',
+)
+
+# Repérage des marqueurs, racine de carte et lecture d'une carte.
+_SHARED_JS = r'''
+    const AD_FIELDS = __AD_FIELDS__;
+    const MARKERS = ['ID dans la bibliothèque', 'Library ID'];
+    const ID_RE = /(?:ID dans la bibliothèque|Library ID)[\s:]*([0-9]+)/i;
+
+    const CTA_KEYWORDS = [
+        'en savoir plus', 'commander', 'acheter', 'réserver',
+        'télécharger', 'essayer', 'découvrir', 'profiter',
+        'voir plus', "s'inscrire", 'obtenir', 'contacter',
+        'shop now', 'learn more', 'buy now', 'sign up',
+        'get', 'download', 'book', 'order'
+    ];
+
+    // Nœuds texte contenant un marqueur sous `root` (aucun calcul de layout)
+    const findMarkers = (root, skipIds) => {
+        const found = [];
+        const walker = document.createTreeWalker(root, NodeFilter.SHOW_TEXT, {
+            acceptNode: (node) => {
+                const value = node.nodeValue;
+                return value && MARKERS.some(m => value.includes(m))
+                    ? NodeFilter.FILTER_ACCEPT
+                    : NodeFilter.FILTER_REJECT;
+            }
+        });
+        let textNode;
+        while ((textNode = walker.nextNode())) {
+            let el = textNode.parentElement;
+            let match = null;
+            // L'ID peut être dans un nœud voisin : on remonte de deux niveaux au plus
+            for (let i = 0; el && i < 3 && !match; i++) {
+                match = (el.textContent || '').match(ID_RE);
+                if (!match) el = el.parentElement;
+            }
+            if (!match || skipIds.has(match[1])) continue;
+            skipIds.add(match[1]);
+            found.push({ adId: match[1], el: el });
+        }
+        return found;
+    };
+
+    // Incrémente le nombre de marqueurs contenus par chaque ancêtre
+    const countMarker = (counts, el) => {
+        for (let node = el; node && node !== document.body; node = node.parentElement) {
+            counts.set(node, (counts.get(node) || 0) + 1);
+        }
+    };
+
+    // Une carte porte le lien de l'annonceur et la mention "Sponsorisé"
+    const looksLikeCard = (node) =>
+        !!node.querySelector('a[href*="facebook.com/"]') &&
+        /Sponsoris|Sponsored/.test(node.textContent || '');
+
+    // Racine de carte = premier ancêtre qui ressemble à une carte. La remontée
+    // ne franchit jamais un ancêtre contenant un autre marqueur et s'arrête
+    // après MAX_CARD_DEPTH niveaux : une carte seule dans son conteneur ne
+    // doit pas devenir le fil entier (ni document.body).
+    const MAX_CARD_DEPTH = 12;
+    const cardRoot = (counts, el) => {
+        let root = el;
+        for (let depth = 0; depth < MAX_CARD_DEPTH && !looksLikeCard(root); depth++) {
+            const parent = root.parentElement;
+            if (!parent || parent === document.body || counts.get(parent) !== 1) break;
+            root = parent;
+        }
+        return root;
+    };
+
+    const parseCard = (card, adId, opts) => {
+        const text = card.innerText || '';
+
+        // Annonceur et ID de la page
+        let advertiser = 'N/A';
+        let pageId = 'N/A';
+        for (const link of card.querySelectorAll('a[href*="facebook.com/"]')) {
+            const linkText = link.innerText.trim();
+            if (linkText && !linkText.includes('Sponsorisé') &&
+                !linkText.includes('Sponsored') &&
+                linkText.length < 100 && linkText.length > 2) {
+                advertiser = linkText;
+                const pageIdMatch = link.href.match(/facebook\.com\/(\d+)/);
+                if (pageIdMatch) {
+                    pageId = pageIdMatch[1];
+                }
+                break;
+            }
+        }
+
+        // Statut (par défaut, une pub trouvée sur la page est active)
+        const statusText = text.toLowerCase();
+        const adStatus = (statusText.includes('inactive') || statusText.includes('plus diffusée'))
+            ? 'Inactive'
+            : 'Active';
+
+        // Date de début
+        let startDate = 'N/A';
+        const dateMatch = text.match(/Début de la diffusion le ([^·]+)/i) ||
+                          text.match(/Started running on ([^·]+)/i) ||
+                          text.match(/(\d{1,2}\s+[a-zéû]+\s+\d{4})/i);
+        if (dateMatch) {
+            startDate = dateMatch[1].trim();
+        }
+
+        // Plateformes
+        const platforms = (text.includes('Plateformes') || text.includes('Platforms'))
+            ? 'Multiple'
+            : 'N/A';
+
+        // Texte de la pub
+        let adText = 'N/A';
+        const sponsoredIndex = text.indexOf('Sponsorisé');
+        if (sponsoredIndex !== -1) {
+            const lines = text.substring(sponsoredIndex + 10).split('\n')
+                .filter(l => l.trim().length > 20);
+            if (lines.length > 0) {
+                adText = lines[0].substring(0, 500);
+            }
+        }
+
+        // Média : vidéo en priorité, sinon la plus grande image (créative, pas logo)
+        let mediaUrl = 'N/A';
+        let mediaType = 'N/A';
+        const video = card.querySelector('video[src]');
+        if (video) {
+            mediaUrl = video.src;
+            mediaType = 'video';
+        } else {
+            // Images non chargées (politique de ressources) : dimensions issues des
+            // attributs ou de la mise en page ; à défaut, dernière image de la carte
+            // (le logo de l'annonceur précède la créative)
+            let maxSize = 0;
+            let lastUnsized = null;
+            for (const img of card.querySelectorAll('img[src*="scontent"]')) {
+                const width = img.naturalWidth || img.width || 0;
+                const height = img.naturalHeight || img.height || 0;
+                if (width * height > maxSize && width > 100 && height > 100) {
+                    maxSize = width * height;
+                    mediaUrl = img.src;
+                    mediaType = 'image';
+                } else if (!img.complete || !img.naturalWidth) {
+                    if (!width || !height) lastUnsized = img;
+                }
+            }
+            if (mediaType === 'N/A' && lastUnsized) {
+                mediaUrl = lastUnsized.src;
+                mediaType = 'image';
+            }
+        }
+
+        // CTA
+        let ctaUrl = 'N/A';
+        let ctaText = 'N/A';
+        for (const link of card.querySelectorAll('a[href*="l.facebook.com"], a[role="button"]')) {
+            const linkText = link.innerText.trim();
+            if (!linkText || linkText.length >= 50 || linkText.length <= 2) continue;
+            const lowerText = linkText.toLowerCase();
+            if (CTA_KEYWORDS.some(keyword => lowerText.includes(keyword))) {
+                ctaText = linkText;
+                if (link.href && link.href.includes('l.facebook.com')) {
+                    ctaUrl = link.href;
+                }
+                break;
+            }
+        }
+
+        const values = {
+            ad_id: adId,
+            page_id: pageId,
+            advertiser: advertiser,
+            country: opts.country || window.location.href.match(/country=([A-Z]+)/)?.[1] || 'ALL',
+            ad_status: adStatus,
+            search_term: opts.searchTerm || new URLSearchParams(window.location.search).get('q') || 'N/A',
+            text: adText.trim(),
+            start_date: startDate,
+            platforms: platforms,
+            media_type: mediaType,
+            media_url: mediaUrl,
+            cta_text: ctaText,
+            cta_url: ctaUrl,
+            ad_library_url: `https://www.facebook.com/ads/library/?id=${adId}`,
+            scraped_at: new Date().toISOString()
+        };
+        // Champs et ordre fixés par AD_FIELDS (Python)
+        return Object.fromEntries(AD_FIELDS.map((field) => [field, values[field]]));
+    };
+'''.replace('__AD_FIELDS__', json.dumps(list(AD_FIELDS)))
+
+
+# ============================================
+# BIBLIOTHÈQUE INSTALLÉE DANS LA PAGE
+# ============================================
+
+# À incrémenter à chaque modification du JS : une page qui porte une version
+# plus ancienne (init script d'une navigation précédente) est réinstallée.
+EXTRACTOR_VERSION = 7
+
+# Installée une seule fois par page (add_init_script) au lieu d'envoyer et de
+# recompiler tout le script à chaque itération. Point d'entrée unique :
+#   window.__adsExtract({mode: 'full' | 'drain', country, searchTerm, seen})
+# - 'full'  : extraction de toutes les cartes présentes
+# - 'drain' : cartes apparues depuis l'appel précédent ; au premier appel,
+#             la page est parcourue une fois puis un MutationObserver
+#             met les nouvelles cartes en attente (coût proportionnel aux
+#             nouvelles cartes)
+# Dans les deux modes, seules les publicités jamais vues sont renvoyées :
+# la page garde l'ensemble des IDs déjà transmis, complété par `seen`
+# (IDs obtenus par d'autres voies, ex. capture réseau). Les cartes connues
+# sont écartées avant d'être lues et ne transitent plus par CDP.
+# window.__adsLib.signals() expose deux compteurs croissants utilisés par
+# les attentes adaptatives (pacing.WaitController) : cartes apparues dans
+# la page et réponses GraphQL terminées.
+EXTRACTOR_LIBRARY_JS = '(() => {' + _SHARED_JS + r'''
+    const VERSION = __VERSION__;
+    if (window.top !== window) return;
+    if (window.__adsLib && window.__adsLib.version >= VERSION) return;
+
+    const state = {
+        counts: new WeakMap(), counted: new WeakSet(), knownIds: new Set(), pending: [], observer: null,
+        registered: 0, feedResponses: 0
+    };
+
+    // Réponses du fil (GraphQL) terminées, vues depuis la page
+    try {
+        new PerformanceObserver((list) => {
+            for (const entry of list.getEntries()) {
+                if (entry.name.includes('/api/graphql')) state.feedResponses++;
+            }
+        }).observe({ type: 'resource', buffered: true });
+    } catch (e) {}
+
+    const markSeen = (ids) => {
+        for (const id of ids || []) state.knownIds.add(String(id));
+    };
+
+    const extractAll = (opts) => {
+        // Les marqueurs connus servent au comptage (racines de cartes) mais ne sont pas relus
+        const markers = findMarkers(document.body, new Set());
+        const counts = new Map();
+        markers.forEach(m => countMarker(counts, m.el));
+        const ads = [];
+        for (const m of markers) {
+            if (state.knownIds.has(m.adId)) continue;
+            state.knownIds.add(m.adId);
+            ads.push(parseCard(cardRoot(counts, m.el), m.adId, opts));
+        }
+        return ads;
+    };
+
+    const register = (root) => {
+        // Comme extractAll : tous les marqueurs comptent pour les racines de
+        // cartes (une carte connue voisine ne doit pas être englobée), seuls
+        // les nouveaux sont mis en attente
+        for (const m of findMarkers(root, new Set())) {
+            if (!state.counted.has(m.el)) {
+                state.counted.add(m.el);
+                countMarker(state.counts, m.el);
+            }
+            if (state.knownIds.has(m.adId)) continue;
+            state.knownIds.add(m.adId);
+            state.pending.push(m);
+            state.registered++;
+        }
+    };
+
+    const startObserver = () => {
+        register(document.body);
+        state.observer = new MutationObserver((records) => {
+            for (const record of records) {
+                for (const node of record.addedNodes) {
+                    if (node.nodeType === Node.ELEMENT_NODE) {
+                        register(node);
+                    } else if (node.nodeType === Node.TEXT_NODE && node.parentElement) {
+                        register(node.parentElement);
+                    }
+                }
+            }
+        });
+        state.observer.observe(document.body, { childList: true, subtree: true });
+    };
+
+    const drain = (opts) => {
+        if (!state.observer) startObserver();
+        const batch = state.pending;
+        state.pending = [];
+        const ads = [];
+        for (const m of batch) {
+            if (!m.el.isConnected) {
+                // Carte retirée avant lecture (virtualisation) : elle pourra être revue
+                state.knownIds.delete(m.adId);
+                continue;
+            }
+            ads.push(parseCard(cardRoot(state.counts, m.el), m.adId, opts));
+        }
+        return ads;
+    };
+
+    const signals = () => {
+        if (!state.observer && document.body) startObserver();
+        return { cards: state.registered, feed: state.feedResponses };
+    };
+
+    if (window.__adsLib && window.__adsLib.observer) {
+        window.__adsLib.observer.disconnect();
+    }
+    window.__adsLib = {
+        version: VERSION,
+        extractAll: extractAll,
+        drain: drain,
+        markSeen: markSeen,
+        forget: () => state.knownIds.clear(),
+        signals: signals,
+        get observer() { return state.observer; }
+    };
+    window.__adsExtract = (opts) => {
+        opts = opts || {};
+        markSeen(opts.seen);
+        return opts.mode === 'drain' ? drain(opts) : extractAll(opts);
+    };
+})()'''.replace('__VERSION__', str(EXTRACTOR_VERSION))
+
+# Appel minimal envoyé à chaque itération
+CALL_JS = "(opts) => window.__adsExtract ? window.__adsExtract(opts) : null"
+
+# Signaux de progression de la page (None si la bibliothèque est absente)
+SIGNALS_JS = "() => window.__adsLib && window.__adsLib.signals ? window.__adsLib.signals() : null"
+
+# Vrai dès qu'une carte est apparue ou qu'une réponse du fil est arrivée depuis `base`
+SIGNAL_CHANGED_JS = r'''(base) => {
+    const lib = window.__adsLib;
+    if (!lib || !lib.signals) return false;
+    const now = lib.signals();
+    return now.cards > base.cards || now.feed > base.feed;
+}'''
+
+
+# ============================================
+# API PYTHON
+# ============================================
+
+def _extract_options(mode, country=None, search_term=None, seen=None):
+    """
+    Options transmises au script (None = déduit de l'URL de la page)
+    
+    seen: IDs déjà collectés par ailleurs, à ne pas renvoyer
+    """
+    return {'mode': mode, 'country': country, 'searchTerm': search_term, 'seen': list(seen or [])}
+
+
+async def install_extractor(page):
+    """Installe la bibliothèque d'extraction (à appeler avant page.goto)"""
+    await page.add_init_script(EXTRACTOR_LIBRARY_JS)
+
+
+async def _call(page, opts):
+    result = await page.evaluate(CALL_JS, opts)
+    if result is None:
+        # Bibliothèque absente (page chargée avant l'installation) : injection directe
+        await page.evaluate(EXTRACTOR_LIBRARY_JS)
+        result = await page.evaluate(CALL_JS, opts)
+    return result or []
+
+
+async def drain_ads(page, country=None, search_term=None, seen=None):
+    """Publicités apparues depuis le dernier appel"""
+    return await _call(page, _extract_options('drain', country, search_term, seen))
@@ -0,0 +1,425 @@
+"""
+ads_network.py
+Capture des publicités à partir des réponses réseau de la Ads Library
+
+Le fil de résultats est alimenté par des réponses GraphQL/XHR qui contiennent
+déjà les publicités structurées (ad_archive_id, page_id, start_date,
+publisher_platform, snapshot...). On les décode directement dans le schéma
+de publicité du scraper, sans passer par le DOM.
+
+Une fois la requête du fil et son curseur connus, CursorPaginator récupère
+les pages suivantes directement depuis la page, sans scroller.
+
+USAGE (vérification hors ligne sur des réponses enregistrées):
+    python ads_network.py reponse1.txt reponse2.txt ...
+Réponses de référence anonymisées : tests/fixtures/ (tests/test_ads_network.py)
+"""
+
+import json
+import re
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode
+
+# Mois français (même rendu que la Ads Library en locale fr-FR)
+MOIS_FR = [
+    "janvier", "février", "mars", "avril", "mai", "juin",
+    "juillet", "août", "septembre", "octobre", "novembre", "décembre"
+]
+
+# Noms affichés par la Ads Library pour publisher_platform
+PLATFORM_NAMES = {
+    'FACEBOOK': 'Facebook',
+    'INSTAGRAM': 'Instagram',
+    'AUDIENCE_NETWORK': 'Audience Network',
+    'MESSENGER': 'Messenger',
+    'THREADS': 'Threads',
+    'WHATSAPP': 'WhatsApp',
+}
+
+# Préfixe anti-JSON-hijacking ajouté par Facebook
+_HIJACK_PREFIX = "for (;;);"
+
+# Blocs JSON embarqués dans le HTML initial de la page
+_SCRIPT_JSON_RE = re.compile(
+    r'<script type="application/json"[^>]*>(.*?)</script>',
+    re.DOTALL
+)
+
+
+# ============================================
+# DÉCODAGE DES RÉPONSES
+# ============================================
+
+def iter_json_documents(text):
+    """
+    Décode une réponse qui peut contenir plusieurs documents JSON
+    concaténés (réponses GraphQL en streaming) et un préfixe for (;;);
+    """
+    if not text:
+        return
+    text = text.strip()
+    if text.startswith(_HIJACK_PREFIX):
+        text = text[len(_HIJACK_PREFIX):]
+
+    decoder = json.JSONDecoder()
+    index = 0
+    length = len(text)
+    while index < length:
+        while index < length and text[index].isspace():
+            index += 1
+        if index >= length:
+            break
+        try:
+            document, index = decoder.raw_decode(text, index)
+        except json.JSONDecodeError:
+            return
+        yield document
+
+
+def iter_html_json_documents(html):
+    """Documents JSON embarqués dans le HTML (premier lot de résultats)"""
+    for block in _SCRIPT_JSON_RE.findall(html or ''):
+        if 'ad_archive_id' not in block:
+            continue
+        yield from iter_json_documents(block)
+
+
+def _walk(node, ad_nodes, page_infos):
+    """Parcourt l'arbre JSON et collecte les publicités et les curseurs"""
+    if isinstance(node, dict):
+        if 'ad_archive_id' in node:
+            ad_nodes.append(node)
+            return
+        connection = node.get('search_results_connection')
+        if isinstance(connection, dict) and isinstance(connection.get('page_info'), dict):
+            page_infos.append(connection['page_info'])
+        for value in node.values():
+            _walk(value, ad_nodes, page_infos)
+    elif isinstance(node, list):
+        for value in node:
+            _walk(value, ad_nodes, page_infos)
+
+
+def parse_payload(documents, country='ALL', search_term='N/A'):
+    """
+    Convertit des documents JSON en publicités
+
+    Returns:
+        (ads, page_info): liste de publicités au format du scraper et
+        dernier page_info rencontré ({'end_cursor', 'has_next_page'} ou None)
+    """
+    ad_nodes = []
+    page_infos = []
+    for document in documents:
+        _walk(document, ad_nodes, page_infos)
+
+    ads = []
+    seen = set()
+    for node in ad_nodes:
+        ad = node_to_ad(node, country, search_term)
+        if ad and ad['ad_id'] not in seen:
+            seen.add(ad['ad_id'])
+            ads.append(ad)
+
+    return ads, (page_infos[-1] if page_infos else None)
+
+
+# ============================================
+# CONVERSION D'UN NŒUD EN PUBLICITÉ
+# ============================================
+
+def _format_start_date(timestamp):
+    """Timestamp unix -> '12 mars 2025' (format affiché par la page)"""
+    try:
+        date = datetime.fromtimestamp(int(timestamp), tz=timezone.utc)
+    except (TypeError, ValueError, OverflowError, OSError):
+        return 'N/A'
+    return f"{date.day} {MOIS_FR[date.month - 1]} {date.year}"
+
+
+def _scraped_at():
+    """Horodatage au même format que toISOString() côté navigateur"""
+    now = datetime.now(timezone.utc)
+    return now.strftime('%Y-%m-%dT%H:%M:%S.') + f"{now.microsecond // 1000:03d}Z"
+
+
+def _text_of(value):
+    """Le corps d'une créative est soit une chaîne, soit {'text': ...}"""
+    if isinstance(value, dict):
+        value = value.get('text')
+    return value.strip() if isinstance(value, str) and value.strip() else None
+
+
+def _platform_name(platform):
+    """'AUDIENCE_NETWORK' -> 'Audience Network'"""
+    platform = str(platform)
+    return PLATFORM_NAMES.get(platform.upper(), platform.replace('_', ' ').title())
+
+
+def _first_media(items):
+    """Première vidéo ou image trouvée dans une liste de créatives"""
+    for item in items or []:
+        if not isinstance(item, dict):
+            continue
+        video = item.get('video_hd_url') or item.get('video_sd_url')
+        if video:
+            return video, 'video'
+    for item in items or []:
+        if not isinstance(item, dict):
+            continue
+        image = item.get('original_image_url') or item.get('resized_image_url')
+        if image:
+            return image, 'image'
+    return None, None
+
+
+def node_to_ad(node, country='ALL', search_term='N/A'):
+    """Convertit un nœud GraphQL (collated result) en publicité"""
+    ad_id = node.get('ad_archive_id')
+    if not ad_id:
+        return None
+    ad_id = str(ad_id)
+
+    snapshot = node.get('snapshot') or {}
+    cards = snapshot.get('cards') or []
+    first_card = cards[0] if cards and isinstance(cards[0], dict) else {}
+
+    # Texte : corps de la créative, sinon celui de la première carte (carrousel)
+    text = _text_of(snapshot.get('body')) or _text_of(first_card.get('body')) or 'N/A'
+
+    # Média : vidéos, puis images, puis cartes du carrousel
+    media_url, media_type = _first_media(snapshot.get('videos'))
+    if not media_url:
+        media_url, media_type = _first_media(snapshot.get('images'))
+    if not media_url:
+        media_url, media_type = _first_media(cards)
+
+    platforms = node.get('publisher_platform') or []
+    is_active = node.get('is_active')
+
+    return {
+        'ad_id': ad_id,
+        'page_id': str(node.get('page_id') or snapshot.get('page_id') or 'N/A'),
+        'advertiser': node.get('page_name') or snapshot.get('page_name') or 'N/A',
+        'country': country,
+        'ad_status': 'Inactive' if is_active is False else 'Active',
+        'search_term': search_term,
+        'text': text[:500],
+        'start_date': _format_start_date(node.get('start_date')),
+        'platforms': ', '.join(_platform_name(p) for p in platforms) if platforms else 'N/A',
+        'media_type': media_type or 'N/A',
+        'media_url': media_url or 'N/A',
+        'cta_text': snapshot.get('cta_text') or first_card.get('cta_text') or 'N/A',
+        'cta_url': snapshot.get('link_url') or first_card.get('link_url') or 'N/A',
+        'ad_library_url': f"https://www.facebook.com/ads/library/?id={ad_id}",
+        'scraped_at': _scraped_at()
+    }
+
+
+# ============================================
+# CAPTURE EN DIRECT (page.on('response'))
+# ============================================
+
+def is_ads_response(url, resource_type):
+    """Réponses susceptibles de contenir des publicités"""
+    if resource_type == 'document':
+        return '/ads/library' in url
+    return '/api/graphql' in url or '/ads/library/async' in url
+
+
+class NetworkAdCapture:
+    """
+    Écoute les réponses de la page et accumule les publicités décodées
+
+    Les publicités sont récupérées à chaque itération via drain().
+    Avec buffer_ads=False, seuls la requête du fil et le curseur sont
+    mémorisés (pagination sans capture des publicités).
+    Si record_dir est fourni, les réponses brutes y sont enregistrées
+    (fixtures pour la vérification hors ligne).
+    """
+
+    def __init__(self, country='ALL', search_term='N/A', record_dir=None, buffer_ads=True):
+        self.country = country
+        self.search_term = search_term
+        self.record_dir = Path(record_dir) if record_dir else None
+        self.buffer_ads = buffer_ads
+        self.buffer = []
+        self.page_info = None
+        self.feed_template = None
+        self.own_requests = set()
+        self.ads_captured = 0
+        self.responses_parsed = 0
+        self.errors = 0
+
+    def attach(self, page):
+        """Branche la capture sur une page Playwright (API async)"""
+        page.on('response', self._on_response)
+
+    async def _on_response(self, response):
+        resource_type = response.request.resource_type
+        if not is_ads_response(response.url, resource_type):
+            return
+
+        # Pages déjà traitées par CursorPaginator
+        post_data = response.request.post_data
+        if post_data and post_data in self.own_requests:
+            self.own_requests.discard(post_data)
+            return
+
+        try:
+            body = await response.text()
+        except Exception:
+            # Redirections, réponses annulées ou page fermée
+            self.errors += 1
+            return
+
+        if 'ad_archive_id' not in body:
+            return
+
+        ads = self.ingest(body, is_html=(resource_type == 'document'))
+
+        # Mémoriser la requête du fil pour la pagination par curseur
+        if ads and post_data and 'variables=' in post_data:
+            self.feed_template = {
+                'url': response.url,
+                'post_data': post_data,
+                'headers': response.request.headers
+            }
+
+    def ingest(self, body, is_html=False):
+        """Décode un corps de réponse et ajoute les publicités au buffer"""
+        documents = iter_html_json_documents(body) if is_html else iter_json_documents(body)
+        ads, page_info = parse_payload(documents, self.country, self.search_term)
+
+        self.responses_parsed += 1
+        if page_info:
+            self.page_info = page_info
+        if self.record_dir:
+            self._record(body, is_html)
+
+        if self.buffer_ads:
+            self.ads_captured += len(ads)
+            self.buffer.extend(ads)
+        return ads
+
+    def drain(self):
+        """Retourne les publicités capturées depuis le dernier appel"""
+        batch = self.buffer
+        self.buffer = []
+        return batch
+
+    def _record(self, body, is_html):
+        self.record_dir.mkdir(parents=True, exist_ok=True)
+        suffix = 'html' if is_html else 'txt'
+        path = self.record_dir / f"response_{self.responses_parsed:04d}.{suffix}"
+        path.write_text(body, encoding='utf-8')
+
+
+# ============================================
+# PAGINATION PAR CURSEUR
+# ============================================
+
+# Requête exécutée dans le contexte de la page (mêmes cookies et origine)
+_FETCH_PAGE_JS = '''async ({url, body, headers}) => {
+    const response = await fetch(url, {
+        method: 'POST',
+        body: body,
+        headers: headers,
+        credentials: 'include'
+    });
+    if (!response.ok) {
+        throw new Error(`HTTP ${response.status}`);
+    }
+    return await response.text();
+}'''
+
+# En-têtes que fetch() accepte et que le serveur attend
+_FORWARDED_HEADERS = ('content-type', 'x-fb-lsd', 'x-asbd-id', 'x-fb-friendly-name')
+
+
+class CursorPaginator:
+    """
+    Récupère les pages de résultats suivantes sans scroller
+
+    La requête du fil et le curseur sont appris par NetworkAdCapture sur la
+    première réponse ; chaque page suivante rejoue cette requête avec le
+    nouveau curseur via fetch() dans la page.
+    """
+
+    def __init__(self, page, capture):
+        self.page = page
+        self.capture = capture
+        self.pages_fetched = 0
+
+    @property
+    def ready(self):
+        """Vrai si une requête modèle et un curseur suivant sont connus"""
+        page_info = self.capture.page_info or {}
+        return bool(
+            self.capture.feed_template
+            and page_info.get('has_next_page')
+            and page_info.get('end_cursor')
+        )
+
+    def build_body(self, cursor):
+        """Corps de la requête modèle avec variables.cursor remplacé"""
+        fields = parse_qsl(self.capture.feed_template['post_data'], keep_blank_values=True)
+        body = []
+        for key, value in fields:
+            if key == 'variables':
+                variables = json.loads(value)
+                variables['cursor'] = cursor
+                value = json.dumps(variables, separators=(',', ':'))
+            body.append((key, value))
+        return urlencode(body)
+
+    async def fetch_next(self):
+        """
+        Récupère la page suivante
+
+        Returns:
+            Liste des publicités de la page (le curseur est mis à jour)
+        """
+        template = self.capture.feed_template
+        body = self.build_body(self.capture.page_info['end_cursor'])
+        headers = {
+            key: value for key, value in template['headers'].items()
+            if key.lower() in _FORWARDED_HEADERS
+        }
+
+        self.capture.own_requests.add(body)
+        text = await self.page.evaluate(
+            _FETCH_PAGE_JS,
+            {'url': template['url'], 'body': body, 'headers': headers}
+        )
+        self.pages_fetched += 1
+
+        ads, page_info = parse_payload(
+            iter_json_documents(text),
+            self.capture.country,
+            self.capture.search_term
+        )
+        # Pas de page_info dans la réponse : fin du fil
+        self.capture.page_info = page_info or {'has_next_page': False}
+        return ads
+
+
+# ============================================
+# POINT D'ENTRÉE (vérification hors ligne)
+# ============================================
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python ads_network.py reponse1.txt [reponse2.html ...]")
+        sys.exit(1)
+
+    for filename in sys.argv[1:]:
+        capture = NetworkAdCapture()
+        body = Path(filename).read_text(encoding='utf-8')
+        ads = capture.ingest(body, is_html=filename.endswith('.html'))
+
+        print(f"{filename}: {len(ads)} publicité(s), page_info={capture.page_info}")
+        for ad in ads[:5]:
+            print(f"  {ad['ad_id']} | {ad['advertiser']} | {ad['start_date']} | {ad['platforms']} | {ad['media_type']}")
@@ -0,0 +1,442 @@
+"""
+ads_scraper.py
+Scraper de la Ads Library (un pays, une recherche) et scraping multi-pays
+
+Indépendant de Streamlit : utilisé par l'interface (scraper.py) et par les
+recherches planifiées (search_job.py).
+"""
+
+import asyncio
+import logging
+import random
+import time
+from urllib.parse import unquote
+
+from ads_extractor import install_extractor, drain_ads
+from ads_network import NetworkAdCapture, CursorPaginator
+from browser_pool import BrowserPool
+from page_matcher import PageMatcher
+from pacing import WaitController
+from resource_policy import ResourceBlocker, resolve_policy
+from storage import update_history_incrementally
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# CLASSE DE SCRAPING AMÉLIORÉE
+# ============================================
+
+class FacebookAdsLibraryScraper:
+    def __init__(self, country, status, media_type, blacklist, config, entry_id=None, pool=None, pacing=None, writer=None):
+        self.country = country[0] if isinstance(country, tuple) else country
+        self.status = status
+        self.media_type = media_type
+        self.blacklist = blacklist
+        self.blacklist_matcher = PageMatcher(blacklist)
+        self.config = config
+        self.ads_data = []
+        self.progress_callback = None
+        self.request_count = 0
+        self.start_time = None
+        self.entry_id = entry_id
+        self.last_save_count = 0
+        self.network_capture = None
+        self.paginator = None
+        # Pool de navigateurs partagé (None : un navigateur est lancé pour ce scraping)
+        self.pool = pool
+        # Budget de rythme partagé avec les autres pays scrapés en parallèle
+        self.pacing = pacing
+        # File d'écriture différée (None : sauvegardes envoyées directement à la base)
+        self.writer = writer
+        # Attentes adaptatives (créé avec la page)
+        self.waiter = None
+        # IDs déjà traités (gardés ou ignorés), partagés avec la page
+        self.seen_ids = set()
+        # Requêtes bloquées (images, vidéos, polices, tracking)
+        self.resource_blocker = ResourceBlocker(resolve_policy(config))
+        # IDs reçus hors DOM, à transmettre à la page au prochain appel
+        self.unshared_ids = []
+        
+    def set_progress_callback(self, callback):
+        self.progress_callback = callback
+    
+    def _save_checkpoint(self):
+        """Sauvegarde automatique tous les 50 résultats"""
+        if len(self.ads_data) - self.last_save_count >= 50:
+            if self.entry_id:
+                if not self._store(self.ads_data[self.last_save_count:]):
+                    # Échec journalisé : ces publicités seront renvoyées à la sauvegarde suivante
+                    return
+                self.last_save_count = len(self.ads_data)
+                if self.progress_callback:
+                    # ✅ CORRECTION : Si progression > 100%, on la ramène à 100%
+                    progress = (len(self.ads_data) / self.config.get('max_ads', 500)) * 100
+                    if progress > 100:
+                        progress = 100
+                        
+                    self.progress_callback(
+                        progress,
+                        f"💾 Sauvegarde automatique : {len(self.ads_data)} pubs"
+                    )
+    
+    def _store(self, new_ads):
+        """
+        Spool local + envoi en arrière-plan si une file est fournie, sinon écriture directe
+        
+        Returns:
+            False si l'écriture directe a échoué (les publicités restent à enregistrer)
+        """
+        if self.writer:
+            # Échecs d'envoi réessayés par la file, publicités conservées dans le spool
+            self.writer.enqueue(self.entry_id, new_ads)
+            return True
+        return update_history_incrementally(self.entry_id, new_ads)
+    
+    def flush_checkpoint(self):
+        """Enregistre les publicités pas encore sauvegardées par _save_checkpoint"""
+        if self.entry_id and len(self.ads_data) > self.last_save_count:
+            if not self._store(self.ads_data[self.last_save_count:]):
+                raise RuntimeError(
+                    f"{len(self.ads_data) - self.last_save_count} publicités non enregistrées pour l'entrée {self.entry_id}"
+                )
+            self.last_save_count = len(self.ads_data)
+    
+    async def _pause(self, duration, adaptive=False):
+        """
+        Pause propre au scraper, puis créneau du budget partagé s'il y en a un
+        
+        adaptive: la pause s'arrête dès que la page progresse, sans descendre
+        sous le plancher wait_floor (pause_min par défaut)
+        """
+        if adaptive and self.waiter:
+            await self.waiter.wait(duration, floor=self.config.get('wait_floor', self.config['pause_min']))
+        else:
+            await asyncio.sleep(duration)
+        if self.pacing:
+            await self.pacing.acquire()
+        
+    async def scrape(self, keyword="", date_filter=None, max_ads=500, max_scroll_time=1800, page_id=None):
+        # Sans pool fourni : pool temporaire pour ce seul scraping
+        if self.pool is None:
+            async with BrowserPool(size=1) as pool:
+                self.pool = pool
+                try:
+                    return await self.scrape(keyword, date_filter, max_ads, max_scroll_time, page_id)
+                finally:
+                    self.pool = None
+        
+        # Navigateur du pool, contexte neuf (fermé en sortie de bloc)
+        async with self.pool.context(
+            headless=self.config['headless'],
+            viewport={'width': 1920, 'height': 1080},
+            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            locale='fr-FR'
+        ) as context:
+            await self.resource_blocker.install(context)
+            
+            page = await context.new_page()
+            
+            await page.add_init_script("""
+                Object.defineProperty(navigator, 'webdriver', {
+                    get: () => false
+                });
+            """)
+            
+            # Bibliothèque d'extraction installée une fois pour toute la page
+            await install_extractor(page)
+            self.waiter = WaitController(page, floor=1.0)
+            
+            # Mode "network" : décoder les réponses GraphQL du fil de résultats
+            # Mode "dom" : cartes insérées depuis l'itération précédente
+            network_mode = self.config.get('capture_mode', 'dom') == 'network'
+            cursor_pagination = self.config.get('cursor_pagination', True)
+            
+            if network_mode or cursor_pagination:
+                self.network_capture = NetworkAdCapture(
+                    country=self.country,
+                    search_term=unquote(keyword) if keyword else 'N/A',
+                    record_dir=self.config.get('network_record_dir'),
+                    buffer_ads=network_mode
+                )
+                self.network_capture.attach(page)
+            
+            # Pagination par curseur dès que la requête du fil est connue
+            if cursor_pagination:
+                self.paginator = CursorPaginator(page, self.network_capture)
+            
+            base_url = "https://www.facebook.com/ads/library"
+            url = f"{base_url}?active_status={self.status}&ad_type=all&country={self.country}"
+            
+            if self.media_type != "all":
+                url += f"&media_type={self.media_type}"
+            else:
+                url += "&media_type=all"
+            
+            if keyword:
+                url += f"&q={keyword}"
+            
+            # Si un page_id est fourni, l'ajouter
+            if page_id:
+                url += f"&search_page_ids={page_id}"
+            
+            # Ajouter le filtre de date
+            if date_filter:
+                date_type = date_filter.get('type')
+                date1 = date_filter.get('date1')
+                date2 = date_filter.get('date2')
+                
+                if date_type == "before" and date1:
+                    url += f"&start_date[max]={date1}"
+                elif date_type == "on" and date1:
+                    url += f"&start_date[min]={date1}&start_date[max]={date1}"
+                elif date_type == "after" and date1:
+                    url += f"&start_date[min]={date1}"
+                elif date_type == "between" and date1 and date2:
+                    url += f"&start_date[min]={date1}&start_date[max]={date2}"
+            
+            if self.progress_callback:
+                self.progress_callback(0, f"🌍 Navigation vers Facebook Ads Library...")
+            
+            try:
+                await self._pause(0)
+                await page.goto(url, wait_until="domcontentloaded", timeout=90000)
+                # Jusqu'à 8s puis 5s, écourtées dès que les premières cartes arrivent
+                await self.waiter.wait(8)
+                await page.evaluate("window.scrollTo(0, 1000)")
+                await self.waiter.wait(5)
+            except Exception as e:
+                if self.progress_callback:
+                    self.progress_callback(0, f"❌ Erreur de chargement: {str(e)}")
+                raise Exception(f"Impossible de charger la page Facebook")
+            
+            self.start_time = time.time()
+            last_count = 0
+            consecutive_same_count = 0
+            scroll_attempts = 0
+            
+            while len(self.ads_data) < max_ads:
+                elapsed = time.time() - self.start_time
+                if elapsed > max_scroll_time:
+                    if self.progress_callback:
+                        self.progress_callback(100, f"⏱️ Temps maximum atteint ({max_scroll_time}s)")
+                    break
+                
+                # Pause longue après 20 minutes
+                if elapsed > 1200:
+                    if self.request_count % random.randint(20, 40) == 0 and self.request_count > 0:
+                        pause_duration = random.uniform(120, 300)
+                        if self.progress_callback:
+                            self.progress_callback(
+                                (len(self.ads_data) / max_ads) * 100,
+                                f"⏸️ Pause longue de {int(pause_duration/60)} minutes..."
+                            )
+                        await self._pause(pause_duration)
+                
+                await self._extract_ads_from_page(page)
+                self.request_count += 1
+                scroll_attempts += 1
+                
+                # Sauvegarde automatique tous les 50 résultats
+                self._save_checkpoint()
+                
+                # Curseur appris : les pages suivantes sont récupérées sans scroller
+                if self.paginator and self.paginator.ready:
+                    if await self._paginate(max_ads, max_scroll_time):
+                        break
+                
+                current_count = len(self.ads_data)
+                progress = min((current_count / max_ads) * 100, 100)
+                
+                if self.progress_callback:
+                    self.progress_callback(
+                        progress, 
+                        f"📊 {current_count} pubs | ⏱️ {int(elapsed)}s | 🔄 {self.request_count} req | 📜 {scroll_attempts} scrolls"
+                    )
+                
+                if current_count == last_count:
+                    consecutive_same_count += 1
+                    
+                    if consecutive_same_count >= 5:
+                        if self.progress_callback:
+                            self.progress_callback(
+                                progress,
+                                f"⚠️ Aucune nouvelle pub après 5 tentatives. Arrêt."
+                            )
+                        break
+                        
+                    if consecutive_same_count >= 2:
+                        scroll_amount = random.randint(2000, 3000)
+                        await page.evaluate(f"window.scrollBy(0, {scroll_amount})")
+                        await self.waiter.wait(4, floor=0.5)
+                        await page.evaluate(f"window.scrollBy(0, -500)")
+                        await self.waiter.wait(2, floor=0.5)
+                else:
+                    consecutive_same_count = 0
+                
+                last_count = current_count
+                
+                if consecutive_same_count == 0:
+                    scroll_amount = random.randint(800, 1200)
+                else:
+                    scroll_amount = random.randint(1500, 2500)
+                
+                await page.evaluate(f"window.scrollBy(0, {scroll_amount})")
+                
+                if consecutive_same_count >= 2:
+                    pause_duration = random.uniform(
+                        self.config['pause_max'], 
+                        self.config['pause_max'] + 3
+                    )
+                else:
+                    pause_duration = random.uniform(
+                        self.config['pause_min'], 
+                        self.config['pause_max']
+                    )
+                
+                await self._pause(pause_duration, adaptive=True)
+                
+                is_at_bottom = await page.evaluate("""
+                    () => {
+                        return (window.innerHeight + window.scrollY) >= document.body.offsetHeight - 100;
+                    }
+                """)
+                
+                if is_at_bottom and consecutive_same_count >= 3:
+                    if self.progress_callback:
+                        self.progress_callback(
+                            progress,
+                            f"📍 Bas de page atteint. Fin du scraping."
+                        )
+                    break
+            
+            logger.info(f"{self.country} - {self.resource_blocker.summary()}")
+            logger.info(f"{self.country} - {self.waiter.summary()}")
+            
+            if self.progress_callback:
+                self.progress_callback(
+                    100,
+                    f"✅ Scraping terminé : {len(self.ads_data)} publicités extraites | {self.waiter.summary()}"
+                )
+            
+            return self.ads_data
+    
+    async def _extract_ads_from_page(self, page):
+        """Récupère les cartes apparues depuis la dernière itération"""
+        if self.network_capture and self.network_capture.ads_captured > 0:
+            self._add_new_ads(self.network_capture.drain())
+        else:
+            # Mode DOM, ou aucune réponse réseau exploitable : repli sur le DOM.
+            # La page ne renvoie que les cartes dont l'ID n'a jamais été vu.
+            new_ads = await drain_ads(page, seen=self.unshared_ids)
+            self.unshared_ids = []
+            self._add_new_ads(new_ads, from_page=True)
+    
+    async def _paginate(self, max_ads, max_scroll_time):
+        """
+        Récupère les pages de résultats via le curseur, sans scroller
+        
+        Returns:
+            True si la pagination est allée à son terme (fin du fil ou limites
+            atteintes), False en cas d'échec (la boucle de scroll reprend)
+        """
+        while self.paginator.ready and len(self.ads_data) < max_ads:
+            elapsed = time.time() - self.start_time
+            if elapsed > max_scroll_time:
+                if self.progress_callback:
+                    self.progress_callback(100, f"⏱️ Temps maximum atteint ({max_scroll_time}s)")
+                return True
+            
+            # Rythme configurable entre deux pages
+            await self._pause(random.uniform(
+                self.config['pause_min'],
+                self.config['pause_max']
+            ))
+            
+            try:
+                new_ads = await self.paginator.fetch_next()
+            except Exception as e:
+                # Pagination abandonnée pour la suite du scraping : la requête
+                # en échec ne doit pas être renvoyée à chaque itération du scroll
+                logger.warning(f"Pagination par curseur interrompue, retour au scroll : {e}")
+                self.paginator = None
+                return False
+            
+            self.request_count += 1
+            self._add_new_ads(new_ads)
+            self._save_checkpoint()
+            
+            if self.progress_callback:
+                current_count = len(self.ads_data)
+                self.progress_callback(
+                    min((current_count / max_ads) * 100, 100),
+                    f"📊 {current_count} pubs | ⏱️ {int(elapsed)}s | 🔄 {self.request_count} req | 📄 {self.paginator.pages_fetched} pages"
+                )
+        
+        if self.progress_callback and len(self.ads_data) < max_ads:
+            self.progress_callback(100, f"📍 Fin des résultats atteinte.")
+        return True
+    
+    def _add_new_ads(self, new_ads, from_page=False):
+        """
+        Ajoute les nouvelles publicités (hors doublons et pages en blacklist)
+        
+        from_page: True si les pubs viennent de l'extracteur de la page, qui
+        connaît déjà leurs IDs ; sinon ils lui seront transmis au prochain appel
+        """
+        for ad in new_ads:
+            if ad['ad_id'] in self.seen_ids:
+                continue
+            self.seen_ids.add(ad['ad_id'])
+            if not from_page:
+                self.unshared_ids.append(ad['ad_id'])
+            
+            # Vérifier la blacklist
+            should_ignore = False
+            advertiser = ad['advertiser']
+            page_id = ad['page_id']
+            
+            if advertiser != 'N/A' or page_id != 'N/A':
+                should_ignore = self.blacklist_matcher.matches(advertiser, page_id)
+            
+            if not should_ignore:
+                self.ads_data.append(ad)
+
+# ============================================
+# SCRAPING MULTI-PAYS EN PARALLÈLE
+# ============================================
+
+async def scrape_countries(countries, create_scraper, scrape_kwargs, max_concurrency=2, on_state=None):
+    """
+    Scrape plusieurs pays en parallèle dans la même boucle asyncio
+    
+    Args:
+        countries: liste de pays (tuples (code, nom))
+        create_scraper: fonction pays -> FacebookAdsLibraryScraper
+        scrape_kwargs: arguments de scrape() communs à tous les pays
+        max_concurrency: nombre maximal de pays scrapés simultanément
+        on_state: callback(pays, état, détail) avec état 'running',
+            'success' (détail = résultats) ou 'failed' (détail = exception)
+    
+    Returns:
+        Liste de (pays, résultats ou exception), dans l'ordre des pays
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    
+    async def run(country):
+        async with semaphore:
+            if on_state:
+                on_state(country, 'running', None)
+            try:
+                scraper = create_scraper(country)
+                results = await scraper.scrape(**scrape_kwargs)
+                # Dernières pubs pas encore enregistrées par les sauvegardes automatiques
+                scraper.flush_checkpoint()
+            except Exception as e:
+                if on_state:
+                    on_state(country, 'failed', e)
+                return country, e
+            if on_state:
+                on_state(country, 'success', results)
+            return country, results
+    
+    return await asyncio.gather(*(run(country) for country in countries))
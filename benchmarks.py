@@ -0,0 +1,588 @@
+"""
+benchmarks.py
+Mesures de performance des briques du scraper
+
+USAGE:
+    python benchmarks.py extraction [--html page1.html page2.html ...]
+    python benchmarks.py call-overhead
+    python benchmarks.py delta
+    python benchmarks.py blacklist [--entries 10000] [--ads 50000]
+    python benchmarks.py browser-pool [--jobs 10]
+    python benchmarks.py list-ops [--sizes 100 1000 10000]
+    python benchmarks.py exports [--ads 100000]
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+
+# ============================================
+# FIXTURES HTML
+# ============================================
+
+def build_card_html(i):
+    """Génère la carte n°i (structure imbriquée d'une carte Ads Library)"""
+    ad_id = 1000000000000000 + i
+    page_id = 100000000000 + (i % 97)
+    return f'''
+        <div class="x1"><div class="x2"><div class="x3">
+          <div class="x4"><div class="x5">
+            <span>Active</span>
+            <div><span>ID dans la bibliothèque : {ad_id}</span></div>
+            <div><span>Début de la diffusion le 12 mars 2025</span></div>
+            <div><span>Plateformes</span></div>
+          </div></div>
+          <div class="x6"><div class="x7">
+            <a href="https://www.facebook.com/{page_id}/">Annonceur {i % 97}</a>
+            <div>Sponsorisé</div>
+            <div><div>Texte de la publicité numéro {i}, suffisamment long pour être retenu.</div></div>
+            <div><img src="https://scontent.example/creative_{i}.jpg" width="400" height="400"></div>
+            <div><a href="https://l.facebook.com/l.php?u=https%3A%2F%2Fexample.com%2F{i}" role="button">En savoir plus</a></div>
+          </div></div>
+        </div></div></div>'''
+
+
+def build_fixture_html(card_count):
+    """
+    Génère une page imitant la structure de la Ads Library
+    (cartes profondément imbriquées dans un fil de résultats)
+    """
+    cards = [build_card_html(i) for i in range(card_count)]
+    return f'''<!DOCTYPE html><html><head><meta charset="utf-8"></head>
+<body><div id="feed"><div><div>{"".join(cards)}</div></div></div></body></html>'''
+
+
+# Ancienne extraction (balayage de toutes les <div>), conservée comme référence
+LEGACY_SCAN_JS = r'''() => {
+    const ads = [];
+    const processedIds = new Set();
+    document.querySelectorAll('div').forEach(div => {
+        const text = div.innerText || '';
+        if (text.includes('ID dans la bibliothèque') || text.includes('Library ID')) {
+            const idMatch = text.match(/ID dans la bibliothèque[\s:]*([0-9]+)/i) ||
+                            text.match(/Library ID[\s:]*([0-9]+)/i);
+            if (!idMatch || processedIds.has(idMatch[1])) return;
+            processedIds.add(idMatch[1]);
+            div.querySelectorAll('a[href*="facebook.com/"]');
+            div.querySelectorAll('img[src*="scontent"]');
+            ads.push({ ad_id: idMatch[1], text: text.substring(0, 500) });
+        }
+    });
+    return ads;
+}'''
+
+
+# Extraction complète : oublie les IDs déjà transmis avant chaque appel
+FULL_CALL_JS = "(opts) => { window.__adsLib.forget(); return window.__adsExtract(opts); }"
+
+
+def _time_evaluate(page, script, arg=None, repeat=5):
+    """Temps médian (ms) d'un page.evaluate et nombre de pubs retournées"""
+    durations = []
+    result = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = page.evaluate(script, arg) if arg is not None else page.evaluate(script)
+        durations.append((time.perf_counter() - start) * 1000)
+    return statistics.median(durations), len(result)
+
+
+# ============================================
+# BENCHMARK : EXTRACTION
+# ============================================
+
+def bench_extraction(html_files=None, card_counts=(50, 100, 200, 400, 800)):
+    """Compare le temps d'evaluate (ancien balayage vs extraction par carte)"""
+    from playwright.sync_api import sync_playwright
+    from ads_extractor import EXTRACTOR_LIBRARY_JS
+
+    if html_files:
+        fixtures = [(Path(f).name, Path(f).read_text(encoding='utf-8')) for f in html_files]
+    else:
+        fixtures = [(f"synthetic_{n}", build_fixture_html(n)) for n in card_counts]
+
+    print(f"{'fixture':<28}{'cartes':>8}{'ancien (ms)':>14}{'cartes (ms)':>14}{'gain':>8}")
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        page = browser.new_page(viewport={'width': 1920, 'height': 1080})
+        for name, html in fixtures:
+            page.set_content(html, wait_until="domcontentloaded")
+            page.evaluate(EXTRACTOR_LIBRARY_JS)
+            legacy_ms, _ = _time_evaluate(page, LEGACY_SCAN_JS)
+            card_ms, count = _time_evaluate(page, FULL_CALL_JS, {'mode': 'full'})
+            gain = legacy_ms / card_ms if card_ms else float('inf')
+            print(f"{name:<28}{count:>8}{legacy_ms:>14.1f}{card_ms:>14.1f}{gain:>7.1f}x")
+        browser.close()
+
+
+# ============================================
+# BENCHMARK : COÛT PAR APPEL
+# ============================================
+
+def bench_call_overhead(card_counts=(0, 50, 200), repeat=50):
+    """
+    Coût d'un appel d'extraction : source complète envoyée et recompilée
+    à chaque itération (avant) vs bibliothèque préinstallée (après)
+    """
+    from playwright.sync_api import sync_playwright
+    from ads_extractor import EXTRACTOR_LIBRARY_JS, CALL_JS
+
+    # Avant : tout le script est transmis et réévalué à chaque appel
+    per_call_js = (
+        '(opts) => { delete window.__adsLib; '
+        + EXTRACTOR_LIBRARY_JS
+        + '; return window.__adsExtract(opts); }'
+    )
+
+    print(f"Taille du script : {len(EXTRACTOR_LIBRARY_JS)} caractères / appel minimal : {len(CALL_JS)}")
+    print(f"{'cartes':>8}{'source/appel (ms)':>20}{'préinstallé (ms)':>20}{'gain':>8}")
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        page = browser.new_page()
+        for count in card_counts:
+            page.set_content(build_fixture_html(count), wait_until="domcontentloaded")
+            page.evaluate(EXTRACTOR_LIBRARY_JS)
+            before_ms, _ = _time_evaluate(page, per_call_js, {'mode': 'full'}, repeat)
+            after_ms, _ = _time_evaluate(page, FULL_CALL_JS, {'mode': 'full'}, repeat)
+            gain = before_ms / after_ms if after_ms else float('inf')
+            print(f"{count:>8}{before_ms:>20.2f}{after_ms:>20.2f}{gain:>7.1f}x")
+        browser.close()
+
+
+# ============================================
+# BENCHMARK : EXTRACTION DELTA
+# ============================================
+
+def bench_delta(steps=20, cards_per_step=30):
+    """
+    Simule un scroll profond (cartes ajoutées par lots) et compare, à chaque
+    étape, le volume renvoyé par la page : toutes les cartes vs nouvelles seulement
+    """
+    from playwright.sync_api import sync_playwright
+    from ads_extractor import EXTRACTOR_LIBRARY_JS, CALL_JS
+
+    append_js = '''(html) => {
+        const feed = document.querySelector('#feed > div > div');
+        feed.insertAdjacentHTML('beforeend', html);
+    }'''
+    total_full = {'ms': 0.0, 'bytes': 0}
+    total_delta = {'ms': 0.0, 'bytes': 0}
+
+    print(f"{'cartes':>8}{'complet (ms)':>14}{'complet (Ko)':>14}{'delta (ms)':>12}{'delta (Ko)':>12}")
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        page = browser.new_page()
+        page.set_content(build_fixture_html(0), wait_until="domcontentloaded")
+        page.evaluate(EXTRACTOR_LIBRARY_JS)
+        full_page = browser.new_page()
+        full_page.set_content(build_fixture_html(0), wait_until="domcontentloaded")
+        full_page.evaluate(EXTRACTOR_LIBRARY_JS)
+
+        for step in range(1, steps + 1):
+            first = (step - 1) * cards_per_step
+            chunk = ''.join(build_card_html(i) for i in range(first, first + cards_per_step))
+            for target in (page, full_page):
+                target.evaluate(append_js, chunk)
+
+            start = time.perf_counter()
+            full_ads = full_page.evaluate(FULL_CALL_JS, {'mode': 'full'})
+            full_ms = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            delta_ads = page.evaluate(CALL_JS, {'mode': 'full'})
+            delta_ms = (time.perf_counter() - start) * 1000
+
+            full_bytes = len(json.dumps(full_ads))
+            delta_bytes = len(json.dumps(delta_ads))
+            total_full['ms'] += full_ms
+            total_full['bytes'] += full_bytes
+            total_delta['ms'] += delta_ms
+            total_delta['bytes'] += delta_bytes
+            print(f"{len(full_ads):>8}{full_ms:>14.1f}{full_bytes / 1024:>14.1f}"
+                  f"{delta_ms:>12.1f}{delta_bytes / 1024:>12.1f}")
+        browser.close()
+
+    print(f"Total complet : {total_full['ms']:.0f} ms / {total_full['bytes'] / 1024:.0f} Ko")
+    print(f"Total delta   : {total_delta['ms']:.0f} ms / {total_delta['bytes'] / 1024:.0f} Ko")
+
+
+# ============================================
+# BENCHMARK : FILTRE BLACKLIST
+# ============================================
+
+def _legacy_blacklist_match(blacklist, advertiser, page_id):
+    """Ancien filtre : parcours de toute la blacklist pour chaque publicité"""
+    for ignored in blacklist:
+        nom_page = ignored.get('nom_page', '')
+        id_page = str(ignored.get('id_page', ''))
+        if (nom_page and nom_page.lower() in advertiser.lower()) or \
+           (id_page and id_page == page_id):
+            return True
+    return False
+
+
+def bench_blacklist(entry_count=10000, ad_count=50000, legacy_sample=1000, seed=42):
+    """
+    Compare l'ancien filtre (O(pubs x blacklist)) au matcher compilé.
+    L'ancien filtre est mesuré sur un échantillon puis extrapolé.
+    """
+    from page_matcher import PageMatcher
+
+    rng = random.Random(seed)
+    words = ['boutique', 'store', 'beauty', 'shop', 'mode', 'maison', 'sport', 'bijoux',
+             'deco', 'cosmetics', 'official', 'france', 'paris', 'lux', 'bio', 'kids']
+
+    def page_name(i):
+        return f"{rng.choice(words).capitalize()} {rng.choice(words)} {i}"
+
+    blacklist = [{'id_page': str(100000000000 + i), 'nom_page': page_name(i)} for i in range(entry_count)]
+    ads = []
+    for i in range(ad_count):
+        # ~10 % de pubs issues de pages en blacklist (par ID ou par nom)
+        roll = rng.random()
+        if roll < 0.05:
+            entry = rng.choice(blacklist)
+            ads.append((f"Pub {entry['nom_page']}", 'N/A'))
+        elif roll < 0.10:
+            ads.append(('N/A', rng.choice(blacklist)['id_page']))
+        else:
+            ads.append((page_name(entry_count + i), str(200000000000 + i)))
+
+    start = time.perf_counter()
+    matcher = PageMatcher(blacklist)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    matched = sum(1 for advertiser, page_id in ads if matcher.matches(advertiser, page_id))
+    matcher_s = time.perf_counter() - start
+
+    sample = ads[:legacy_sample]
+    start = time.perf_counter()
+    legacy_matched = sum(1 for advertiser, page_id in sample if _legacy_blacklist_match(blacklist, advertiser, page_id))
+    legacy_sample_s = time.perf_counter() - start
+    legacy_s = legacy_sample_s * ad_count / len(sample)
+
+    sample_matched = sum(1 for advertiser, page_id in sample if matcher.matches(advertiser, page_id))
+
+    print(f"Blacklist : {entry_count} entrées / {ad_count} publicités")
+    print(f"Construction du matcher : {build_ms:.0f} ms")
+    print(f"Matcher compilé : {matcher_s:.2f} s ({matched} pubs filtrées)")
+    print(f"Ancien filtre   : {legacy_s:.1f} s (extrapolé depuis {len(sample)} pubs en {legacy_sample_s:.2f} s)")
+    print(f"Gain : {legacy_s / matcher_s:.0f}x")
+    print(f"Résultats identiques sur l'échantillon : {legacy_matched == sample_matched} "
+          f"({legacy_matched} vs {sample_matched})")
+
+
+# ============================================
+# BENCHMARK : POOL DE NAVIGATEURS
+# ============================================
+
+def bench_browser_pool(job_count=10):
+    """
+    Coût de mise à disposition d'une page par unité de travail :
+    un lancement de Chromium par job (avant) vs contexte neuf du pool (après)
+    """
+    import asyncio
+    from playwright.async_api import async_playwright
+    from browser_pool import BrowserPool
+
+    html = build_fixture_html(20)
+
+    async def run_job(context):
+        page = await context.new_page()
+        await page.set_content(html, wait_until="domcontentloaded")
+
+    async def measure():
+        launch_durations = []
+        async with async_playwright() as p:
+            for _ in range(job_count):
+                start = time.perf_counter()
+                browser = await p.chromium.launch(headless=True)
+                context = await browser.new_context()
+                await run_job(context)
+                await browser.close()
+                launch_durations.append((time.perf_counter() - start) * 1000)
+
+        pool_durations = []
+        async with BrowserPool(size=1) as pool:
+            for _ in range(job_count):
+                start = time.perf_counter()
+                async with pool.context(headless=True) as context:
+                    await run_job(context)
+                pool_durations.append((time.perf_counter() - start) * 1000)
+            stats = pool.stats()
+        return launch_durations, pool_durations, stats
+
+    launch_durations, pool_durations, stats = asyncio.run(measure())
+
+    print(f"{job_count} jobs (page de 20 cartes)")
+    print(f"Lancement par job : médiane {statistics.median(launch_durations):.0f} ms, total {sum(launch_durations):.0f} ms")
+    print(f"Pool              : médiane {statistics.median(pool_durations):.0f} ms, total {sum(pool_durations):.0f} ms "
+          f"(1er job avec lancement : {pool_durations[0]:.0f} ms)")
+    print(f"Pool : {stats['launches']} lancement(s) pour {stats['contexts_served']} contextes")
+
+
+# ============================================
+# BENCHMARK : ENREGISTREMENT BLACKLIST / WHITELIST
+# ============================================
+
+class _RecordingTable:
+    """Table en mémoire qui compte les requêtes et les octets envoyés (API postgrest minimale)"""
+
+    def __init__(self, store, name):
+        self.store, self.name = store, name
+        self.op, self.payload, self.filters, self.options = None, None, [], {}
+
+    def select(self, *columns, **kwargs):
+        self.op = 'select'
+        return self
+
+    def insert(self, rows, **kwargs):
+        self.op, self.payload = 'insert', rows
+        return self
+
+    def upsert(self, rows, **kwargs):
+        self.op, self.payload, self.options = 'upsert', rows, kwargs
+        return self
+
+    def update(self, fields):
+        self.op, self.payload = 'update', fields
+        return self
+
+    def delete(self):
+        self.op = 'delete'
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: str(row.get(column)) == str(value))
+        return self
+
+    def neq(self, column, value):
+        self.filters.append(lambda row: str(row.get(column)) != str(value))
+        return self
+
+    def in_(self, column, values):
+        values = {str(v) for v in values}
+        self.filters.append(lambda row: str(row.get(column)) in values)
+        return self
+
+    def execute(self):
+        rows = self.store.tables.setdefault(self.name, [])
+        self.store.requests += 1
+        self.store.bytes_sent += len(json.dumps(self.payload)) if self.payload is not None else 0
+        match = [row for row in rows if all(f(row) for f in self.filters)]
+        data = []
+        if self.op == 'select':
+            data = match
+        elif self.op == 'delete':
+            self.store.tables[self.name] = [row for row in rows if row not in match]
+        elif self.op == 'insert':
+            rows.extend(self.payload)
+        elif self.op == 'upsert':
+            existing = {row.get('id_page') for row in rows}
+            data = [row for row in self.payload if row.get('id_page') not in existing]
+            rows.extend(data)
+        elif self.op == 'update':
+            for row in match:
+                row.update(self.payload)
+        return type('Response', (), {'data': data, 'count': len(data)})()
+
+
+class _RecordingClient:
+    def __init__(self):
+        self.tables = {}
+        self.requests = 0
+        self.bytes_sent = 0
+
+    def table(self, name):
+        return _RecordingTable(self, name)
+
+
+def bench_list_ops(sizes=(100, 1000, 10000), rtt_ms=40, bandwidth_mbps=20):
+    """
+    Coût d'un ajout et d'un retrait de page en fonction de la taille de la liste :
+    remplacement complet (avant) vs opérations incrémentales (après).
+    Client en mémoire : requêtes et octets envoyés sont comptés, la durée
+    est estimée avec une latence et un débit montant typiques.
+    """
+    from unittest import mock
+
+    import supabase_db
+
+    def legacy_save(client, name, pages):
+        # Ancien save_* : suppression complète puis réinsertion
+        client.table(name).delete().neq('id', 0).execute()
+        if pages:
+            client.table(name).insert(pages).execute()
+
+    def estimate_ms(requests, sent):
+        return requests * rtt_ms + sent * 8 / (bandwidth_mbps * 1000)
+
+    def measure(client, action):
+        requests, sent = client.requests, client.bytes_sent
+        action()
+        requests, sent = client.requests - requests, client.bytes_sent - sent
+        return requests, sent, estimate_ms(requests, sent)
+
+    print(f"Estimation : {rtt_ms} ms par requête, {bandwidth_mbps} Mbit/s montants")
+    print(f"{'Pages':>7} | {'Opération':<9} | {'Avant (req / Ko / ms)':>24} | {'Après (req / Ko / ms)':>24}")
+    for size in sizes:
+        pages = [
+            {'id_page': str(100000000000 + i), 'nom_page': f"Page {i}", 'date_ajout': '01-01-2025 00:00:00',
+             'date_creation': '01/01/2020', 'id_permanent': str(200000000000 + i)}
+            for i in range(size)
+        ]
+        new_page = {'id_page': '999', 'nom_page': "Nouvelle page", 'date_ajout': '01-01-2025 00:00:00'}
+
+        client = _RecordingClient()
+        client.tables['blacklist'] = [dict(p) for p in pages]
+        legacy_add = measure(client, lambda: legacy_save(client, 'blacklist', pages + [new_page]))
+        legacy_remove = measure(client, lambda: legacy_save(client, 'blacklist', pages))
+
+        client = _RecordingClient()
+        client.tables['blacklist'] = [dict(p) for p in pages]
+        # Client en mémoire le temps de la mesure seulement (restauré ensuite)
+        with mock.patch.object(supabase_db, 'get_supabase', return_value=client):
+            diff_add = measure(client, lambda: supabase_db.add_pages('blacklist', [new_page]))
+            diff_remove = measure(client, lambda: supabase_db.remove_pages('blacklist', ['999']))
+        assert len(client.tables['blacklist']) == size
+
+        for label, before, after in (('ajout', legacy_add, diff_add), ('retrait', legacy_remove, diff_remove)):
+            print(f"{size:>7} | {label:<9} | "
+                  f"{before[0]:>3} / {before[1] / 1024:>8.1f} / {before[2]:>6.0f} | "
+                  f"{after[0]:>3} / {after[1] / 1024:>8.1f} / {after[2]:>6.0f}")
+
+
+# ============================================
+# EXPORTS
+# ============================================
+
+def build_fake_ads(count, seed=42):
+    """Publicités synthétiques (mêmes champs que ads_extractor)"""
+    rng = random.Random(seed)
+    return [
+        {
+            'ad_id': str(1000000000000000 + i),
+            'page_id': str(100000000000 + i % 997),
+            'advertiser': f"Annonceur {i % 997}",
+            'country': rng.choice(['FR', 'US', 'MX', 'IN']),
+            'ad_status': 'Active',
+            'search_term': 'N/A',
+            'text': f"Texte de la publicité numéro {i}, café, été. " * rng.randint(1, 6),
+            'start_date': '12 mars 2025',
+            'platforms': ['Facebook', 'Instagram'],
+            'media_type': rng.choice(['image', 'video']),
+            'media_url': f"https://scontent.example/creative_{i}.jpg",
+            'cta_text': 'En savoir plus',
+            'cta_url': f"https://l.facebook.com/l.php?u=https%3A%2F%2Fexample.com%2F{i}",
+            'ad_library_url': f"https://www.facebook.com/ads/library/?id={1000000000000000 + i}",
+            'scraped_at': '2025-03-12T10:00:00.000Z',
+        }
+        for i in range(count)
+    ]
+
+
+def _measure_peak(action):
+    """(durée en s, pic de mémoire allouée en Mo) d'une action"""
+    import tracemalloc
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = action()
+    duration = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, duration, peak / 1_048_576
+
+
+def bench_exports(ad_count=100000):
+    """
+    Téléchargements : construction complète en mémoire à chaque affichage
+    (avant) vs fichier écrit par paquets, à la demande (après)
+    """
+    import tempfile
+    from exports import available_formats, write_export
+
+    ads = build_fake_ads(ad_count)
+    print(f"{ad_count} publicités")
+    print(f"{'Méthode':<38} | {'Durée':>8} | {'Pic mémoire':>11} | {'Taille':>9}")
+
+    try:
+        import pandas as pd
+
+        def legacy_csv():
+            return pd.DataFrame(ads).to_csv(index=False, encoding='utf-8-sig')
+
+        csv_text, duration, peak = _measure_peak(legacy_csv)
+        print(f"{'avant : DataFrame.to_csv':<38} | {duration:>7.2f}s | {peak:>8.0f} Mo | {len(csv_text.encode()) / 1_048_576:>6.1f} Mo")
+        del csv_text
+    except ImportError:
+        print("(pandas absent : référence DataFrame.to_csv ignorée)")
+
+    json_text, duration, peak = _measure_peak(lambda: json.dumps(ads, ensure_ascii=False, indent=2))
+    print(f"{'avant : json.dumps(indent=2)':<38} | {duration:>7.2f}s | {peak:>8.0f} Mo | {len(json_text.encode()) / 1_048_576:>6.1f} Mo")
+    del json_text
+    print("  (avant : les deux à chaque affichage de la page, même sans clic)")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for fmt in available_formats():
+            path = str(Path(directory) / f"export.{fmt}")
+            # Source itérée (comme iter_entry_ads) : seul le paquet courant est en mémoire
+            _, duration, peak = _measure_peak(lambda: write_export(iter(ads), fmt, path))
+            size = Path(path).stat().st_size / 1_048_576
+            print(f"{'après : ' + fmt + ' par paquets':<38} | {duration:>7.2f}s | {peak:>8.1f} Mo | {size:>6.1f} Mo")
+    print("  (après : uniquement au clic sur « Préparer l'export »)")
+
+
+# ============================================
+# POINT D'ENTRÉE
+# ============================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks du Facebook Ads Library Scraper")
+    sub = parser.add_subparsers(dest='bench', required=True)
+
+    extraction = sub.add_parser('extraction', help="Temps d'evaluate en fonction du nombre de cartes")
+    extraction.add_argument('--html', nargs='*', help="Pages Ads Library sauvegardées (page.content())")
+
+    sub.add_parser('call-overhead', help="Coût par appel : source envoyée à chaque fois vs préinstallée")
+
+    sub.add_parser('delta', help="Volume renvoyé par la page sur un scroll profond : complet vs delta")
+
+    blacklist = sub.add_parser('blacklist', help="Filtre blacklist : ancien parcours vs matcher compilé")
+    blacklist.add_argument('--entries', type=int, default=10000, help="Nombre d'entrées en blacklist")
+    blacklist.add_argument('--ads', type=int, default=50000, help="Nombre de publicités à filtrer")
+
+    browser_pool = sub.add_parser('browser-pool', help="Lancement de Chromium par job vs pool de navigateurs")
+    browser_pool.add_argument('--jobs', type=int, default=10, help="Nombre d'unités de travail")
+
+    list_ops = sub.add_parser('list-ops', help="Ajout/retrait blacklist : remplacement complet vs incrémental")
+    list_ops.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000], help="Tailles de liste")
+
+    exports = sub.add_parser('exports', help="Téléchargements : construction en mémoire vs export par paquets")
+    exports.add_argument('--ads', type=int, default=100000, help="Nombre de publicités exportées")
+
+    args = parser.parse_args()
+
+    if args.bench == 'extraction':
+        bench_extraction(args.html)
+    elif args.bench == 'call-overhead':
+        bench_call_overhead()
+    elif args.bench == 'delta':
+        bench_delta()
+    elif args.bench == 'blacklist':
+        bench_blacklist(args.entries, args.ads)
+    elif args.bench == 'browser-pool':
+        bench_browser_pool(args.jobs)
+    elif args.bench == 'list-ops':
+        bench_list_ops(args.sizes)
+    elif args.bench == 'exports':
+        bench_exports(args.ads)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
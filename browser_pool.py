@@ -0,0 +1,203 @@
+"""
+browser_pool.py
+Pool de navigateurs Chromium réutilisés d'un job à l'autre
+
+Lancer Chromium coûte plusieurs secondes : le pool garde des navigateurs
+ouverts et fournit un contexte neuf (cookies, cache et stockage isolés)
+à chaque unité de travail (pays, mot-clé, concurrent, page).
+
+- Santé : un navigateur déconnecté ou planté n'est plus distribué
+- Recyclage : au-delà de max_age secondes ou de max_uses contextes, le
+  navigateur est retiré puis fermé dès que ses contextes sont libérés
+- Arrêt propre : close() ferme les contextes, navigateurs et Playwright
+
+Plusieurs contextes peuvent partager un même navigateur. Si aucun
+navigateur compatible n'est disponible (mode visible/invisible différent),
+un navigateur supplémentaire est lancé au-delà de la taille du pool puis
+retiré à sa libération.
+
+USAGE:
+    async with BrowserPool(size=2) as pool:
+        async with pool.context(headless=True, locale='fr-FR') as context:
+            page = await context.new_page()
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LAUNCH_ARGS = ['--disable-blink-features=AutomationControlled']
+DEFAULT_MAX_AGE = 1800  # secondes
+DEFAULT_MAX_USES = 50  # contextes par navigateur
+
+
+class _PooledBrowser:
+    """Navigateur du pool et ses compteurs"""
+
+    def __init__(self, browser, headless, retired=False):
+        self.browser = browser
+        self.headless = headless
+        self.created_at = time.time()
+        self.uses = 0
+        self.active = 0
+        self.retired = retired
+
+    def healthy(self):
+        return not self.retired and self.browser.is_connected()
+
+    def expired(self, max_age, max_uses):
+        return time.time() - self.created_at > max_age or self.uses >= max_uses
+
+
+class BrowserPool:
+    """Pool de navigateurs (API async Playwright)"""
+
+    def __init__(self, size=1, max_age=DEFAULT_MAX_AGE, max_uses=DEFAULT_MAX_USES, launch_args=None):
+        self.size = max(1, size)
+        self.max_age = max_age
+        self.max_uses = max_uses
+        self.launch_args = launch_args or DEFAULT_LAUNCH_ARGS
+        self._playwright = None
+        self._browsers = []
+        self._closed = False
+        self.launches = 0
+        self.contexts_served = 0
+        self.recycled = 0
+
+    def _pick(self, headless):
+        """
+        Choisit un navigateur pour un nouveau contexte
+
+        Returns:
+            (pooled, to_close, launch) : navigateur retenu (ou None), navigateurs
+            inactifs à fermer, et mode du lancement nécessaire le cas échéant
+            (None si pooled est fourni, sinon 'pool' ou 'extra')
+        """
+        if self._closed:
+            raise RuntimeError("Pool de navigateurs fermé")
+
+        to_close = []
+        for pooled in self._browsers:
+            if pooled.retired:
+                continue
+            if not pooled.browser.is_connected():
+                pooled.retired = True
+            elif pooled.expired(self.max_age, self.max_uses):
+                pooled.retired = True
+                self.recycled += 1
+        for pooled in [b for b in self._browsers if b.retired and b.active == 0]:
+            self._browsers.remove(pooled)
+            to_close.append(pooled)
+
+        candidates = [b for b in self._browsers if b.headless == headless and b.healthy()]
+        if candidates:
+            return min(candidates, key=lambda b: b.active), to_close, None
+
+        live = [b for b in self._browsers if not b.retired]
+        if len(live) < self.size:
+            return None, to_close, 'pool'
+        # Pool plein : un navigateur inactif de l'autre mode laisse sa place
+        idle = [b for b in live if b.active == 0]
+        if idle:
+            oldest = min(idle, key=lambda b: b.created_at)
+            self._browsers.remove(oldest)
+            to_close.append(oldest)
+            return None, to_close, 'pool'
+        return None, to_close, 'extra'
+
+    def _register(self, browser, headless, launch):
+        pooled = _PooledBrowser(browser, headless, retired=(launch == 'extra'))
+        self._browsers.append(pooled)
+        self.launches += 1
+        return pooled
+
+    def _finish_use(self, pooled):
+        """Libère un contexte ; True si le navigateur doit être fermé"""
+        pooled.active -= 1
+        pooled.uses += 1
+        if not pooled.retired and pooled.expired(self.max_age, self.max_uses):
+            pooled.retired = True
+            self.recycled += 1
+        if pooled.active == 0 and (pooled.retired or not pooled.browser.is_connected()):
+            if pooled in self._browsers:
+                self._browsers.remove(pooled)
+            return True
+        return False
+
+    def stats(self):
+        """Compteurs du pool"""
+        return {
+            'browsers': len([b for b in self._browsers if not b.retired]),
+            'active_contexts': sum(b.active for b in self._browsers),
+            'launches': self.launches,
+            'contexts_served': self.contexts_served,
+            'recycled': self.recycled,
+        }
+
+    async def start(self):
+        if self._playwright is None:
+            from playwright.async_api import async_playwright
+            # Sérialise les lancements (deux jobs simultanés ne lancent pas deux navigateurs)
+            self._lock = asyncio.Lock()
+            self._playwright = await async_playwright().start()
+        return self
+
+    async def _close_browser(self, pooled):
+        try:
+            await pooled.browser.close()
+        except Exception as e:
+            logger.debug(f"Fermeture navigateur ignorée : {e}")
+
+    async def _acquire(self, headless):
+        await self.start()
+        async with self._lock:
+            pooled, to_close, launch = self._pick(headless)
+            for stale in to_close:
+                await self._close_browser(stale)
+            if pooled is None:
+                browser = await self._playwright.chromium.launch(headless=headless, args=self.launch_args)
+                pooled = self._register(browser, headless, launch)
+                logger.info(f"Navigateur lancé (headless={headless}, pool={len(self._browsers)}/{self.size})")
+            pooled.active += 1
+            self.contexts_served += 1
+            return pooled
+
+    @asynccontextmanager
+    async def context(self, headless=True, **context_options):
+        """Contexte neuf sur un navigateur du pool, fermé en sortie de bloc"""
+        pooled = await self._acquire(headless)
+        context = None
+        try:
+            context = await pooled.browser.new_context(**context_options)
+            yield context
+        except Exception:
+            if not pooled.browser.is_connected():
+                pooled.retired = True
+            raise
+        finally:
+            if context is not None:
+                try:
+                    await context.close()
+                except Exception:
+                    pass
+            if self._finish_use(pooled):
+                await self._close_browser(pooled)
+
+    async def close(self):
+        """Ferme tous les navigateurs et arrête Playwright"""
+        self._closed = True
+        browsers, self._browsers = self._browsers, []
+        for pooled in browsers:
+            await self._close_browser(pooled)
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
@@ -2,8 +2,33 @@
 competitive_job.py
 Script autonome de veille concurrentielle
 Fonctionne indépendamment de Streamlit
+
+Les concurrents de la whitelist sont placés dans une file, vidée par
+plusieurs workers qui partagent un même navigateur (un contexte chacun).
+Le rythme global est tenu par un budget de requêtes commun à tous les
+workers (intervalle minimal entre deux requêtes) au lieu d'une longue
+pause entre chaque concurrent. Tous les résultats vont dans le même
+rapport ; competitive_status.json détaille l'état de chaque worker.
+
+Le rapport est enregistré en deux parties : un en-tête (compteurs,
+erreurs) réécrit après chaque concurrent, et les publicités, ajoutées
+sans jamais réécrire les précédentes.
+
+Chaque concurrent est une tâche enregistrée (état, tentatives, dernière
+erreur) : une veille relancée après un arrêt reprend le rapport en cours
+là où il s'était arrêté, et les échecs sont retentés avec un délai
+croissant.
+
+Chaque concurrent a un repère (publicités déjà collectées, cf.
+watermarks.py) : le scroll s'arrête après une série de publicités déjà
+connues et le rapport marque chaque publicité 'new' ou 'seen'.
+
+Clés de config.json :
+- competitive_workers : nombre de workers (défaut 3)
+- competitive_min_interval : intervalle minimal entre deux requêtes (secondes)
 """
 
+import asyncio
 import json
 import os
 import sys
@@ -13,17 +38,25 @@ import logging
 from datetime import datetime, timedelta
 from pathlib import Path
 
-# Utiliser playwright en mode synchrone
-from playwright.sync_api import sync_playwright
+# Playwright en mode async, un navigateur partagé par les workers via le pool
+from browser_pool import BrowserPool
+
+from ads_extractor import install_extractor, drain_ads
+from resource_policy import ResourceBlocker, resolve_policy
+from pacing import PacingBudget, WaitController
+from storage import (
+    load_whitelist, load_reports, save_report_header, append_report_ads,
+    load_report_tasks, save_report_tasks, load_watermarks, save_watermark
+)
+from watermarks import KNOWN_RUN_STOP, KnownRun, empty_watermark, tag_ads, update_watermark
 
 # ============================================
 # CONFIGURATION
 # ============================================
 
-WHITELIST_FILE = "whitelist.json"
-DAILY_REPORT_FILE = "daily_competitive_reports.json"
 STATUS_FILE = "competitive_status.json"
 LOG_FILE = "competitive_job.log"
+CONFIG_FILE = "config.json"
 
 # Configuration du logging
 logging.basicConfig(
@@ -43,14 +76,30 @@ SCRAPING_CONFIG = {
     'pause_max': 10,
     'max_ads': 100,
     'max_time': 5,  # minutes
-    'pause_between_competitors_min': 30,  # 30 secondes
-    'pause_between_competitors_max': 180,  # 3 minutes
+    'workers': 3,  # concurrents scannés en même temps
+    'global_min_interval': 5,  # secondes entre deux requêtes, tous workers confondus
+    'known_ads_stop': KNOWN_RUN_STOP,  # pubs déjà connues d'affilée avant l'arrêt du scroll
+    'max_attempts': 3,  # tentatives par concurrent
+    'retry_backoff': 60,  # secondes avant la 2e tentative, doublées ensuite
+    'resume_max_age': 24,  # heures : au-delà, un rapport interrompu n'est pas repris
+    'resource_policy': None,  # None = valeur de config.json
 }
 
 # ============================================
 # FONCTIONS UTILITAIRES
 # ============================================
 
+def create_browser_pool():
+    """Pool de navigateurs de la veille (un navigateur partagé par tous les workers)"""
+    return BrowserPool(
+        size=1,
+        launch_args=[
+            '--disable-blink-features=AutomationControlled',
+            '--disable-dev-shm-usage',
+            '--no-sandbox'
+        ]
+    )
+
 def load_json(filename, default=None):
     """Charge un fichier JSON"""
     if os.path.exists(filename):
@@ -74,6 +123,18 @@ def save_json(filename, data):
         return False
 
 
+def load_job_config():
+    """SCRAPING_CONFIG complétée par les réglages de config.json"""
+    config = dict(SCRAPING_CONFIG)
+    app_config = load_json(CONFIG_FILE, {})
+    if app_config.get('competitive_workers'):
+        config['workers'] = int(app_config['competitive_workers'])
+    if app_config.get('competitive_min_interval') is not None:
+        config['global_min_interval'] = float(app_config['competitive_min_interval'])
+    config['workers'] = max(1, config['workers'])
+    return config
+
+
 def update_status(status_data):
     """Met à jour le fichier de statut pour Streamlit"""
     status_data['last_update'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
@@ -91,45 +152,59 @@ def clear_status():
 # ============================================
 
 class CompetitiveIntelligenceScraper:
-    def __init__(self, config):
+    def __init__(self, config, pool=None, pacing=None, on_progress=None, watermark=None):
         self.config = config
+        # Pool partagé entre workers (None : un navigateur par appel)
+        self.pool = pool
+        # Budget de requêtes commun à tous les workers (None : pauses seules)
+        self.pacing = pacing
+        # Appelée avec le nombre de pubs collectées après chaque extraction
+        self.on_progress = on_progress
+        # Repère du concurrent (None : pas d'arrêt sur les pubs connues)
+        self.watermark = watermark
         self.ads_data = []
+        self.seen_ids = set()
         self.request_count = 0
+        self.resource_blocker = ResourceBlocker(resolve_policy(config))
         self.start_time = None
     
-    def scrape_competitor(self, page_id, page_name, date_filter):
+    async def _request_slot(self):
+        """Attend le créneau du budget partagé avant une requête"""
+        if self.pacing:
+            await self.pacing.acquire()
+    
+    async def scrape_competitor(self, page_id, page_name, date_filter):
         """Scrappe un concurrent spécifique"""
         
-        # ✅ FIX: Forcer l'utilisation du bon protocole AVANT de lancer Playwright
-        import asyncio
-        if sys.platform == 'win32':
-            # Forcer l'utilisation de ProactorEventLoop qui supporte mieux les subprocesses sur Windows
-            asyncio.set_event_loop(asyncio.ProactorEventLoop())
+        if self.pool is None:
+            async with create_browser_pool() as pool:
+                self.pool = pool
+                try:
+                    return await self.scrape_competitor(page_id, page_name, date_filter)
+                finally:
+                    self.pool = None
         
-        with sync_playwright() as p:
-            browser = p.chromium.launch(
-                headless=self.config['headless'],
-                args=[
-                    '--disable-blink-features=AutomationControlled',
-                    '--disable-dev-shm-usage',
-                    '--no-sandbox'
-                ]
-            )
+        # Navigateur du pool, contexte neuf (fermé en sortie de bloc)
+        async with self.pool.context(
+            headless=self.config['headless'],
+            viewport={'width': 1920, 'height': 1080},
+            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+            locale='fr-FR'
+        ) as context:
+            await self.resource_blocker.install(context)
             
-            context = browser.new_context(
-                viewport={'width': 1920, 'height': 1080},
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                locale='fr-FR'
-            )
+            page = await context.new_page()
             
-            page = context.new_page()
-            
-            page.add_init_script("""
+            await page.add_init_script("""
                 Object.defineProperty(navigator, 'webdriver', {
                     get: () => false
                 });
             """)
             
+            # Bibliothèque d'extraction partagée avec le scraper principal
+            await install_extractor(page)
+            waiter = WaitController(page, floor=1.0)
+            
             # Construction de l'URL
             #       https://web.facebook.com/ads/library/?active_status=active&ad_type=all&country=ALL&is_targeted_country=false&media_type=all&search_type=page&view_all_page_id=734097606445876
             url = f"https://web.facebook.com/ads/library/?active_status=active&ad_type=all&country=ALL&is_targeted_country=false&media_type=all&search_type=page"
@@ -140,13 +215,14 @@ class CompetitiveIntelligenceScraper:
             logger.info(f"Navigation vers: {url}")
             
             try:
-                page.goto(url, wait_until="domcontentloaded", timeout=90000)
-                time.sleep(8)
-                page.evaluate("window.scrollTo(0, 1000)")
-                time.sleep(5)
+                await self._request_slot()
+                await page.goto(url, wait_until="domcontentloaded", timeout=90000)
+                # Jusqu'à 8s puis 5s, écourtées dès que les premières cartes arrivent
+                await waiter.wait(8)
+                await page.evaluate("window.scrollTo(0, 1000)")
+                await waiter.wait(5)
             except Exception as e:
                 logger.error(f"Erreur chargement page pour {page_name}: {e}")
-                browser.close()
                 raise
             
             self.start_time = time.time()
@@ -155,6 +231,7 @@ class CompetitiveIntelligenceScraper:
             scroll_attempts = 0
             max_ads = self.config['max_ads']
             max_time = self.config['max_time'] * 60
+            known_run = KnownRun(self.watermark, self.config.get('known_ads_stop', KNOWN_RUN_STOP))
             
             while len(self.ads_data) < max_ads:
                 elapsed = time.time() - self.start_time
@@ -163,14 +240,21 @@ class CompetitiveIntelligenceScraper:
                     break
                 
                 # Extraire les pubs
-                self._extract_ads_from_page(page)
+                new_ads = await self._extract_ads_from_page(page)
                 self.request_count += 1
                 scroll_attempts += 1
                 
                 current_count = len(self.ads_data)
+                if self.on_progress:
+                    self.on_progress(current_count)
                 
                 logger.info(f"{page_name}: {current_count} pubs | {int(elapsed)}s | {scroll_attempts} scrolls")
                 
+                # Série de pubs déjà collectées lors des veilles précédentes : la suite est connue
+                if known_run.add(new_ads):
+                    logger.info(f"{known_run.run} pubs déjà connues d'affilée pour {page_name} : arrêt")
+                    break
+                
                 # Vérifier si on trouve de nouvelles pubs
                 if current_count == last_count:
                     consecutive_same_count += 1
@@ -182,19 +266,20 @@ class CompetitiveIntelligenceScraper:
                 
                 last_count = current_count
                 
-                # Scroll
+                # Scroll (le chargement de la suite du fil est une requête)
+                await self._request_slot()
                 scroll_amount = random.randint(800, 1500) if consecutive_same_count == 0 else random.randint(1500, 2500)
-                page.evaluate(f"window.scrollBy(0, {scroll_amount})")
+                await page.evaluate(f"window.scrollBy(0, {scroll_amount})")
                 
                 # Pause
                 pause_duration = random.uniform(
                     self.config['pause_min'],
                     self.config['pause_max']
                 )
-                time.sleep(pause_duration)
+                await waiter.wait(pause_duration, floor=self.config.get('wait_floor', self.config['pause_min']))
                 
                 # Vérifier si bas de page atteint
-                is_at_bottom = page.evaluate("""
+                is_at_bottom = await page.evaluate("""
                     () => {
                         return (window.innerHeight + window.scrollY) >= document.body.offsetHeight - 100;
                     }
@@ -204,214 +289,356 @@ class CompetitiveIntelligenceScraper:
                     logger.info(f"Bas de page atteint pour {page_name}")
                     break
             
-            browser.close()
-            
             logger.info(f"Scraping terminé pour {page_name}: {len(self.ads_data)} publicités")
+            logger.info(f"{page_name} - {self.resource_blocker.summary()}")
+            logger.info(f"{page_name} - {waiter.summary()}")
             return self.ads_data
     
-    def _extract_ads_from_page(self, page):
-        """Extrait les publicités de la page - VERSION SYNCHRONE"""
-        new_ads = page.evaluate('''() => {
-            const ads = [];
-            const processedIds = new Set();
-            
-            const allDivs = document.querySelectorAll('div');
+    async def _extract_ads_from_page(self, page):
+        """Extrait les nouvelles publicités de la page ; retourne celles ajoutées"""
+        # La page ne renvoie que les cartes dont l'ID n'a jamais été vu
+        new_ads = await drain_ads(page, country='ALL', search_term='Concurrent')
+        
+        # Filet de sécurité (ex. page rechargée : l'extracteur repart de zéro)
+        added = []
+        for ad in new_ads:
+            if ad['ad_id'] not in self.seen_ids:
+                self.seen_ids.add(ad['ad_id'])
+                added.append(ad)
+        self.ads_data.extend(added)
+        return added
+
+
+# ============================================
+# TÂCHES DE LA VEILLE (REPRISE APRÈS ARRÊT)
+# ============================================
+
+# États d'une tâche (une par concurrent et par rapport)
+TASK_PENDING = 'pending'
+TASK_RUNNING = 'running'
+TASK_DONE = 'done'
+TASK_FAILED = 'failed'
+
+
+def now_str():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def new_tasks(report_id, whitelist):
+    """Une tâche en attente par concurrent de la whitelist (doublons ignorés)"""
+    tasks = {}
+    for competitor in whitelist:
+        competitor_id = str(competitor.get('id_page', 'N/A'))
+        if competitor_id not in tasks:
+            tasks[competitor_id] = {
+                'report_id': report_id,
+                'competitor_id': competitor_id,
+                'competitor_name': competitor.get('nom_page', 'N/A'),
+                'position': len(tasks),
+                'state': TASK_PENDING,
+                'attempts': 0,
+                'last_error': None,
+                'next_attempt_at': None,
+                'updated_at': now_str(),
+            }
+    return list(tasks.values())
+
+
+def retry_delay(attempts, config):
+    """Délai avant une nouvelle tentative : doublé à chaque échec, ±20 %"""
+    return config['retry_backoff'] * 2 ** (attempts - 1) * random.uniform(0.8, 1.2)
+
+
+def find_current_report(config):
+    """
+    Rapport en cours à reprendre (None : nouvelle veille)
+
+    Un rapport resté 'in_progress' plus de resume_max_age heures n'est pas
+    repris : il est marqué 'interrupted'.
+    """
+    for header in load_reports():
+        if header.get('status') != 'in_progress':
+            continue
+        try:
+            started = datetime.strptime(header['date'], '%Y-%m-%d %H:%M:%S')
+        except (KeyError, TypeError, ValueError):
+            started = None
+        if started and datetime.now() - started <= timedelta(hours=config['resume_max_age']):
+            return header
+        header['status'] = 'interrupted'
+        save_report_header(header)
+        logger.info(f"Rapport {header['id']} trop ancien pour être repris : marqué interrompu")
+    return None
+
+
+class CompetitiveRun:
+    """
+    Rapport, tâches et statut d'une veille partagés par les workers
+
+    Les workers tournent dans la même boucle asyncio : les mises à jour
+    du rapport se font entre deux await, sans verrou. Chaque changement
+    d'état d'une tâche est enregistré aussitôt (reprise après un arrêt).
+    """
+
+    def __init__(self, report, tasks, workers, config, watermarks=None):
+        self.report = report
+        self.report.setdefault('new_count', 0)
+        self.report.setdefault('errors', [])
+        self.tasks = tasks
+        self.config = config
+        # Repères des concurrents par page_id, chargés au démarrage
+        self.watermarks = watermarks or {}
+        self.total_competitors = len(tasks)
+        # État de chaque worker, recopié dans competitive_status.json
+        self.workers = [
+            {'worker': index, 'state': 'idle', 'competitor': '', 'ads': 0, 'scanned': 0}
+            for index in range(1, workers + 1)
+        ]
+        self._recover_interrupted()
+
+    def _recover_interrupted(self):
+        """Tâches 'running' d'une veille arrêtée en cours : tentative échouée"""
+        interrupted = [task for task in self.tasks if task['state'] == TASK_RUNNING]
+        for task in interrupted:
+            task.update(state=TASK_FAILED, last_error="Veille interrompue", next_attempt_at=None, updated_at=now_str())
+            if not self._can_retry(task):
+                self._record_error(task)
+        if interrupted:
+            save_report_tasks(interrupted)
+            logger.info(f"{len(interrupted)} concurrent(s) interrompu(s) lors de la veille précédente")
+
+    def _can_retry(self, task):
+        return task['attempts'] < self.config['max_attempts']
+
+    @property
+    def done(self):
+        """Concurrents terminés : réussis, ou en échec sans nouvelle tentative"""
+        return sum(
+            1 for task in self.tasks
+            if task['state'] == TASK_DONE or (task['state'] == TASK_FAILED and not self._can_retry(task))
+        )
+
+    def remaining_tasks(self):
+        """Tâches encore à traiter (en attente, ou en échec avec des tentatives restantes)"""
+        return [
+            task for task in self.tasks
+            if task['state'] == TASK_PENDING or (task['state'] == TASK_FAILED and self._can_retry(task))
+        ]
+
+    def ready_tasks(self):
+        """Tâches à traiter maintenant (délai de nouvelle tentative écoulé)"""
+        now = now_str()
+        return [task for task in self.remaining_tasks() if (task['next_attempt_at'] or '') <= now]
+
+    def seconds_to_next_retry(self):
+        upcoming = [task['next_attempt_at'] for task in self.remaining_tasks() if task['next_attempt_at']]
+        if not upcoming:
+            return 0
+        next_at = datetime.strptime(min(upcoming), '%Y-%m-%d %H:%M:%S')
+        return max(0.0, (next_at - datetime.now()).total_seconds())
+
+    def publish_status(self, message=None, status='running'):
+        """Écrit competitive_status.json (progression globale et par worker)"""
+        active = [w['competitor'] for w in self.workers if w['state'] == 'scraping']
+        done = self.done
+        progress_percent = int(done / self.total_competitors * 100) if self.total_competitors else 100
+        update_status({
+            'status': status,
+            'current_competitor': ', '.join(active),
+            'competitor_index': done,
+            'total_competitors': self.total_competitors,
+            'progress_percent': progress_percent,
+            'message': message or f"Analyse {done}/{self.total_competitors} ({len(active)} en cours)",
+            'results_count': self.report['results_count'],
+            'new_count': self.report['new_count'],
+            'workers': self.workers
+        })
+
+    def start_task(self, worker_id, task):
+        """La tentative est comptée dès le démarrage (un plantage compte comme un échec)"""
+        task.update(state=TASK_RUNNING, attempts=task['attempts'] + 1, updated_at=now_str())
+        save_report_tasks([task])
+        worker = self.workers[worker_id - 1]
+        worker.update(state='scraping', competitor=task['competitor_name'], ads=0)
+        self.publish_status()
+
+    def competitor_progress(self, worker_id, ads_count):
+        self.workers[worker_id - 1]['ads'] = ads_count
+        self.publish_status()
+
+    def watermark(self, competitor_id):
+        return self.watermarks.get(str(competitor_id)) or empty_watermark(competitor_id)
+
+    def add_results(self, worker_id, task, competitor_results):
+        """
+        Ajoute les pubs d'un concurrent au rapport (marquées 'new' / 'seen')
+        puis sauvegarde la tâche et l'en-tête ; complète ensuite le repère du concurrent
+
+        Returns:
+            Nombre de nouvelles publicités
+        """
+        watermark = self.watermark(task['competitor_id'])
+        new_count = tag_ads(competitor_results, watermark)
+        # Seules les nouvelles lignes sont écrites (les publicités déjà enregistrées ne sont pas renvoyées)
+        append_report_ads(self.report['id'], competitor_results)
+        self.report['results_count'] += len(competitor_results)
+        self.report['new_count'] += new_count
+
+        task.update(state=TASK_DONE, last_error=None, next_attempt_at=None, updated_at=now_str())
+        self._finish_task(worker_id, task)
+
+        # Repère enregistré une fois la tâche terminée : un arrêt entre les deux
+        # ferait sinon reprendre la tâche avec ses nouvelles publicités déjà marquées 'seen'
+        watermark = update_watermark(watermark, competitor_results)
+        self.watermarks[watermark['page_id']] = watermark
+        save_watermark(watermark)
+        return new_count
+
+    def fail_task(self, worker_id, task, error):
+        """Échec d'une tentative : nouvelle tentative différée, ou erreur définitive dans le rapport"""
+        task.update(state=TASK_FAILED, last_error=str(error), updated_at=now_str())
+        if self._can_retry(task):
+            delay = retry_delay(task['attempts'], self.config)
+            task['next_attempt_at'] = (datetime.now() + timedelta(seconds=delay)).strftime('%Y-%m-%d %H:%M:%S')
+            logger.info(f"Nouvelle tentative pour {task['competitor_name']} dans {int(delay)}s "
+                        f"({task['attempts']}/{self.config['max_attempts']})")
+        else:
+            task['next_attempt_at'] = None
+            self._record_error(task)
+        self._finish_task(worker_id, task)
+
+    def _record_error(self, task):
+        self.report['errors'].append({
+            'competitor': task['competitor_name'],
+            'error': task['last_error'],
+            'attempts': task['attempts'],
+            'timestamp': now_str()
+        })
+
+    def _finish_task(self, worker_id, task):
+        worker = self.workers[worker_id - 1]
+        worker.update(state='idle', competitor='')
+        worker['scanned'] += 1
+        self.report['competitors_scanned'] = self.done
+        # Sauvegarder immédiatement (même en cas d'erreur)
+        save_report_tasks([task])
+        save_report_header(self.report)
+        self.publish_status()
+
+    def stop_worker(self, worker_id):
+        self.workers[worker_id - 1].update(state='done', competitor='')
+        self.publish_status()
+
+
+async def competitor_worker(worker_id, queue, run, pool, pacing, config, date_filter):
+    """Traite les tâches de la file jusqu'à ce qu'elle soit vide"""
+    report_date = run.report['date']
+    while True:
+        try:
+            task = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            break
+        
+        competitor_name = task['competitor_name']
+        competitor_id = task['competitor_id']
+        
+        logger.info(f"[Worker {worker_id}] CONCURRENT: {competitor_name} "
+                    f"(tentative {task['attempts'] + 1}, {queue.qsize()} en attente)")
+        run.start_task(worker_id, task)
+        
+        try:
+            scraper = CompetitiveIntelligenceScraper(
+                config,
+                pool=pool,
+                pacing=pacing,
+                on_progress=lambda count: run.competitor_progress(worker_id, count),
+                watermark=run.watermark(competitor_id)
+            )
+            competitor_results = await scraper.scrape_competitor(
+                competitor_id,
+                competitor_name,
+                date_filter
+            )
             
-            allDivs.forEach(div => {
-                const text = div.innerText || '';
-                
-                if (text.includes('ID dans la bibliothèque') || text.includes('Library ID')) {
-                    const idMatch = text.match(/ID dans la bibliothèque[\\s:]*([0-9]+)/i) ||
-                                  text.match(/Library ID[\\s:]*([0-9]+)/i);
-                    
-                    if (!idMatch) return;
-                    
-                    const adId = idMatch[1];
-                    if (processedIds.has(adId)) return;
-                    processedIds.add(adId);
-                    
-                    const adLibraryUrl = `https://www.facebook.com/ads/library/?id=${adId}`;
-                    
-                    let advertiser = 'N/A';
-                    let pageId = 'N/A';
-                    
-                    const pageLinks = div.querySelectorAll('a[href*="facebook.com/"]');
-                    for (let link of pageLinks) {
-                        const linkText = link.innerText.trim();
-                        const href = link.href;
-                        
-                        if (linkText && !linkText.includes('Sponsorisé') && 
-                            !linkText.includes('Sponsored') &&
-                            linkText.length < 100 && linkText.length > 2) {
-                            advertiser = linkText;
-                            
-                            const pageIdMatch = href.match(/facebook\\.com\\/(\\d+)/);
-                            if (pageIdMatch) {
-                                pageId = pageIdMatch[1];
-                            }
-                            break;
-                        }
-                    }
-                    
-                    let adStatus = 'Active';
-                    const statusText = text.toLowerCase();
-                    if (statusText.includes('inactive') || statusText.includes('plus diffusée')) {
-                        adStatus = 'Inactive';
-                    }
-                    
-                    let startDate = 'N/A';
-                    const dateMatch = text.match(/Début de la diffusion le ([^·]+)/i) ||
-                                    text.match(/Started running on ([^·]+)/i) ||
-                                    text.match(/(\\d{1,2}\\s+[a-zéû]+\\s+\\d{4})/i);
-                    if (dateMatch) {
-                        startDate = dateMatch[1].trim();
-                    }
-                    
-                    let platforms = 'N/A';
-                    if (text.includes('Plateformes') || text.includes('Platforms')) {
-                        platforms = 'Multiple';
-                    }
-                    
-                    let adText = 'N/A';
-                    const sponsoredIndex = text.indexOf('Sponsorisé');
-                    if (sponsoredIndex !== -1) {
-                        const afterSponsored = text.substring(sponsoredIndex + 10);
-                        const lines = afterSponsored.split('\\n').filter(l => l.trim().length > 20);
-                        if (lines.length > 0) {
-                            adText = lines[0].substring(0, 500);
-                        }
-                    }
-                    
-                    const allImages = div.querySelectorAll('img[src*="scontent"]');
-                    let mediaUrl = 'N/A';
-                    let mediaType = 'N/A';
-                    
-                    let largestImage = null;
-                    let maxSize = 0;
-                    
-                    allImages.forEach(img => {
-                        const width = img.naturalWidth || img.width || 0;
-                        const height = img.naturalHeight || img.height || 0;
-                        const size = width * height;
-                        
-                        if (size > maxSize && width > 100 && height > 100) {
-                            maxSize = size;
-                            largestImage = img;
-                        }
-                    });
-                    
-                    const videos = div.querySelectorAll('video[src]');
-                    
-                    if (videos.length > 0) {
-                        mediaUrl = videos[0].src;
-                        mediaType = 'video';
-                    } else if (largestImage) {
-                        mediaUrl = largestImage.src;
-                        mediaType = 'image';
-                    }
-                    
-                    let ctaUrl = 'N/A';
-                    let ctaText = 'N/A';
-                    
-                    const ctaLinks = div.querySelectorAll('a[href*="l.facebook.com"], a[role="button"]');
-                    
-                    for (let link of ctaLinks) {
-                        const linkText = link.innerText.trim();
-                        
-                        if (linkText && linkText.length < 50 && linkText.length > 2) {
-                            const lowerText = linkText.toLowerCase();
-                            
-                            const ctaKeywords = [
-                                'en savoir plus', 'commander', 'acheter', 'réserver',
-                                'télécharger', 'essayer', 'découvrir', 'profiter',
-                                'voir plus', 's\\'inscrire', 'obtenir', 'contacter',
-                                'shop now', 'learn more', 'buy now', 'sign up',
-                                'get', 'download', 'book', 'order'
-                            ];
-                            
-                            const isCta = ctaKeywords.some(keyword => lowerText.includes(keyword));
-                            
-                            if (isCta) {
-                                ctaText = linkText;
-                                if (link.href && link.href.includes('l.facebook.com')) {
-                                    ctaUrl = link.href;
-                                }
-                                break;
-                            }
-                        }
-                    }
-                    
-                    ads.push({
-                        ad_id: adId,
-                        page_id: pageId,
-                        advertiser: advertiser,
-                        country: 'ALL',
-                        ad_status: adStatus,
-                        search_term: 'Concurrent',
-                        text: adText.trim(),
-                        start_date: startDate,
-                        platforms: platforms,
-                        media_type: mediaType,
-                        media_url: mediaUrl,
-                        cta_text: ctaText,
-                        cta_url: ctaUrl,
-                        ad_library_url: adLibraryUrl,
-                        scraped_at: new Date().toISOString()
-                    });
-                }
-            });
+            # Ajouter les métadonnées
+            for result in competitor_results:
+                result['competitor_name'] = competitor_name
+                result['competitor_id'] = competitor_id
+                result['scan_date'] = report_date
             
-            return ads;
-        }''')
+            new_count = run.add_results(worker_id, task, competitor_results)
+            logger.info(f"[OK] {len(competitor_results)} publicités trouvées pour {competitor_name} ({new_count} nouvelles)")
         
-        # Filtrer les doublons
-        existing_ids = {ad['ad_id'] for ad in self.ads_data}
+        except Exception as e:
+            logger.error(f"Erreur pour {competitor_name}: {str(e)}")
+            run.fail_task(worker_id, task, e)
         
-        for ad in new_ads:
-            if ad['ad_id'] not in existing_ids:
-                self.ads_data.append(ad)
+        finally:
+            queue.task_done()
+    
+    run.stop_worker(worker_id)
 
 
 # ============================================
-# FONCTION PRINCIPALE - VERSION SYNCHRONE
+# FONCTION PRINCIPALE
 # ============================================
 
-def run_competitive_intelligence():
-    """Exécute la veille concurrentielle - VERSION SYNCHRONE"""
-    logger.info("=" * 60)
-    logger.info("DEMARRAGE DE LA VEILLE CONCURRENTIELLE")
-    logger.info("=" * 60)
+def open_report(config):
+    """
+    Rapport de la veille et ses tâches : rapport en cours repris s'il y en
+    a un, sinon nouveau rapport pour toute la whitelist
+
+    Returns:
+        (rapport, tâches), ou (None, None) si la whitelist est vide
+    """
+    report = find_current_report(config)
+    if report is not None:
+        tasks = load_report_tasks(report['id'])
+        if tasks:
+            logger.info(f"Reprise du rapport {report['id']} du {report['date']}")
+            return report, tasks
     
     # Charger la whitelist
-    whitelist = load_json(WHITELIST_FILE, [])
-    
+    whitelist = load_whitelist()
     if not whitelist:
-        logger.warning("Aucun concurrent dans la whitelist")
-        update_status({
-            'status': 'error',
-            'message': 'Aucun concurrent dans la whitelist',
-            'progress_percent': 0
-        })
-        return
+        return None, None
     
     # Créer le rapport
-    report_id = datetime.now().strftime('%Y%m%d_%H%M%S')
-    report_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    
     report = {
-        'id': report_id,
-        'date': report_date,
+        'id': datetime.now().strftime('%Y%m%d_%H%M%S'),
+        'date': now_str(),
         'competitors_scanned': 0,
         'results_count': 0,
-        'results': [],
+        'new_count': 0,
         'status': 'in_progress',
         'errors': []
     }
+    tasks = new_tasks(report['id'], whitelist)
+    
+    # Sauvegarder le rapport initial et ses tâches
+    save_report_header(report)
+    save_report_tasks(tasks)
+    return report, tasks
+
+
+async def run_competitive_intelligence_async(config=None):
+    """Exécute (ou reprend) la veille concurrentielle, workers en parallèle"""
+    config = config or load_job_config()
+    
+    logger.info("=" * 60)
+    logger.info("DEMARRAGE DE LA VEILLE CONCURRENTIELLE")
+    logger.info("=" * 60)
     
-    # Sauvegarder le rapport initial
-    reports = load_json(DAILY_REPORT_FILE, [])
-    reports.insert(0, report)
-    save_json(DAILY_REPORT_FILE, reports)
+    report, tasks = open_report(config)
+    
+    if report is None:
+        logger.warning("Aucun concurrent dans la whitelist")
+        update_status({
+            'status': 'error',
+            'message': 'Aucun concurrent dans la whitelist',
+            'progress_percent': 0
+        })
+        return
     
     # Calculer les dates (aujourd'hui et 3 jours avant)
     today = datetime.now().date()
@@ -422,144 +649,60 @@ def run_competitive_intelligence():
         'date2': today.strftime('%Y-%m-%d')
     }
     
-    total_competitors = len(whitelist)
-    logger.info(f"Nombre de concurrents à scanner: {total_competitors}")
-    
-    # Statut initial
-    update_status({
-        'status': 'running',
-        'current_competitor': '',
-        'competitor_index': 0,
-        'total_competitors': total_competitors,
-        'progress_percent': 0,
-        'message': 'Démarrage de la veille...',
-        'results_count': 0
-    })
+    workers = min(config['workers'], len(tasks))
+    run = CompetitiveRun(report, tasks, workers, config, watermarks=load_watermarks())
+    logger.info(f"Nombre de concurrents à scanner: {len(run.remaining_tasks())}/{run.total_competitors} ({workers} workers)")
+    run.publish_status('Démarrage de la veille...')
     
-    # Scanner chaque concurrent
-    for index, competitor in enumerate(whitelist, start=1):
-        competitor_name = competitor.get('nom_page', 'N/A')
-        competitor_id = competitor.get('id_page', 'N/A')
-        
-        logger.info(f"\n{'='*60}")
-        logger.info(f"CONCURRENT {index}/{total_competitors}: {competitor_name}")
-        logger.info(f"{'='*60}")
-        
-        progress_percent = ((index - 1) / total_competitors) * 100
-        
-        update_status({
-            'status': 'running',
-            'current_competitor': competitor_name,
-            'competitor_index': index,
-            'total_competitors': total_competitors,
-            'progress_percent': int(progress_percent),
-            'message': f'Analyse {index}/{total_competitors}: {competitor_name}',
-            'results_count': report['results_count']
-        })
-        
-        try:
-            # Créer le scraper
-            scraper = CompetitiveIntelligenceScraper(SCRAPING_CONFIG)
-            
-            # Lancer le scraping - VERSION SYNCHRONE
-            competitor_results = scraper.scrape_competitor(
-                competitor_id,
-                competitor_name,
-                date_filter
-            )
-            
-            # Ajouter les métadonnées
-            for result in competitor_results:
-                result['competitor_name'] = competitor_name
-                result['competitor_id'] = competitor_id
-                result['scan_date'] = report_date
+    # Un navigateur pour toute la veille, un budget de requêtes pour tous les workers
+    pacing = PacingBudget(config['global_min_interval'])
+    async with create_browser_pool() as pool:
+        # Un passage par vague : les échecs reviennent dans une vague suivante, après leur délai
+        while run.remaining_tasks():
+            ready = run.ready_tasks()
+            if not ready:
+                delay = run.seconds_to_next_retry()
+                run.publish_status(f"Nouvelle tentative dans {int(delay)}s")
+                await asyncio.sleep(delay)
+                continue
             
-            # Mettre à jour le rapport
-            report['results'].extend(competitor_results)
-            report['results_count'] = len(report['results'])
-            report['competitors_scanned'] = index
-            
-            # Sauvegarder immédiatement
-            reports = load_json(DAILY_REPORT_FILE, [])
-            for i, r in enumerate(reports):
-                if r['id'] == report_id:
-                    reports[i] = report
-                    break
-            save_json(DAILY_REPORT_FILE, reports)
-            
-            logger.info(f"[OK] {len(competitor_results)} publicités trouvées pour {competitor_name}")
-            
-            # Pause entre concurrents
-            if index < total_competitors:
-                pause_duration = random.uniform(
-                    SCRAPING_CONFIG['pause_between_competitors_min'],
-                    SCRAPING_CONFIG['pause_between_competitors_max']
-                )
-                
-                logger.info(f"Pause de {int(pause_duration/60)} minutes avant le prochain concurrent")
-                
-                update_status({
-                    'status': 'running',
-                    'current_competitor': competitor_name,
-                    'competitor_index': index,
-                    'total_competitors': total_competitors,
-                    'progress_percent': int(progress_percent),
-                    'message': f"Pause {int(pause_duration/60)} min avant prochain concurrent",
-                    'results_count': report['results_count']
-                })
-                
-                time.sleep(pause_duration)
-        
-        except Exception as e:
-            error_msg = f"Erreur pour {competitor_name}: {str(e)}"
-            logger.error(error_msg)
-            
-            report['errors'].append({
-                'competitor': competitor_name,
-                'error': str(e),
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            })
-            
-            # Sauvegarder même en cas d'erreur
-            reports = load_json(DAILY_REPORT_FILE, [])
-            for i, r in enumerate(reports):
-                if r['id'] == report_id:
-                    reports[i] = report
-                    break
-            save_json(DAILY_REPORT_FILE, reports)
+            queue = asyncio.Queue()
+            for task in ready:
+                queue.put_nowait(task)
+            await asyncio.gather(*[
+                competitor_worker(worker_id, queue, run, pool, pacing, config, date_filter)
+                for worker_id in range(1, min(workers, len(ready)) + 1)
+            ])
+    
+    logger.info(f"Budget de requêtes : {pacing.requests} requêtes, {pacing.waited:.0f}s d'attente")
     
     # Finaliser le rapport
     report['status'] = 'completed'
-    reports = load_json(DAILY_REPORT_FILE, [])
-    for i, r in enumerate(reports):
-        if r['id'] == report_id:
-            reports[i] = report
-            break
-    save_json(DAILY_REPORT_FILE, reports)
+    report['competitors_scanned'] = run.done
+    save_report_header(report)
     
     # Statut final
-    update_status({
-        'status': 'completed',
-        'current_competitor': '',
-        'competitor_index': total_competitors,
-        'total_competitors': total_competitors,
-        'progress_percent': 100,
-        'message': f"Veille terminée ! {report['results_count']} publicités trouvées",
-        'results_count': report['results_count']
-    })
+    run.publish_status(
+        f"Veille terminée ! {report['results_count']} publicités trouvées, dont {report['new_count']} nouvelles",
+        status='completed'
+    )
     
     logger.info("=" * 60)
     logger.info(f"VEILLE TERMINEE: {report['results_count']} publicités trouvées")
     logger.info("=" * 60)
 
 
+def run_competitive_intelligence():
+    """Exécute la veille concurrentielle depuis du code synchrone"""
+    asyncio.run(run_competitive_intelligence_async())
+
+
 # ============================================
 # POINT D'ENTRÉE
 # ============================================
 
 if __name__ == "__main__":
     try:
-        # VERSION SYNCHRONE - Pas besoin de loop asyncio !
         run_competitive_intelligence()
         
     except Exception as e:
@@ -569,4 +712,4 @@ if __name__ == "__main__":
             'message': f'Erreur: {str(e)}',
             'progress_percent': 0
         })
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
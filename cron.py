@@ -0,0 +1,109 @@
+"""
+cron.py
+Expressions cron à 5 champs : minute heure jour mois jour_de_la_semaine
+
+Syntaxe de chaque champ : * (tout), valeur, intervalle a-b, liste a,b,c
+et pas */n ou a-b/n. Jour de la semaine : 0-7 (0 et 7 = dimanche).
+Comme cron, si le jour du mois et le jour de la semaine sont tous deux
+restreints, l'un OU l'autre suffit.
+
+USAGE:
+    CronSchedule("30 8 * * 1-5").next_after(datetime.now())
+"""
+
+from datetime import datetime, timedelta
+
+# (minimum, maximum) de chaque champ
+_FIELDS = (
+    ('minute', 0, 59),
+    ('heure', 0, 23),
+    ('jour', 1, 31),
+    ('mois', 1, 12),
+    ('jour de la semaine', 0, 7),
+)
+
+MAX_SEARCH_DAYS = 366 * 5  # au-delà : expression sans occurrence (ex. 31 février)
+
+
+def _parse_field(text, name, low, high):
+    values = set()
+    for part in text.split(','):
+        step = 1
+        if '/' in part:
+            part, step_text = part.split('/', 1)
+            if not step_text.isdigit() or int(step_text) == 0:
+                raise ValueError(f"Pas invalide pour le champ {name} : {step_text!r}")
+            step = int(step_text)
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start_text, end_text = part.split('-', 1)
+            if not (start_text.isdigit() and end_text.isdigit()):
+                raise ValueError(f"Intervalle invalide pour le champ {name} : {part!r}")
+            start, end = int(start_text), int(end_text)
+        elif part.isdigit():
+            start = int(part)
+            # "5/15" : de 5 jusqu'au maximum, de 15 en 15
+            end = high if step > 1 else start
+        else:
+            raise ValueError(f"Valeur invalide pour le champ {name} : {part!r}")
+        if not low <= start <= end <= high:
+            raise ValueError(f"Valeur hors limites pour le champ {name} ({low}-{high}) : {part!r}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """Expression cron compilée (ValueError si elle est invalide)"""
+
+    def __init__(self, expression):
+        self.expression = ' '.join(str(expression).split())
+        parts = self.expression.split(' ')
+        if len(parts) != 5:
+            raise ValueError(f"Expression cron invalide (5 champs attendus) : {expression!r}")
+        fields = [_parse_field(part, *spec) for part, spec in zip(parts, _FIELDS)]
+        self.minutes, self.hours, self.days, self.months, weekdays = fields
+        # 7 = dimanche ; conversion vers datetime.weekday() (lundi = 0)
+        self.weekdays = {(day - 1) % 7 for day in weekdays}
+        self.day_restricted = parts[2] != '*'
+        self.weekday_restricted = parts[4] != '*'
+
+    def _day_matches(self, moment):
+        day_ok = moment.day in self.days
+        weekday_ok = moment.weekday() in self.weekdays
+        if self.day_restricted and self.weekday_restricted:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def matches(self, moment):
+        return (
+            moment.minute in self.minutes and moment.hour in self.hours
+            and moment.month in self.months and self._day_matches(moment)
+        )
+
+    def next_after(self, moment):
+        """Première occurrence strictement après moment (à la minute près)"""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=MAX_SEARCH_DAYS)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                # Premier jour du mois suivant
+                candidate = (candidate.replace(day=1) + timedelta(days=32)).replace(day=1, hour=0, minute=0)
+            elif not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"Aucune occurrence pour l'expression cron {self.expression!r}")
+
+    def __repr__(self):
+        return f"CronSchedule({self.expression!r})"
+
+
+def daily_at(time_text):
+    """'08:30' -> '30 8 * * *' (format de auto_scrape_time)"""
+    hour, minute = datetime.strptime(time_text, '%H:%M').timetuple()[3:5]
+    return f"{minute} {hour} * * *"
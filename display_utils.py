@@ -12,6 +12,8 @@ import time
 import subprocess
 from datetime import datetime
 
+from exports import EXPORT_FORMATS, available_formats, export_ads
+
 
 # ============================================
 # CONFIGURATION DES COLONNES POUR TABLEAUX
@@ -231,31 +233,62 @@ def display_ads_table(results, entry_id, search_key="", include_scraped_at=False
                     _add_to_list(whitelist_pages, 'whitelist', entry_id, config)
     
     # ============================================
-    # BOUTONS DE TÉLÉCHARGEMENT
+    # TÉLÉCHARGEMENTS (PRODUITS À LA DEMANDE)
     # ============================================
     st.markdown("---")
-    col_dl1, col_dl2 = st.columns(2)
+    export_panel(lambda: results, f"facebook_ads_{entry_id}", key=f"{entry_id}_{search_key}")
+
+
+# ============================================
+# EXPORTS À LA DEMANDE
+# ============================================
+
+def export_panel(load_ads, basename, key):
+    """
+    Choix du format et téléchargement d'un export (cf. exports.py)
     
-    with col_dl1:
-        df_export = pd.DataFrame(results)
-        csv = df_export.to_csv(index=False, encoding='utf-8-sig')
-        st.download_button(
-            "📥 Télécharger CSV",
-            data=csv,
-            file_name=f"facebook_ads_{entry_id}.csv",
-            mime="text/csv",
-            key=f"csv_{entry_id}_{search_key}"
-        )
+    Rien n'est lu ni écrit tant que l'utilisateur n'a pas cliqué sur
+    "Préparer l'export" ; le fichier est ensuite écrit par paquets dans
+    exports/ et proposé au téléchargement jusqu'au prochain export.
     
-    with col_dl2:
-        json_str = json.dumps(results, ensure_ascii=False, indent=2)
-        st.download_button(
-            "📥 Télécharger JSON",
-            data=json_str,
-            file_name=f"facebook_ads_{entry_id}.json",
-            mime="application/json",
-            key=f"json_{entry_id}_{search_key}"
+    Args:
+        load_ads: Fonction sans argument retournant les publicités (liste ou itérable)
+        basename: Nom du fichier sans extension
+        key: Suffixe unique pour les clés des widgets
+    """
+    col_format, col_prepare = st.columns([2, 1])
+    with col_format:
+        fmt = st.selectbox(
+            "Format d'export",
+            available_formats(),
+            format_func=lambda f: EXPORT_FORMATS[f]['label'],
+            key=f"export_format_{key}"
         )
+    with col_prepare:
+        prepare = st.button("📦 Préparer l'export", key=f"export_prepare_{key}", use_container_width=True)
+    
+    state_key = f"export_file_{key}"
+    if prepare:
+        previous = st.session_state.get(state_key)
+        if previous and os.path.exists(previous['path']):
+            os.remove(previous['path'])
+        with st.spinner("Export en cours..."):
+            start = time.time()
+            path = export_ads(load_ads(), fmt, basename)
+        st.session_state[state_key] = {'path': path, 'format': fmt, 'duration': time.time() - start}
+    
+    export = st.session_state.get(state_key)
+    if export and os.path.exists(export['path']):
+        size_mb = os.path.getsize(export['path']) / 1_048_576
+        with open(export['path'], 'rb') as f:
+            st.download_button(
+                f"📥 Télécharger {EXPORT_FORMATS[export['format']]['label']} ({size_mb:.1f} Mo)",
+                data=f,
+                file_name=os.path.basename(export['path']),
+                mime=EXPORT_FORMATS[export['format']]['mime'],
+                key=f"export_download_{key}"
+            )
+        st.caption(f"Export préparé en {export['duration']:.1f}s")
 
 
 # ============================================
@@ -357,44 +390,3 @@ def _get_fb_id_status():
         except:
             return None
     return None
-
-
-# ============================================
-# FONCTION DE FUSION DES PUBLICITÉS
-# ============================================
-
-def fusionner_publicites(all_ads):
-    """
-    Fusionne les publicités en doublon (même ad_id) en complétant les données manquantes
-    
-    Args:
-        all_ads: Liste de toutes les publicités (avec potentiels doublons)
-    
-    Returns:
-        Liste de publicités uniques avec données fusionnées
-    """
-    pubs_par_id = {}
-    
-    for ad in all_ads:
-        ad_id = ad.get('ad_id')
-        
-        if not ad_id or ad_id == 'N/A':
-            continue
-        
-        if ad_id not in pubs_par_id:
-            # Première occurrence
-            pubs_par_id[ad_id] = ad.copy()
-        else:
-            # Doublon : fusionner
-            existing = pubs_par_id[ad_id]
-            
-            # Compléter les champs 'N/A' avec les nouvelles valeurs
-            for key, value in ad.items():
-                if existing.get(key) in ['N/A', '', None] and value not in ['N/A', '', None]:
-                    existing[key] = value
-            
-            # Garder la date de scraping la plus récente
-            if ad.get('scraped_at', '') > existing.get('scraped_at', ''):
-                existing['scraped_at'] = ad['scraped_at']
-    
-    return list(pubs_par_id.values())
\ No newline at end of file
@@ -0,0 +1,223 @@
+"""
+exports.py
+Exports de publicités (CSV, JSON, JSONL, Excel, Parquet)
+
+Les fichiers sont produits uniquement à la demande, dans le dossier
+exports/, en parcourant les publicités par paquets : le fichier s'écrit
+au fur et à mesure, sans construire de DataFrame ni de chaîne complète
+en mémoire.
+
+- csv     : UTF-8 avec BOM (ouverture directe dans Excel)
+- json    : tableau JSON (format historique des téléchargements)
+- jsonl   : une publicité par ligne (tous les champs, lecture en flux)
+- xlsx    : classeur Excel écrit en mode write-only (openpyxl)
+- parquet : format colonnes compressé (pyarrow, optionnel)
+
+Les formats en colonnes (csv, xlsx, parquet) utilisent les colonnes
+standard des publicités plus celles présentes dans le premier paquet.
+
+USAGE:
+    path = export_ads(iter_entry_ads(entry_id), 'xlsx', f"facebook_ads_{entry_id}")
+"""
+
+import csv
+import itertools
+import json
+import os
+import re
+
+from ads_extractor import AD_FIELDS
+
+EXPORT_DIR = "exports"
+EXPORT_CHUNK_SIZE = 2000  # publicités par paquet
+
+# Ordre des colonnes (champs de ads_extractor), les autres suivent
+EXPORT_COLUMNS = list(AD_FIELDS)
+
+EXPORT_FORMATS = {
+    'csv': {'label': "CSV", 'mime': "text/csv"},
+    'json': {'label': "JSON", 'mime': "application/json"},
+    'jsonl': {'label': "JSONL (une publicité par ligne)", 'mime': "application/x-ndjson"},
+    'xlsx': {'label': "Excel (XLSX)", 'mime': "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"},
+    'parquet': {'label': "Parquet", 'mime': "application/vnd.apache.parquet"},
+}
+
+# Caractères de contrôle refusés par Excel
+_ILLEGAL_XLSX_CHARS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def available_formats():
+    """Formats utilisables avec les dépendances installées"""
+    formats = ['csv', 'json', 'jsonl']
+    try:
+        import openpyxl  # noqa: F401
+        formats.append('xlsx')
+    except ImportError:
+        pass
+    try:
+        import pyarrow  # noqa: F401
+        formats.append('parquet')
+    except ImportError:
+        pass
+    return formats
+
+
+def _chunks(ads, size):
+    iterator = iter(ads)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _columns(first_chunk):
+    extra = []
+    for ad in first_chunk:
+        for key in ad:
+            if key not in EXPORT_COLUMNS and key not in extra:
+                extra.append(key)
+    return EXPORT_COLUMNS + extra
+
+
+def _cell(value):
+    """Valeur d'une cellule : listes et objets en JSON, None conservé"""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return json.dumps(value, ensure_ascii=False)
+
+
+# ============================================
+# ÉCRITURE PAR FORMAT
+# ============================================
+
+def _write_csv(chunks, path):
+    rows = 0
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = None
+        for chunk in chunks:
+            if writer is None:
+                writer = csv.DictWriter(f, fieldnames=_columns(chunk), extrasaction='ignore')
+                writer.writeheader()
+            writer.writerows({key: _cell(value) for key, value in ad.items()} for ad in chunk)
+            rows += len(chunk)
+        if writer is None:
+            csv.writer(f).writerow(EXPORT_COLUMNS)
+    return rows
+
+
+def _write_json(chunks, path):
+    rows = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('[')
+        for chunk in chunks:
+            for ad in chunk:
+                f.write(',\n' if rows else '\n')
+                f.write(json.dumps(ad, ensure_ascii=False))
+                rows += 1
+        f.write('\n]\n')
+    return rows
+
+
+def _write_jsonl(chunks, path):
+    rows = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for chunk in chunks:
+            f.writelines(json.dumps(ad, ensure_ascii=False) + '\n' for ad in chunk)
+            rows += len(chunk)
+    return rows
+
+
+def _write_xlsx(chunks, path):
+    from openpyxl import Workbook
+
+    # Mode write-only : les lignes sont écrites dans le fichier au fil de l'eau
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Publicités")
+    rows = 0
+    columns = None
+    for chunk in chunks:
+        if columns is None:
+            columns = _columns(chunk)
+            sheet.append(columns)
+        for ad in chunk:
+            row = []
+            for column in columns:
+                value = _cell(ad.get(column))
+                if isinstance(value, str):
+                    value = _ILLEGAL_XLSX_CHARS.sub('', value)
+                row.append(value)
+            sheet.append(row)
+        rows += len(chunk)
+    if columns is None:
+        sheet.append(EXPORT_COLUMNS)
+    workbook.save(path)
+    return rows
+
+
+def _write_parquet(chunks, path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    rows = 0
+    writer = None
+    try:
+        for chunk in chunks:
+            if writer is None:
+                columns = _columns(chunk)
+                schema = pa.schema([(column, pa.string()) for column in columns])
+                writer = pq.ParquetWriter(path, schema, compression='zstd')
+            # Un groupe de lignes par paquet ; toutes les colonnes en texte
+            data = {
+                column: [None if ad.get(column) is None else str(_cell(ad.get(column))) for ad in chunk]
+                for column in columns
+            }
+            writer.write_table(pa.Table.from_pydict(data, schema=schema))
+            rows += len(chunk)
+        if writer is None:
+            pq.write_table(pa.table({column: pa.array([], pa.string()) for column in EXPORT_COLUMNS}), path)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+_WRITERS = {
+    'csv': _write_csv,
+    'json': _write_json,
+    'jsonl': _write_jsonl,
+    'xlsx': _write_xlsx,
+    'parquet': _write_parquet,
+}
+
+
+def write_export(ads, fmt, path, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Écrit des publicités dans un fichier, paquet par paquet
+
+    Args:
+        ads: liste ou itérable de publicités (lu une seule fois)
+        fmt: clé de EXPORT_FORMATS
+
+    Returns:
+        Nombre de publicités écrites
+    """
+    if fmt not in _WRITERS:
+        raise ValueError(f"Format d'export inconnu : {fmt}")
+    # Fichier temporaire puis remplacement : pas de fichier partiel en cas d'erreur
+    tmp_path = f"{path}.tmp"
+    try:
+        rows = _WRITERS[fmt](_chunks(ads, chunk_size), tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return rows
+
+
+def export_ads(ads, fmt, basename, directory=EXPORT_DIR):
+    """Écrit l'export dans directory/basename.<fmt> ; retourne le chemin du fichier"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{basename}.{fmt}")
+    write_export(ads, fmt, path)
+    return path
@@ -10,9 +10,10 @@ import json
 import asyncio
 import re
 from datetime import datetime
-from playwright.async_api import async_playwright
+from browser_pool import BrowserPool
+from resource_policy import ResourceBlocker, resolve_policy, RESOURCE_POLICIES
+import storage
 import argparse
-from pathlib import Path
 import io
 
 # Fix pour l'encodage Windows
@@ -24,7 +25,6 @@ if sys.platform == "win32":
 STATUS_FILE = "fb_id_status.json"
 RESULT_FILE = "fb_id_result.json"
 STARTED_FILE = "fb_id_started.txt"
-WHITELIST_FILE = "whitelist.json"
 DEBUG_HTML_FILE = "debug_page_content.html"
 
 # Mapping des mois français vers numéros
@@ -55,26 +55,39 @@ def update_status(status, current=0, total=0, current_page="", message="", resul
     log(f"Status updated: {status} - {message}")
 
 def load_whitelist():
-    """Charge la whitelist"""
-    log(f"Loading whitelist from {WHITELIST_FILE}")
-    if Path(WHITELIST_FILE).exists():
-        try:
-            with open(WHITELIST_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                log(f"Loaded {len(data)} items from whitelist")
-                return data
-        except Exception as e:
-            log(f"Error loading whitelist: {e}", "ERROR")
-            return []
-    log(f"Whitelist file not found, returning empty list")
-    return []
+    """Charge la whitelist (stockage configuré, cf. storage.py)"""
+    data = storage.load_whitelist()
+    log(f"Loaded {len(data)} items from whitelist")
+    return data
 
-def save_whitelist(data):
-    """Sauvegarde la whitelist"""
-    log(f"Saving {len(data)} items to whitelist")
-    with open(WHITELIST_FILE, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-    log(f"Successfully saved whitelist")
+def _whitelist_row(result):
+    """Ligne de whitelist à partir d'un résultat de scraping (id_page = ID de profil)"""
+    return {
+        'id_page': result['page_profile_id'],
+        'nom_page': result.get('nom_page'),
+        'date_ajout': result.get('date_ajout'),
+        'date_creation': result.get('date_creation'),
+        'id_permanent': result.get('id_permanent')
+    }
+
+def add_pages(pages):
+    """
+    Ajoute des pages à la whitelist en une seule requête
+    
+    Les pages dont l'ID permanent est déjà présent (dans la whitelist ou
+    plus tôt dans le lot) sont ignorées. Retourne les pages ajoutées.
+    """
+    known_ids = {item.get('id_permanent') for item in load_whitelist()}
+    added = []
+    for page in pages:
+        if page.get('id_permanent') in known_ids:
+            continue
+        known_ids.add(page.get('id_permanent'))
+        added.append(page)
+    if added:
+        storage.add_pages('whitelist', [_whitelist_row(page) for page in added])
+    log(f"{len(added)}/{len(pages)} page(s) added to whitelist")
+    return added
 
 def parse_date_french(date_str):
     """Convertit une date française en format DD/MM/YYYY"""
@@ -104,11 +117,13 @@ def is_duplicate(id_permanent):
     log(f"Duplicate check result: {is_dup}")
     return is_dup
 
-async def get_page_info(page_profile_id, headless=False):
+async def get_page_info(page_profile_id, headless=False, resource_policy=None, pool=None):
     """
     Récupère les informations d'une page Facebook via la page de transparence
     VERSION HYBRIDE: Architecture V0 + Extraction V1
     
+    pool: BrowserPool partagé (sinon un navigateur est lancé pour cette page)
+    
     Returns:
         dict: {
             'success': bool,
@@ -120,6 +135,10 @@ async def get_page_info(page_profile_id, headless=False):
             'error': str (si échec)
         }
     """
+    if pool is None:
+        async with BrowserPool(size=1) as pool:
+            return await get_page_info(page_profile_id, headless, resource_policy, pool)
+    
     log(f"=== Starting scraping for page ID: {page_profile_id} ===")
     result = {
         'success': False,
@@ -131,21 +150,19 @@ async def get_page_info(page_profile_id, headless=False):
     }
     
     try:
-        log("Launching Playwright browser...")
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(
-                headless=headless,
-                args=['--disable-blink-features=AutomationControlled']
-            )
-            log(f"Browser launched (headless={headless})")
-            
-            context = await browser.new_context(
-                viewport={'width': 1920, 'height': 1080},
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                locale='fr-FR'
-            )
+        log(f"Opening browser context from pool (headless={headless})...")
+        async with pool.context(
+            headless=headless,
+            viewport={'width': 1920, 'height': 1080},
+            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            locale='fr-FR'
+        ) as context:
             log("Browser context created with French locale")
             
+            # Pas d'images/vidéos : seules les informations texte sont lues
+            blocker = ResourceBlocker(resolve_policy(override=resource_policy))
+            await blocker.install(context)
+            
             page = await context.new_page()
             
             # Désactiver webdriver (technique V1)
@@ -181,7 +198,6 @@ async def get_page_info(page_profile_id, headless=False):
             # Vérifier si on est sur une page de connexion
             login_form = await page.query_selector('input[name="email"]')
             if login_form:
-                await browser.close()
                 result['error'] = "Facebook demande une connexion"
                 log("Login page detected, aborting", "ERROR")
                 return result
@@ -318,9 +334,10 @@ async def get_page_info(page_profile_id, headless=False):
                 f.write(html_content)
             log(f"HTML saved ({len(html_content)} chars)")
             
-            log("Closing browser...")
-            await browser.close()
-            log("Browser closed")
+            log(blocker.summary())
+            log("Closing browser context...")
+            await context.close()
+            log("Browser context closed")
             
             # Traiter les résultats
             if extraction_result:
@@ -353,12 +370,12 @@ async def get_page_info(page_profile_id, headless=False):
     log(f"=== Scraping completed for page ID: {page_profile_id} ===")
     return result
 
-async def process_single(page_id, headless=False):
+async def process_single(page_id, headless=False, resource_policy=None):
     """Traite une seule page et l'ajoute à la whitelist"""
     log(f"Processing single page: {page_id} for whitelist")
     update_status("running", 0, 1, "", f"Récupération des infos pour {page_id}...", [])
     
-    result = await get_page_info(page_id, headless)
+    result = await get_page_info(page_id, headless, resource_policy)
     
     if result['success']:
         # Vérifier les doublons
@@ -370,9 +387,7 @@ async def process_single(page_id, headless=False):
         else:
             # Ajouter à la whitelist
             log(f"Adding page to whitelist...")
-            current_list = load_whitelist()
-            current_list.append(result)
-            save_whitelist(current_list)
+            add_pages([result])
             log("Page successfully added to whitelist")
             
             update_status("completed", 1, 1, result['nom_page'], "Page ajoutée avec succès", [result])
@@ -388,7 +403,7 @@ async def process_single(page_id, headless=False):
     
     return result
 
-async def process_batch(page_ids, headless=False):
+async def process_batch(page_ids, headless=False, resource_policy=None):
     """Traite plusieurs pages en séquence et les ajoute à la whitelist"""
     total = len(page_ids)
     results = []
@@ -397,32 +412,42 @@ async def process_batch(page_ids, headless=False):
     log(f"Processing batch of {total} pages for whitelist")
     update_status("running", 0, total, "", f"Traitement de {total} page(s)...", [])
     
-    for i, page_id in enumerate(page_ids, 1):
-        log(f"--- Processing page {i}/{total}: {page_id} ---")
-        update_status("running", i, total, "", f"Traitement de la page {i}/{total}: {page_id}...", results)
-        
-        result = await get_page_info(page_id, headless)
-        
-        if result['success']:
-            # Vérifier les doublons
-            if is_duplicate(result['id_permanent']):
-                result['success'] = False
-                result['error'] = "Page déjà existante"
-                log(f"Page {page_id} already exists in whitelist", "WARNING")
-            else:
-                # Ajouter à la whitelist
-                current_list = load_whitelist()
-                current_list.append(result)
-                save_whitelist(current_list)
-                success_count += 1
-                log(f"Page {page_id} added successfully to whitelist ({success_count} total)")
-        
-        results.append(result)
-        
-        # Petite pause entre chaque requête
-        if i < total:
-            log("Waiting 3 seconds before next page...")
-            await asyncio.sleep(3)
+    # IDs déjà en whitelist, lus une fois pour tout le lot
+    known_ids = {item.get('id_permanent') for item in load_whitelist()}
+    new_pages = []
+    
+    # Un seul navigateur pour tout le lot, un contexte neuf par page
+    pool = BrowserPool(size=1)
+    try:
+        for i, page_id in enumerate(page_ids, 1):
+            log(f"--- Processing page {i}/{total}: {page_id} ---")
+            update_status("running", i, total, "", f"Traitement de la page {i}/{total}: {page_id}...", results)
+            
+            result = await get_page_info(page_id, headless, resource_policy, pool)
+            
+            if result['success']:
+                # Vérifier les doublons
+                if result['id_permanent'] in known_ids:
+                    result['success'] = False
+                    result['error'] = "Page déjà existante"
+                    log(f"Page {page_id} already exists in whitelist", "WARNING")
+                else:
+                    known_ids.add(result['id_permanent'])
+                    new_pages.append(result)
+                    success_count += 1
+                    log(f"Page {page_id} ready to be added to whitelist ({success_count} total)")
+            
+            results.append(result)
+            
+            # Petite pause entre chaque requête
+            if i < total:
+                log("Waiting 3 seconds before next page...")
+                await asyncio.sleep(3)
+    finally:
+        # Ajout groupé (y compris si le lot est interrompu)
+        if new_pages:
+            add_pages(new_pages)
+        await pool.close()
     
     log(f"Batch processing completed: {success_count}/{total} pages added to whitelist")
     update_status("completed", total, total, "", f"{success_count}/{total} page(s) ajoutée(s)", results)
@@ -448,6 +473,7 @@ async def main():
     parser.add_argument('--batch', help='Fichier JSON contenant une liste d\'IDs (mode batch)')
     parser.add_argument('--headless', action='store_true', default=True, help='Mode invisible (défaut: True)')
     parser.add_argument('--visible', action='store_true', help='Mode visible (raccourci pour --no-headless)')
+    parser.add_argument('--resource-policy', choices=list(RESOURCE_POLICIES), help='Ressources bloquées (défaut: config.json)')
     
     args = parser.parse_args()
     
@@ -473,13 +499,13 @@ async def main():
                 raise ValueError("Le fichier JSON doit contenir une liste d'IDs")
             
             log(f"Loaded {len(page_ids)} page IDs from batch file")
-            await process_batch(page_ids, args.headless)
+            await process_batch(page_ids, args.headless, args.resource_policy)
         else:
             # Mode single
             if not args.page_id:
                 raise ValueError("page_id est requis en mode single")
             
-            await process_single(args.page_id, args.headless)
+            await process_single(args.page_id, args.headless, args.resource_policy)
     
     except Exception as e:
         log(f"FATAL ERROR: {e}", "ERROR")
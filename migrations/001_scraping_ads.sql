@@ -0,0 +1,36 @@
+-- ============================================
+-- 001 - Publicités scrapées en lignes (table scraping_ads)
+-- ============================================
+-- Avant : toutes les publicités d'un scraping étaient stockées dans la
+-- colonne JSON scraping_history.results, relue puis réécrite en entier à
+-- chaque sauvegarde automatique.
+-- Après : une ligne par (entry_id, ad_id), écrite par upserts groupés ;
+-- scraping_history ne garde que le résumé de l'entrée.
+--
+-- À exécuter une fois dans l'éditeur SQL de Supabase, puis migrer les
+-- entrées existantes :  python supabase_db.py migrate
+
+create table if not exists scraping_ads (
+    entry_id   text        not null references scraping_history(id) on delete cascade,
+    ad_id      text        not null,
+    position   bigint      generated always as identity,
+    country    text,
+    advertiser text,
+    page_id    text,
+    media_type text,
+    data       jsonb       not null,
+    created_at timestamptz not null default now(),
+    primary key (entry_id, ad_id)
+);
+
+-- Lecture des publicités d'une entrée dans l'ordre d'enregistrement
+create index if not exists scraping_ads_entry_position_idx
+    on scraping_ads (entry_id, position);
+
+-- Accès complet pour la clé de l'application (à adapter si les autres
+-- tables utilisent des politiques RLS plus strictes)
+alter table scraping_ads enable row level security;
+
+drop policy if exists "scraping_ads_all" on scraping_ads;
+create policy "scraping_ads_all" on scraping_ads
+    for all using (true) with check (true);
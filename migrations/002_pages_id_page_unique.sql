@@ -0,0 +1,21 @@
+-- ============================================
+-- 002 - Clé id_page unique sur blacklist / whitelist
+-- ============================================
+-- Avant : chaque ajout ou retrait supprimait toute la table puis la
+-- réinsérait (table vide si l'enregistrement s'interrompait entre les deux).
+-- Après : add_pages / remove_pages / update_page envoient uniquement les
+-- pages concernées ; les upserts se basent sur l'index unique id_page.
+--
+-- À exécuter une fois dans l'éditeur SQL de Supabase.
+
+-- Doublons éventuels : la ligne la plus ancienne est conservée
+delete from blacklist a
+    using blacklist b
+    where a.id_page = b.id_page and a.id > b.id;
+
+delete from whitelist a
+    using whitelist b
+    where a.id_page = b.id_page and a.id > b.id;
+
+create unique index if not exists blacklist_id_page_key on blacklist (id_page);
+create unique index if not exists whitelist_id_page_key on whitelist (id_page);
@@ -0,0 +1,23 @@
+-- ============================================
+-- 003 - Rapports de veille concurrentielle
+-- ============================================
+-- Avant : les rapports étaient écrits dans daily_competitive_reports.json,
+-- sur le poste qui exécute la veille.
+-- Après : ils passent par le stockage configuré (storage.py), comme la
+-- blacklist, la whitelist et l'historique.
+--
+-- À exécuter une fois dans l'éditeur SQL de Supabase, puis importer les
+-- fichiers locaux existants :  python storage.py import-local
+
+create table if not exists competitive_reports (
+    id         text        primary key,
+    date       text,
+    report     jsonb       not null,
+    created_at timestamptz not null default now()
+);
+
+alter table competitive_reports enable row level security;
+
+drop policy if exists "competitive_reports_all" on competitive_reports;
+create policy "competitive_reports_all" on competitive_reports
+    for all using (true) with check (true);
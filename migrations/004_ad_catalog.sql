@@ -0,0 +1,31 @@
+-- ============================================
+-- 004 - Catalogue des publicités (table ad_catalog)
+-- ============================================
+-- Avant : la vue globale de l'historique chargeait toutes les publicités
+-- de toutes les entrées et les fusionnait (même ad_id) à chaque affichage.
+-- Après : une ligne par ad_id, fusionnée à chaque enregistrement de
+-- publicités (règles de ad_catalog.py) ; la vue globale la lit directement.
+--
+-- À exécuter une fois dans l'éditeur SQL de Supabase, puis remplir le
+-- catalogue avec les publicités existantes :  python supabase_db.py rebuild-catalog
+
+create table if not exists ad_catalog (
+    ad_id      text        primary key,
+    country    text,
+    advertiser text,
+    page_id    text,
+    media_type text,
+    scraped_at text,
+    data       jsonb       not null,
+    updated_at timestamptz not null default now()
+);
+
+-- Ordre d'affichage de la vue globale (scrapings les plus récents d'abord)
+create index if not exists ad_catalog_scraped_at_idx
+    on ad_catalog (scraped_at desc);
+
+alter table ad_catalog enable row level security;
+
+drop policy if exists "ad_catalog_all" on ad_catalog;
+create policy "ad_catalog_all" on ad_catalog
+    for all using (true) with check (true);
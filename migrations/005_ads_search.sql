@@ -0,0 +1,70 @@
+-- ============================================
+-- 005 - Index plein texte des publicités
+-- ============================================
+-- Avant : les recherches de l'historique étaient des "ilike '%terme%'" sur
+-- chaque champ de chaque publicité (parcours complet, "cafe" ne trouvait
+-- pas "café").
+-- Après : une colonne tsvector calculée (minuscules, sans accents) et un
+-- index GIN sur scraping_ads et ad_catalog ; la fonction search_ads classe
+-- les résultats par pertinence. Les requêtes sont construites par
+-- ad_search.py (mots en préfixe : "caf" trouve "café").
+--
+-- À exécuter une fois dans l'éditeur SQL de Supabase (après 004). Les
+-- publicités existantes sont indexées pendant l'exécution.
+
+create extension if not exists unaccent;
+
+-- Texte indexé d'une publicité (mêmes champs que ad_search.AD_SEARCH_FIELDS).
+-- unaccent n'est pas déclarée immutable : la fonction l'appelle avec son
+-- dictionnaire explicite pour pouvoir servir dans une colonne calculée.
+create or replace function ads_search_document(advertiser text, page_id text, country text, data jsonb)
+returns tsvector
+language sql immutable parallel safe
+as $$
+    select to_tsvector('simple', public.unaccent('public.unaccent'::regdictionary, lower(concat_ws(' ',
+        advertiser, page_id, country, data->>'text', data->>'cta_text', data->>'search_term'
+    ))))
+$$;
+
+alter table scraping_ads add column if not exists search_tsv tsvector
+    generated always as (ads_search_document(advertiser, page_id, country, data)) stored;
+create index if not exists scraping_ads_search_idx on scraping_ads using gin (search_tsv);
+
+alter table ad_catalog add column if not exists search_tsv tsvector
+    generated always as (ads_search_document(advertiser, page_id, country, data)) stored;
+create index if not exists ad_catalog_search_idx on ad_catalog using gin (search_tsv);
+
+-- Recherche classée par pertinence :
+-- - dans les publicités d'une entrée (p_entry_id), ou
+-- - dans le catalogue (p_entry_id null), filtrable par type de média et pays
+-- total = nombre de résultats avant pagination
+create or replace function search_ads(
+    q            text,
+    p_entry_id   text    default null,
+    p_media_type text    default null,
+    p_countries  text[]  default null,
+    p_limit      integer default null,
+    p_offset     integer default 0
+)
+returns table (data jsonb, rank real, total bigint)
+language sql stable
+as $$
+    with hits as (
+        select a.data, ts_rank(a.search_tsv, to_tsquery('simple', q)) as rank, a.position as ord
+        from scraping_ads a
+        where p_entry_id is not null
+          and a.entry_id = p_entry_id
+          and a.search_tsv @@ to_tsquery('simple', q)
+        union all
+        select c.data, ts_rank(c.search_tsv, to_tsquery('simple', q)), 0
+        from ad_catalog c
+        where p_entry_id is null
+          and c.search_tsv @@ to_tsquery('simple', q)
+          and (p_media_type is null or c.media_type = p_media_type)
+          and (p_countries is null or c.country = any (p_countries))
+    )
+    select data, rank, count(*) over () as total
+    from hits
+    order by rank desc, ord
+    limit p_limit offset p_offset
+$$;
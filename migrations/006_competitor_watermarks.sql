@@ -0,0 +1,24 @@
+-- ============================================
+-- 006 - Repères de la veille concurrentielle
+-- ============================================
+-- Avant : chaque veille recollectait jusqu'à max_ads publicités par
+-- concurrent, même déjà collectées la veille.
+-- Après : un repère par concurrent (ad_id déjà vus avec leur date de
+-- début, cf. watermarks.py) ; le scroll s'arrête dès qu'une série de
+-- publicités connues défile et le rapport marque les nouvelles.
+--
+-- À exécuter une fois dans l'éditeur SQL de Supabase. La première veille
+-- qui suit remplit les repères (pas d'arrêt anticipé).
+
+create table if not exists competitor_watermarks (
+    page_id           text        primary key,
+    latest_start_date text,
+    ads               jsonb       not null default '{}'::jsonb,
+    updated_at        text
+);
+
+alter table competitor_watermarks enable row level security;
+
+drop policy if exists "competitor_watermarks_all" on competitor_watermarks;
+create policy "competitor_watermarks_all" on competitor_watermarks
+    for all using (true) with check (true);
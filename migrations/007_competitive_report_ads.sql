@@ -0,0 +1,40 @@
+-- ============================================
+-- 007 - Publicités des rapports de veille en lignes
+-- ============================================
+-- Avant : chaque rapport était un seul document jsonb, réécrit en entier
+-- après chaque concurrent (toutes les publicités déjà trouvées renvoyées
+-- à chaque sauvegarde) et relu en entier pour lister les rapports.
+-- Après : competitive_reports ne garde que l'en-tête (compteurs, statut,
+-- erreurs) ; les publicités sont ajoutées dans competitive_report_ads, une
+-- ligne par publicité, sans jamais réécrire les précédentes.
+--
+-- À exécuter une fois dans l'éditeur SQL de Supabase (après 003). Les
+-- rapports existants sont découpés pendant l'exécution.
+
+create table if not exists competitive_report_ads (
+    position   bigint generated always as identity primary key,
+    report_id  text   not null references competitive_reports(id) on delete cascade,
+    ad_id      text   not null,
+    data       jsonb  not null,
+    unique (report_id, ad_id)
+);
+create index if not exists competitive_report_ads_report_position_idx
+    on competitive_report_ads (report_id, position);
+
+alter table competitive_report_ads enable row level security;
+
+drop policy if exists "competitive_report_ads_all" on competitive_report_ads;
+create policy "competitive_report_ads_all" on competitive_report_ads
+    for all using (true) with check (true);
+
+-- Découpage des rapports existants (ordre des publicités conservé)
+insert into competitive_report_ads (report_id, ad_id, data)
+select r.id, coalesce(ad.value->>'ad_id', ad.ordinality::text), ad.value
+from competitive_reports r,
+     jsonb_array_elements(r.report->'results') with ordinality as ad(value, ordinality)
+where jsonb_typeof(r.report->'results') = 'array'
+order by r.id, ad.ordinality
+on conflict (report_id, ad_id) do nothing;
+
+update competitive_reports set report = report - 'results'
+where report ? 'results';
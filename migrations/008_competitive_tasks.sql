@@ -0,0 +1,31 @@
+-- ============================================
+-- 008 - Tâches de la veille concurrentielle
+-- ============================================
+-- Avant : si competitive_job.py s'arrêtait en cours de route (navigateur
+-- planté, redémarrage du poste), la veille suivante repartait du premier
+-- concurrent ; une erreur était seulement notée dans le rapport.
+-- Après : une tâche par concurrent et par rapport (état, nombre de
+-- tentatives, dernière erreur) ; une veille relancée reprend les
+-- concurrents en attente ou en échec du rapport en cours, et les échecs
+-- sont retentés avec un délai croissant.
+--
+-- À exécuter une fois dans l'éditeur SQL de Supabase (après 007).
+
+create table if not exists competitive_tasks (
+    report_id       text    not null references competitive_reports(id) on delete cascade,
+    competitor_id   text    not null,
+    competitor_name text,
+    position        integer not null default 0,
+    state           text    not null default 'pending',
+    attempts        integer not null default 0,
+    last_error      text,
+    next_attempt_at text,
+    updated_at      text,
+    primary key (report_id, competitor_id)
+);
+
+alter table competitive_tasks enable row level security;
+
+drop policy if exists "competitive_tasks_all" on competitive_tasks;
+create policy "competitive_tasks_all" on competitive_tasks
+    for all using (true) with check (true);
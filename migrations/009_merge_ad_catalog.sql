@@ -0,0 +1,54 @@
+-- ============================================
+-- 009 - Fusion du catalogue côté base (fonction merge_ad_catalog)
+-- ============================================
+-- Avant : chaque enregistrement de publicités relisait leurs versions du
+-- catalogue, les fusionnait en Python puis les renvoyait (deux allers-
+-- retours par lot, et deux scrapings simultanés pouvaient écraser la
+-- fusion l'un de l'autre entre la lecture et l'écriture).
+-- Après : un seul appel par lot ; la fusion est faite par l'upsert
+-- lui-même (insert ... on conflict do update), ligne verrouillée.
+-- Mêmes règles que ad_catalog.py :
+-- - les champs vides ('N/A', '', null) sont complétés par les nouvelles valeurs
+-- - scraped_at garde la date de scraping la plus récente
+--
+-- À exécuter une fois dans l'éditeur SQL de Supabase (après 004).
+
+-- Version du catalogue (existing) complétée par une nouvelle version (incoming)
+create or replace function ad_catalog_merge(existing jsonb, incoming jsonb)
+returns jsonb
+language sql immutable parallel safe
+as $$
+    select existing
+        || coalesce((
+            select jsonb_object_agg(i.key, i.value)
+            from jsonb_each(incoming) as i(key, value)
+            where coalesce(existing->i.key, 'null'::jsonb) in ('null'::jsonb, '""'::jsonb, '"N/A"'::jsonb)
+              and i.value not in ('null'::jsonb, '""'::jsonb, '"N/A"'::jsonb)
+        ), '{}'::jsonb)
+        -- Dates ISO : comparaison octet par octet, comme en Python
+        || case
+            when coalesce(incoming->>'scraped_at', '') collate "C" > coalesce(existing->>'scraped_at', '') collate "C"
+            then jsonb_build_object('scraped_at', incoming->'scraped_at')
+            else '{}'::jsonb
+        end
+$$;
+
+-- Fusionne un lot de publicités (tableau JSON, un seul élément par ad_id)
+-- dans le catalogue ; les colonnes suivent la version fusionnée
+create or replace function merge_ad_catalog(ads jsonb)
+returns void
+language sql
+as $$
+    insert into ad_catalog as c (ad_id, country, advertiser, page_id, media_type, scraped_at, data)
+    select a->>'ad_id', a->>'country', a->>'advertiser', a->>'page_id', a->>'media_type', a->>'scraped_at', a
+    from jsonb_array_elements(ads) as a
+    where coalesce(nullif(a->>'ad_id', ''), 'N/A') <> 'N/A'
+    on conflict (ad_id) do update set
+        country    = ad_catalog_merge(c.data, excluded.data)->>'country',
+        advertiser = ad_catalog_merge(c.data, excluded.data)->>'advertiser',
+        page_id    = ad_catalog_merge(c.data, excluded.data)->>'page_id',
+        media_type = ad_catalog_merge(c.data, excluded.data)->>'media_type',
+        scraped_at = ad_catalog_merge(c.data, excluded.data)->>'scraped_at',
+        data       = ad_catalog_merge(c.data, excluded.data),
+        updated_at = now()
+$$;
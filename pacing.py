@@ -0,0 +1,106 @@
+"""
+pacing.py
+Rythme des requêtes envoyées à Facebook
+
+Lorsque plusieurs scrapers tournent en parallèle (un par pays), chacun
+garde ses propres pauses, mais le rythme global doit rester raisonnable.
+Le budget partagé impose un intervalle minimal entre deux requêtes, tous
+scrapers confondus : les temps de chargement se recouvrent, pas les
+requêtes.
+
+Les contrôleurs d'attente remplacent les pauses fixes de la boucle de
+scroll par des attentes qui s'arrêtent dès que la page a progressé.
+"""
+
+import asyncio
+import time
+
+from playwright.async_api import Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
+
+from ads_extractor import SIGNALS_JS, SIGNAL_CHANGED_JS
+
+
+class PacingBudget:
+    """Intervalle minimal entre deux requêtes, partagé par les scrapers d'une même boucle asyncio"""
+
+    def __init__(self, min_interval):
+        self.min_interval = max(0.0, min_interval)
+        self._next_slot = 0.0
+        self.requests = 0
+        self.waited = 0.0
+
+    async def acquire(self):
+        """Attend le prochain créneau libre et le réserve"""
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        # Réservation avant l'attente : les autres scrapers prennent les créneaux suivants
+        self._next_slot = slot + self.min_interval
+        self.requests += 1
+        if slot > now:
+            self.waited += slot - now
+            await asyncio.sleep(slot - now)
+
+
+# ============================================
+# ATTENTES ADAPTATIVES
+# ============================================
+
+class WaitController:
+    """
+    Remplace les pauses fixes par des attentes qui se terminent dès que la
+    page progresse (nouvelle carte ou réponse du fil, cf. ads_extractor.SIGNALS_JS)
+
+    Chaque attente dure au moins `floor` secondes (rythme minimal) et au plus
+    `cap` secondes (la pause fixe d'origine). Les compteurs comparent le temps
+    réellement attendu au temps des pauses configurées.
+    """
+
+    def __init__(self, page, floor=1.0):
+        self.page = page
+        self.floor = floor
+        self.waits = 0
+        self.early = 0
+        self.configured = 0.0
+        self.spent = 0.0
+
+    async def _signals(self):
+        try:
+            return await self.page.evaluate(SIGNALS_JS)
+        except PlaywrightError:
+            return None
+
+    async def wait(self, cap, floor=None):
+        """Attend entre floor et cap secondes ; retourne le temps réellement attendu"""
+        floor = min(self.floor if floor is None else floor, cap)
+        start = time.monotonic()
+        base = await self._signals()
+        await asyncio.sleep(floor)
+        remaining = cap - (time.monotonic() - start)
+        if remaining > 0:
+            if base is None:
+                # Bibliothèque absente : pause fixe
+                await asyncio.sleep(remaining)
+            else:
+                try:
+                    await self.page.wait_for_function(
+                        SIGNAL_CHANGED_JS, arg=base, timeout=remaining * 1000, polling=100
+                    )
+                    self.early += 1
+                except PlaywrightTimeoutError:
+                    pass
+                except PlaywrightError:
+                    # Navigation en cours (contexte détruit) : on termine la pause fixe
+                    left = cap - (time.monotonic() - start)
+                    if left > 0:
+                        await asyncio.sleep(left)
+        spent = time.monotonic() - start
+        self.waits += 1
+        self.configured += cap
+        self.spent += spent
+        return spent
+
+    def summary(self):
+        return (
+            f"Attentes : {self.spent:.0f}s réelles pour {self.configured:.0f}s configurées "
+            f"({self.early}/{self.waits} écourtées par la page)"
+        )
@@ -0,0 +1,93 @@
+"""
+page_matcher.py
+Correspondance rapide entre publicités et listes de pages (blacklist / whitelist)
+
+Une entrée de liste correspond à une publicité si :
+- son id_page est égal au page_id de la publicité, ou
+- son nom_page apparaît dans le nom de l'annonceur
+  (comparaison en minuscules, sans accents)
+
+Le matcher est construit une fois par liste : un ensemble d'IDs pour les
+correspondances exactes et un automate Aho-Corasick pour rechercher tous
+les noms en un seul passage sur le nom de l'annonceur, quel que soit le
+nombre d'entrées.
+"""
+
+import unicodedata
+
+
+def fold_text(text):
+    """Minuscules sans accents ('Café Été' -> 'cafe ete')"""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+class PageMatcher:
+    """Matcher compilé à partir d'une liste de pages (format load_blacklist/load_whitelist)"""
+
+    def __init__(self, pages):
+        self.page_ids = set()
+        # Automate : transitions, lien d'échec et sortie (un motif finit ici) par état
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [False]
+
+        for page in pages or []:
+            id_page = str(page.get('id_page', '') or '')
+            if id_page:
+                self.page_ids.add(id_page)
+            nom_page = fold_text(page.get('nom_page', ''))
+            if nom_page:
+                self._add_pattern(nom_page)
+
+        self._build_fail_links()
+
+    def _add_pattern(self, pattern):
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(False)
+            state = next_state
+        self._out[state] = True
+
+    def _build_fail_links(self):
+        # Parcours en largeur : le lien d'échec d'un état pointe vers le plus
+        # long suffixe propre qui est aussi un préfixe d'un motif
+        queue = list(self._goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] or self._out[self._fail[child]]
+
+    def name_matches(self, advertiser):
+        """True si un nom de la liste apparaît dans le nom de l'annonceur"""
+        if len(self._goto) == 1:
+            return False
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for char in fold_text(advertiser):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                return True
+        return False
+
+    def matches(self, advertiser, page_id):
+        """True si la publicité (annonceur, page_id) correspond à une page de la liste"""
+        if page_id and str(page_id) in self.page_ids:
+            return True
+        return self.name_matches(advertiser)
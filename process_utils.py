@@ -0,0 +1,41 @@
+"""
+process_utils.py
+État des processus de l'application (jobs en arrière-plan, files d'écriture)
+
+Les jobs lancés en arrière-plan et les spools partagés enregistrent le PID
+de leur propriétaire ; avant de reprendre leur travail, on vérifie que ce
+processus a bien disparu.
+"""
+
+import os
+import sys
+
+
+def pid_alive(pid):
+    """Le processus pid existe-t-il encore ?"""
+    if not pid or pid <= 0:
+        return False
+    if sys.platform == 'win32':
+        # os.kill(pid, 0) terminerait le processus sous Windows
+        import ctypes
+        PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+        STILL_ACTIVE = 259
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            return False
+        try:
+            exit_code = ctypes.c_ulong()
+            if not kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code)):
+                return False
+            return exit_code.value == STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Processus d'un autre utilisateur : il existe
+        return True
+    return True
@@ -0,0 +1,152 @@
+"""
+resource_policy.py
+Politique de chargement des ressources pour les navigateurs Playwright
+
+Seule l'URL des médias est conservée : inutile de télécharger les images,
+vidéos et polices de chaque carte. La politique est appliquée via
+context.route() : les requêtes des types bloqués (et les endpoints de
+tracking) sont annulées avant d'être émises. Les attributs src restent
+présents dans le DOM, l'extraction des URLs n'est donc pas affectée.
+
+Politiques disponibles (clé "resource_policy" de config.json) :
+- off    : tout est chargé (comportement historique)
+- media  : images, vidéos, polices et tracking bloqués (défaut)
+- strict : idem + feuilles de style (mise en page dégradée, à tester)
+
+Une requête annulée n'a pas de taille connue : les octets bloqués sont
+estimés (en-tête Range pour les segments vidéo, moyenne par type sinon).
+"""
+
+import json
+import os
+import re
+
+CONFIG_FILE = "config.json"
+
+DEFAULT_POLICY = "media"
+
+RESOURCE_POLICIES = {
+    'off': {'types': set(), 'tracking': False},
+    'media': {'types': {'image', 'media', 'font'}, 'tracking': True},
+    'strict': {'types': {'image', 'media', 'font', 'stylesheet'}, 'tracking': True},
+}
+
+POLICY_LABELS = {
+    'off': "Tout charger",
+    'media': "Bloquer médias, polices et tracking",
+    'strict': "Bloquer aussi les feuilles de style",
+}
+
+# Endpoints de mesure d'audience / logs (jamais l'API GraphQL du fil)
+TRACKING_PATTERNS = re.compile(
+    r'facebook\.com/tr[/?]'
+    r'|/ajax/bz'
+    r'|/ajax/logging/'
+    r'|connect\.facebook\.net/.*/fbevents'
+    r'|google-analytics\.com'
+    r'|googletagmanager\.com'
+    r'|doubleclick\.net'
+)
+
+# Taille moyenne estimée d'une réponse par type (octets)
+ESTIMATED_BYTES = {
+    'image': 60_000,
+    'media': 500_000,
+    'font': 40_000,
+    'stylesheet': 30_000,
+    'tracking': 1_000,
+}
+
+_RANGE_RE = re.compile(r'bytes=(\d+)-(\d+)')
+
+
+def load_policy_name(config_file=CONFIG_FILE):
+    """Politique définie dans config.json (défaut si absente ou fichier illisible)"""
+    if os.path.exists(config_file):
+        try:
+            with open(config_file, 'r', encoding='utf-8') as f:
+                return json.load(f).get('resource_policy', DEFAULT_POLICY)
+        except Exception:
+            pass
+    return DEFAULT_POLICY
+
+
+def resolve_policy(config=None, override=None):
+    """
+    Nom de politique effectif pour un job
+
+    Priorité : override du job > config fournie > config.json > défaut
+    """
+    name = override or (config or {}).get('resource_policy') or load_policy_name()
+    return name if name in RESOURCE_POLICIES else DEFAULT_POLICY
+
+
+class ResourceBlocker:
+    """Annule les requêtes lourdes d'un contexte et compte ce qui a été bloqué"""
+
+    def __init__(self, policy=DEFAULT_POLICY):
+        self.policy = policy if policy in RESOURCE_POLICIES else DEFAULT_POLICY
+        self.blocked_types = RESOURCE_POLICIES[self.policy]['types']
+        self.block_tracking = RESOURCE_POLICIES[self.policy]['tracking']
+        self.allowed_requests = 0
+        self.blocked_requests = 0
+        self.blocked_bytes = 0
+        self.blocked_by_type = {}
+
+    @property
+    def active(self):
+        return bool(self.blocked_types) or self.block_tracking
+
+    def _classify(self, request):
+        """Catégorie de blocage de la requête, ou None si elle doit passer"""
+        if self.block_tracking and TRACKING_PATTERNS.search(request.url):
+            return 'tracking'
+        if request.resource_type in self.blocked_types:
+            return request.resource_type
+        return None
+
+    def _estimate_bytes(self, request, category):
+        match = _RANGE_RE.search(request.headers.get('range', ''))
+        if match:
+            return int(match.group(2)) - int(match.group(1)) + 1
+        return ESTIMATED_BYTES.get(category, 0)
+
+    def _should_block(self, request):
+        category = self._classify(request)
+        if category is None:
+            self.allowed_requests += 1
+            return False
+        self.blocked_requests += 1
+        self.blocked_bytes += self._estimate_bytes(request, category)
+        self.blocked_by_type[category] = self.blocked_by_type.get(category, 0) + 1
+        return True
+
+    async def _handle(self, route):
+        if self._should_block(route.request):
+            await route.abort('blockedbyclient')
+        else:
+            await route.continue_()
+
+    async def install(self, context):
+        """Applique la politique à un contexte"""
+        if self.active:
+            await context.route('**/*', self._handle)
+
+    def stats(self):
+        """Compteurs du job"""
+        return {
+            'policy': self.policy,
+            'allowed_requests': self.allowed_requests,
+            'blocked_requests': self.blocked_requests,
+            'blocked_bytes_estimated': self.blocked_bytes,
+            'blocked_by_type': dict(self.blocked_by_type),
+        }
+
+    def summary(self):
+        """Résumé lisible des ressources bloquées"""
+        if not self.active:
+            return "Ressources : tout chargé"
+        return (
+            f"Ressources bloquées : {self.blocked_requests} requêtes "
+            f"(~{self.blocked_bytes / 1_048_576:.1f} Mo estimés)"
+        )
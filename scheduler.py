@@ -0,0 +1,439 @@
+"""
+scheduler.py
+Planificateur : recherches enregistrées et veille concurrentielle récurrentes
+
+Tourne en tâche de fond, indépendamment de Streamlit. Chaque exécution est
+un processus à part (competitive_job.py, search_job.py <id>), suivi par le
+planificateur :
+- horaires au format cron (cf. cron.py) : la veille suit
+  auto_scrape_enabled / auto_scrape_time (ou competitive_cron), chaque
+  recherche enregistrée a son propre horaire
+- pas de chevauchement : un job encore en cours n'est pas relancé
+- décalage aléatoire de 0 à scheduler_jitter secondes, pour étaler la
+  charge au lieu de tout lancer à la même minute
+- au plus scheduler_max_concurrent jobs en même temps, les autres attendent ;
+  une occurrence n'est consommée (last_scheduled) qu'à son lancement, pour
+  qu'un arrêt pendant l'attente ne la perde pas
+- jobs en cours (PID) enregistrés dans scheduler_state.json : après un
+  redémarrage, un job encore vivant est suivi au lieu d'être relancé
+- rattrapage : une exécution manquée (planificateur arrêté, poste éteint)
+  est lancée au redémarrage, une seule fois même si plusieurs ont été
+  manquées, si elle date de moins de scheduler_catchup_hours heures
+- scheduler_status.json : prochaines exécutions et jobs en cours (page
+  Planification de l'interface)
+
+Les horaires et recherches sont relus dans config.json à chaque tour :
+une modification dans l'interface s'applique sans redémarrage.
+
+USAGE:
+    python scheduler.py              (planificateur)
+    python scheduler.py --list       (prochaines exécutions)
+"""
+
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+from cron import CronSchedule, daily_at
+from process_utils import pid_alive
+
+CONFIG_FILE = "config.json"
+STATE_FILE = "scheduler_state.json"
+STATUS_FILE = "scheduler_status.json"
+COMPETITIVE_STATUS_FILE = "competitive_status.json"
+LOG_FILE = "scheduler.log"
+
+TICK_SECONDS = 20
+DEFAULT_JITTER = 300  # secondes
+DEFAULT_MAX_CONCURRENT = 1
+DEFAULT_CATCHUP_HOURS = 12
+# Statut de veille sans mise à jour depuis plus longtemps : processus arrêté
+COMPETITIVE_STALE_AFTER = 600  # secondes
+
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================
+# FONCTIONS UTILITAIRES
+# ============================================
+
+def load_json(filename, default):
+    if os.path.exists(filename):
+        try:
+            with open(filename, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Erreur lecture {filename}: {e}")
+    return default
+
+
+def save_json(filename, data):
+    """Écriture atomique (l'interface peut lire le fichier à tout moment)"""
+    tmp_path = f"{filename}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, filename)
+        return True
+    except Exception as e:
+        logger.error(f"Erreur sauvegarde {filename}: {e}")
+        return False
+
+
+def _parse_date(text):
+    try:
+        return datetime.strptime(text, DATE_FORMAT)
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_fresh(last_update, max_age):
+    updated = _parse_date(last_update)
+    return updated is not None and (datetime.now() - updated).total_seconds() <= max_age
+
+
+def is_competitive_running():
+    """Veille en cours (lancée par le planificateur ou depuis l'interface)"""
+    status = load_json(COMPETITIVE_STATUS_FILE, {})
+    return status.get('status') == 'running' and _is_fresh(status.get('last_update'), COMPETITIVE_STALE_AFTER)
+
+
+def load_scheduler_status():
+    """Contenu de scheduler_status.json (None si absent)"""
+    return load_json(STATUS_FILE, None)
+
+
+def is_scheduler_alive(status=None):
+    """Un planificateur a-t-il mis à jour son statut récemment ?"""
+    status = load_scheduler_status() if status is None else status
+    return bool(status) and _is_fresh(status.get('last_update'), TICK_SECONDS * 3)
+
+
+def spawn_python(args):
+    """Lance un script Python en arrière-plan (sans fenêtre sous Windows)"""
+    command = [sys.executable] + list(args)
+    if sys.platform == 'win32':
+        return subprocess.Popen(command, creationflags=subprocess.CREATE_NO_WINDOW)
+    return subprocess.Popen(command)
+
+
+def start_competitive_job():
+    """
+    Lance competitive_job.py, sauf si une veille est déjà en cours (None)
+
+    Le statut 'running' est écrit avant le lancement : l'interface et le
+    planificateur voient la veille dès cet instant, sans attendre que le
+    job (navigateur, chargement du rapport) publie sa première progression.
+    """
+    if is_competitive_running():
+        return None
+    save_json(COMPETITIVE_STATUS_FILE, {
+        'status': 'running',
+        'message': "Démarrage de la veille...",
+        'progress_percent': 0,
+        'last_update': datetime.now().strftime(DATE_FORMAT)
+    })
+    try:
+        return spawn_python(['competitive_job.py'])
+    except Exception as e:
+        save_json(COMPETITIVE_STATUS_FILE, {
+            'status': 'error',
+            'message': f"Erreur: lancement impossible ({e})",
+            'progress_percent': 0,
+            'last_update': datetime.now().strftime(DATE_FORMAT)
+        })
+        raise
+
+
+# ============================================
+# JOBS PLANIFIÉS
+# ============================================
+
+def load_jobs(config):
+    """
+    Jobs planifiés d'après config.json
+
+    Returns:
+        (jobs, erreurs) : jobs = liste de dicts (id, name, kind, cron,
+        schedule, args) ; erreurs = {id: message} pour les horaires invalides
+    """
+    jobs, errors = [], {}
+
+    if config.get('auto_scrape_enabled'):
+        expression = config.get('competitive_cron') or daily_at(config.get('auto_scrape_time', '08:00'))
+        jobs.append({
+            'id': 'competitive', 'name': "Veille concurrentielle", 'kind': 'competitive',
+            'cron': expression, 'args': ['competitive_job.py']
+        })
+
+    for search in config.get('saved_searches', []):
+        if search.get('enabled', True) and search.get('cron'):
+            jobs.append({
+                'id': f"search:{search['id']}", 'name': search.get('name', search['id']), 'kind': 'search',
+                'cron': search['cron'], 'args': ['search_job.py', search['id']]
+            })
+
+    valid = []
+    for job in jobs:
+        try:
+            job['schedule'] = CronSchedule(job['cron'])
+            valid.append(job)
+        except ValueError as e:
+            errors[job['id']] = str(e)
+    return valid, errors
+
+
+class Scheduler:
+    """Planificateur (un tour toutes les TICK_SECONDS secondes)"""
+
+    def __init__(self, config_file=CONFIG_FILE, state_file=STATE_FILE, status_file=STATUS_FILE, rng=None):
+        self.config_file = config_file
+        self.state_file = state_file
+        self.status_file = status_file
+        # Tirage du décalage aléatoire (injectable pour les tests)
+        self.rng = rng or random.Random()
+        # Par job : dernière occurrence traitée, dernier lancement, dernier résultat, job en cours
+        self.state = load_json(state_file, {})
+        # Jobs en cours : id -> {'process', 'pid', 'started'} (process None : job repris au démarrage)
+        self.running = {}
+        # Jobs échus en attente : id -> {'due', 'run_at'}
+        self.queued = {}
+        self.jobs = []
+        self.errors = {}
+        self.config = {}
+        self.started_at = datetime.now()
+        self._recover_running()
+
+    # Réglages
+
+    @property
+    def jitter(self):
+        return float(self.config.get('scheduler_jitter', DEFAULT_JITTER))
+
+    @property
+    def max_concurrent(self):
+        return max(1, int(self.config.get('scheduler_max_concurrent', DEFAULT_MAX_CONCURRENT)))
+
+    @property
+    def catchup_window(self):
+        return timedelta(hours=float(self.config.get('scheduler_catchup_hours', DEFAULT_CATCHUP_HOURS)))
+
+    def _job_state(self, job_id):
+        return self.state.setdefault(job_id, {})
+
+    def _save_state(self):
+        save_json(self.state_file, self.state)
+
+    def _recover_running(self):
+        """Jobs lancés par un planificateur précédent : suivis s'ils tournent encore"""
+        for job_id, state in self.state.items():
+            run = state.get('running')
+            if not run:
+                continue
+            if pid_alive(run.get('pid')):
+                started = _parse_date(run.get('started')) or self.started_at
+                self.running[job_id] = {'process': None, 'pid': run['pid'], 'started': started}
+                logger.info(f"Job {job_id} toujours en cours (pid {run['pid']}) : suivi repris")
+            else:
+                del state['running']
+                state['last_status'] = "interrompu (arrêt pendant l'exécution)"
+                logger.info(f"Job {job_id} (pid {run.get('pid')}) arrêté pendant l'absence du planificateur")
+
+    # Un tour
+
+    def tick(self, now=None):
+        now = now or datetime.now()
+        self.config = load_json(self.config_file, {})
+        self.jobs, self.errors = load_jobs(self.config)
+        known_ids = {job['id'] for job in self.jobs}
+        # Job retiré ou désactivé : plus d'exécution en attente
+        for job_id in [job_id for job_id in self.queued if job_id not in known_ids]:
+            del self.queued[job_id]
+
+        self._reap(now)
+        for job in self.jobs:
+            self._schedule(job, now)
+        self._launch_ready(now)
+        self._save_state()
+        self.write_status(now)
+
+    def _reap(self, now):
+        """Enregistre la fin des processus terminés"""
+        for job_id, run in list(self.running.items()):
+            if run['process'] is not None:
+                code = run['process'].poll()
+                if code is None:
+                    continue
+                status = 'success' if code == 0 else f"error ({code})"
+            else:
+                # Job repris au démarrage : pas un processus enfant, code de sortie inconnu
+                if pid_alive(run['pid']):
+                    continue
+                status = "terminé (code de sortie inconnu)"
+            del self.running[job_id]
+            state = self._job_state(job_id)
+            state.pop('running', None)
+            state['last_finished'] = now.strftime(DATE_FORMAT)
+            state['last_status'] = status
+            logger.info(f"Job {job_id} terminé : {state['last_status']}")
+
+    def _schedule(self, job, now):
+        """Met le job en attente si une occurrence est échue"""
+        state = self._job_state(job['id'])
+        last = _parse_date(state.get('last_scheduled'))
+        if last is None or state.get('cron') != job['cron']:
+            # Nouveau job ou horaire modifié : première occurrence à venir, pas de rattrapage
+            state.update(cron=job['cron'], last_scheduled=now.strftime(DATE_FORMAT))
+            return
+
+        due = job['schedule'].next_after(last)
+        if due > now:
+            return
+        # Occurrences manquées regroupées en une seule exécution (la plus récente)
+        latest = due
+        following = job['schedule'].next_after(latest)
+        while following <= now:
+            latest, following = following, job['schedule'].next_after(following)
+
+        if job['id'] in self.queued:
+            # Déjà en attente de lancement : l'occurrence la plus récente remplace la précédente
+            self.queued[job['id']]['due'] = latest
+            return
+        if now - latest > self.catchup_window:
+            state['last_scheduled'] = latest.strftime(DATE_FORMAT)
+            state['last_status'] = f"manqué ({latest.strftime(DATE_FORMAT)}, hors fenêtre de rattrapage)"
+            logger.info(f"Job {job['id']} : occurrence du {latest} trop ancienne, ignorée")
+            return
+        if job['id'] in self.running:
+            state['last_scheduled'] = latest.strftime(DATE_FORMAT)
+            state['last_status'] = f"ignoré ({latest.strftime(DATE_FORMAT)}, exécution précédente en cours)"
+            logger.info(f"Job {job['id']} encore en cours : occurrence du {latest} ignorée")
+            return
+
+        # last_scheduled avance au lancement : un arrêt pendant l'attente ne perd pas l'occurrence
+        run_at = now + timedelta(seconds=self.rng.uniform(0, self.jitter))
+        self.queued[job['id']] = {'due': latest, 'run_at': run_at}
+        logger.info(f"Job {job['id']} échu ({latest}) : lancement prévu à {run_at.strftime(DATE_FORMAT)}")
+
+    def _launch_ready(self, now):
+        """Lance les jobs en attente dont le décalage est écoulé, dans la limite de concurrence"""
+        ready = sorted(
+            (item['run_at'], job_id) for job_id, item in self.queued.items() if item['run_at'] <= now
+        )
+        jobs = {job['id']: job for job in self.jobs}
+        for _, job_id in ready:
+            if len(self.running) >= self.max_concurrent:
+                break
+            job = jobs[job_id]
+            item = self.queued.pop(job_id)
+            state = self._job_state(job_id)
+            state['last_scheduled'] = item['due'].strftime(DATE_FORMAT)
+            try:
+                process = self.spawn(job)
+            except Exception as e:
+                state['last_status'] = f"error (lancement : {e})"
+                logger.error(f"Lancement de {job_id} impossible : {e}")
+                continue
+            if process is None:
+                # Veille lancée à la main depuis l'interface
+                state['last_status'] = "ignoré (veille déjà en cours)"
+                logger.info("Veille déjà en cours : exécution planifiée ignorée")
+                continue
+            self.running[job_id] = {'process': process, 'pid': process.pid, 'started': now}
+            state['running'] = {'pid': process.pid, 'started': now.strftime(DATE_FORMAT)}
+            state['last_started'] = now.strftime(DATE_FORMAT)
+            state['last_status'] = 'running'
+            # PID enregistré sans attendre la fin du tour : un arrêt brutal ne doit pas le perdre
+            self._save_state()
+            logger.info(f"Job {job_id} lancé (pid {process.pid})")
+
+    def spawn(self, job):
+        """Processus lancé (None si le job ne doit pas tourner maintenant)"""
+        if job['kind'] == 'competitive':
+            return start_competitive_job()
+        return spawn_python(job['args'])
+
+    # Statut
+
+    def job_rows(self, now):
+        """Une ligne par job : état, prochaine exécution, dernier résultat"""
+        rows = []
+        for job in self.jobs:
+            state = self.state.get(job['id'], {})
+            last = _parse_date(state.get('last_scheduled')) or now
+            row = {
+                'id': job['id'],
+                'name': job['name'],
+                'kind': job['kind'],
+                'cron': job['cron'],
+                'state': 'idle',
+                'next_run': job['schedule'].next_after(max(last, now)).strftime(DATE_FORMAT),
+                'last_started': state.get('last_started'),
+                'last_finished': state.get('last_finished'),
+                'last_status': state.get('last_status'),
+            }
+            if job['id'] in self.running:
+                run = self.running[job['id']]
+                row.update(state='running', started=run['started'].strftime(DATE_FORMAT), pid=run['pid'])
+            elif job['id'] in self.queued:
+                row.update(state='queued', run_at=self.queued[job['id']]['run_at'].strftime(DATE_FORMAT))
+            rows.append(row)
+        for job_id, error in self.errors.items():
+            rows.append({'id': job_id, 'name': job_id, 'state': 'invalid', 'last_status': error})
+        return rows
+
+    def write_status(self, now):
+        save_json(self.status_file, {
+            'pid': os.getpid(),
+            'started_at': self.started_at.strftime(DATE_FORMAT),
+            'last_update': now.strftime(DATE_FORMAT),
+            'max_concurrent': self.max_concurrent,
+            'jitter': self.jitter,
+            'jobs': self.job_rows(now),
+        })
+
+    def run_forever(self):
+        logger.info("Planificateur démarré")
+        while True:
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"Erreur du planificateur : {e}", exc_info=True)
+            time.sleep(TICK_SECONDS)
+
+
+# ============================================
+# POINT D'ENTRÉE
+# ============================================
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(LOG_FILE, encoding='utf-8'),
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
+
+    if len(sys.argv) > 1 and sys.argv[1] == "--list":
+        jobs, errors = load_jobs(load_json(CONFIG_FILE, {}))
+        now = datetime.now()
+        for job in jobs:
+            print(f"{job['schedule'].next_after(now).strftime(DATE_FORMAT)}  {job['cron']:<16}  {job['name']}")
+        for job_id, error in errors.items():
+            print(f"{'invalide':<19}  {job_id} : {error}")
+        if not jobs and not errors:
+            print("Aucun job planifié")
+    elif is_scheduler_alive():
+        print(f"Un planificateur tourne déjà (pid {load_scheduler_status().get('pid')})")
+        sys.exit(1)
+    else:
+        Scheduler().run_forever()
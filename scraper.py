@@ -1,21 +1,34 @@
 import streamlit as st
 import asyncio
 import queue
-from playwright.async_api import async_playwright
 import pandas as pd
 import json
 import os
-from supabase_db import (
-    load_blacklist, save_blacklist,
-    load_whitelist, save_whitelist,
-    load_history, add_to_history, update_history_incrementally,
-    load_config, save_config
+from storage import (
+    load_blacklist, load_whitelist,
+    add_pages, remove_pages,
+    load_history_summaries, count_history,
+    load_entry_ads_page, iter_entry_ads, search_ads, find_entries_with_ads, load_ad_columns,
+    add_to_history, store_entry_ads,
+    load_catalog, load_catalog_countries, catalog_stats,
+    load_reports, load_report_ads, storage_summary,
+    DEFAULT_BACKEND, DEFAULT_SQLITE_PATH
+)
+from display_utils import export_panel
+from ads_scraper import FacebookAdsLibraryScraper, scrape_countries
+from page_matcher import PageMatcher
+from browser_pool import BrowserPool, DEFAULT_MAX_AGE, DEFAULT_MAX_USES
+from pacing import PacingBudget
+from write_behind import WriteBehindQueue
+from resource_policy import resolve_policy, RESOURCE_POLICIES, POLICY_LABELS, DEFAULT_POLICY
+from cron import CronSchedule
+from scheduler import (
+    is_competitive_running, is_scheduler_alive, load_scheduler_status, spawn_python, start_competitive_job
 )
 import sys
 import time
-import random
+import atexit
 import threading
-import schedule
 from datetime import datetime, timedelta
 from pathlib import Path
 import logging
@@ -111,7 +124,6 @@ CONFIG_FILE = "config.json"
 BLACKLIST_FILE = "blacklist.json"
 WHITELIST_FILE = "whitelist.json"
 HISTORY_FILE = "scraping_history.json"
-DAILY_REPORT_FILE = "daily_competitive_reports.json"
 SCRAPING_STATE_FILE = "scraping_state.json"
 FB_ID_STATUS_FILE = "fb_id_status.json"
 FB_ID_RESULT_FILE = "fb_id_result.json"
@@ -175,7 +187,17 @@ def load_config():
             "max_ads": 500,
             "max_time": 30,
             "auto_scrape_enabled": False,
-            "auto_scrape_time": "08:00"
+            "auto_scrape_time": "08:00",
+            "capture_mode": "dom",
+            "cursor_pagination": True,
+            "resource_policy": DEFAULT_POLICY,
+            "max_concurrency": 2,
+            "global_min_interval": 2,
+            "competitive_workers": 3,
+            "competitive_min_interval": 5,
+            "saved_searches": [],
+            "storage_backend": DEFAULT_BACKEND,
+            "sqlite_path": DEFAULT_SQLITE_PATH
         }
 
 def save_config(config):
@@ -183,21 +205,6 @@ def save_config(config):
     with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
         json.dump(config, f, indent=2)
 
-def load_daily_reports():
-    """Charge les rapports journaliers de veille concurrentielle"""
-    if os.path.exists(DAILY_REPORT_FILE):
-        try:
-            with open(DAILY_REPORT_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except:
-            return []
-    return []
-
-def save_daily_reports(reports):
-    """Sauvegarde les rapports journaliers"""
-    with open(DAILY_REPORT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(reports, f, indent=2, ensure_ascii=False)
-
 def load_scraping_state():
     """Charge l'état du scraping en cours"""
     if os.path.exists(SCRAPING_STATE_FILE):
@@ -324,41 +331,24 @@ def add_pages_to_list_batch(page_ids, list_type, source_id, config=None):
     # ============================================
     if list_type == 'blacklist':
         try:
-            # Charger la blacklist actuelle
-            current_blacklist = load_blacklist()
+            # Entrées à créer (les pages déjà présentes sont ignorées par la base)
+            date_ajout = datetime.now().strftime('%d-%m-%Y %H:%M:%S')
+            new_entries = [
+                {
+                    'id_page': page_data.get('page_id'),
+                    'nom_page': page_data.get('nom_page', 'N/A'),
+                    'date_ajout': date_ajout
+                }
+                for page_data in page_ids
+            ]
             
-            # Extraire les page_ids existants pour vérification doublon
-            existing_page_ids = {item.get('page_id') for item in current_blacklist}
+            added = add_pages('blacklist', new_entries)
+            if added is None:
+                raise RuntimeError("enregistrement impossible")
             
             # Compteurs
-            added_count = 0
-            skipped_count = 0
-            
-            # Traiter chaque page
-            for page_data in page_ids:
-                page_id = page_data.get('page_id')
-                nom_page = page_data.get('nom_page', 'N/A')
-                
-                # Vérifier si déjà existant
-                if page_id in existing_page_ids:
-                    skipped_count += 1
-                    continue
-                
-                # Créer l'entrée
-                new_entry = {
-                    'id_page': page_id,
-                    'nom_page': nom_page,
-                    'date_ajout': datetime.now().strftime('%d-%m-%Y %H:%M:%S')
-                }
-                
-                # Ajouter à la liste
-                current_blacklist.append(new_entry)
-                existing_page_ids.add(page_id)
-                added_count += 1
-            
-            # Sauvegarder la blacklist mise à jour
-            if added_count > 0:
-                save_blacklist(current_blacklist)
+            added_count = len(added)
+            skipped_count = len(page_ids) - added_count
             
             # Préparer le message de retour
             total_count = len(page_ids)
@@ -511,6 +501,9 @@ with st.sidebar:
     # Bouton pour veille concurrentielle
     if st.button("📊 Veille Concurrentielle", width="stretch"):
         set_page("competitive")
+    
+    if st.button("⏰ Planification", width="stretch"):
+        set_page("schedule")
 
     # Afficher la progression de la veille concurrentielle
     display_competitive_progress()
@@ -561,6 +554,46 @@ with st.sidebar:
             step=5
         )
         
+        max_concurrency = st.number_input(
+            "Pays scrapés en parallèle",
+            min_value=1,
+            max_value=5,
+            value=st.session_state.config.get('max_concurrency', 2),
+            step=1,
+            help="Nombre de pays traités simultanément lors d'un scraping multi-pays"
+        )
+        
+        global_min_interval = st.number_input(
+            "Intervalle min. entre requêtes, tous pays confondus (s)",
+            min_value=0.0,
+            max_value=30.0,
+            value=float(st.session_state.config.get('global_min_interval', st.session_state.config.get('pause_min', 2))),
+            step=0.5,
+            help="Garde un rythme global raisonnable quand plusieurs pays tournent en parallèle"
+        )
+        
+        capture_network = st.toggle(
+            "Capture réseau (GraphQL)",
+            value=st.session_state.config.get('capture_mode', 'dom') == 'network',
+            help="Lire les publicités dans les réponses réseau de la page plutôt que dans le DOM (plateformes réelles, moins de charge navigateur)"
+        )
+        
+        cursor_pagination = st.toggle(
+            "Pagination sans scroll",
+            value=st.session_state.config.get('cursor_pagination', True),
+            help="Récupérer les pages suivantes directement via le curseur du fil (le scroll reste utilisé si aucun curseur n'est trouvé)"
+        )
+        
+        policy_options = list(RESOURCE_POLICIES)
+        current_policy = st.session_state.config.get('resource_policy', DEFAULT_POLICY)
+        resource_policy = st.selectbox(
+            "Ressources chargées",
+            options=policy_options,
+            format_func=lambda x: POLICY_LABELS[x],
+            index=policy_options.index(current_policy) if current_policy in policy_options else 0,
+            help="Les URLs des médias restent extraites même si les fichiers ne sont pas téléchargés"
+        )
+        
         if pause_min > pause_max:
             st.error("⚠️ Min doit être ≤ Max")
 
@@ -571,7 +604,7 @@ with st.sidebar:
         auto_enabled = st.toggle(
             "Activer la veille quotidienne",
             value=st.session_state.config.get('auto_scrape_enabled', False),
-            help="Scraper automatiquement les concurrents chaque jour"
+            help="Scraper automatiquement les concurrents chaque jour (planificateur requis, page ⏰ Planification)"
         )
         
         auto_time = st.time_input(
@@ -579,15 +612,41 @@ with st.sidebar:
             value=datetime.strptime(st.session_state.config.get('auto_scrape_time', '08:00'), '%H:%M').time()
         )
         
+        competitive_workers = st.number_input(
+            "Concurrents scannés en parallèle",
+            min_value=1,
+            max_value=8,
+            value=st.session_state.config.get('competitive_workers', 3),
+            step=1,
+            help="Workers de la veille : ils partagent un navigateur et se répartissent la whitelist"
+        )
+        
+        competitive_min_interval = st.number_input(
+            "Intervalle min. entre requêtes de la veille (s)",
+            min_value=0.0,
+            max_value=60.0,
+            value=float(st.session_state.config.get('competitive_min_interval', 5)),
+            step=0.5,
+            help="Rythme global de la veille, tous workers confondus (remplace la pause entre concurrents)"
+        )
+        
         # Sauvegarder si changements
         new_config = {
+            **st.session_state.config,
             'headless': headless,
             'pause_min': pause_min,
             'pause_max': pause_max,
             'max_ads': max_ads,
             'max_time': max_time,
             'auto_scrape_enabled': auto_enabled,
-            'auto_scrape_time': auto_time.strftime('%H:%M')
+            'auto_scrape_time': auto_time.strftime('%H:%M'),
+            'capture_mode': 'network' if capture_network else 'dom',
+            'cursor_pagination': cursor_pagination,
+            'resource_policy': resource_policy,
+            'max_concurrency': max_concurrency,
+            'global_min_interval': global_min_interval,
+            'competitive_workers': competitive_workers,
+            'competitive_min_interval': competitive_min_interval
         }
         
         if new_config != st.session_state.config:
@@ -597,497 +656,58 @@ with st.sidebar:
                     
     # Stats rapides
     with st.expander("📊 Statistiques", expanded=True):
-        history = load_history()
-        st.metric("Requêtes totales", len(history))
+        st.metric("Requêtes totales", count_history())
         st.metric("Blacklist", len(st.session_state.blacklist))
         st.metric("Whitelist (Concurrents)", len(st.session_state.whitelist))
+        st.caption(storage_summary())
         
         # Indicateur de scraping en cours
         if st.session_state.scraping_in_progress:
             st.warning("⚙️ Scraping en cours...")
 
 # ============================================
-# CLASSE DE SCRAPING AMÉLIORÉE
+# POOL DE NAVIGATEURS (SESSION)
 # ============================================
 
-class FacebookAdsLibraryScraper:
-    def __init__(self, country, status, media_type, blacklist, config, entry_id=None):
-        self.country = country[0] if isinstance(country, tuple) else country
-        self.status = status
-        self.media_type = media_type
-        self.blacklist = blacklist
-        self.config = config
-        self.ads_data = []
-        self.progress_callback = None
-        self.request_count = 0
-        self.start_time = None
-        self.entry_id = entry_id
-        self.last_save_count = 0
-        
-    def set_progress_callback(self, callback):
-        self.progress_callback = callback
-    
-    def _save_checkpoint(self):
-        """Sauvegarde automatique tous les 50 résultats"""
-        if len(self.ads_data) - self.last_save_count >= 50:
-            if self.entry_id:
-                new_ads = self.ads_data[self.last_save_count:]
-                update_history_incrementally(self.entry_id, new_ads)
-                self.last_save_count = len(self.ads_data)
-                if self.progress_callback:
-                    # ✅ CORRECTION : Si progression > 100%, on la ramène à 100%
-                    progress = (len(self.ads_data) / self.config.get('max_ads', 500)) * 100
-                    if progress > 100:
-                        progress = 100
-                        
-                    self.progress_callback(
-                        progress,
-                        f"💾 Sauvegarde automatique : {len(self.ads_data)} pubs"
-                    )
-        
-    async def scrape(self, keyword="", date_filter=None, max_ads=500, max_scroll_time=1800, page_id=None):
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(
-                headless=self.config['headless'],
-                args=['--disable-blink-features=AutomationControlled']
-            )
-            
-            context = await browser.new_context(
-                viewport={'width': 1920, 'height': 1080},
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                locale='fr-FR'
-            )
-            
-            page = await context.new_page()
-            
-            await page.add_init_script("""
-                Object.defineProperty(navigator, 'webdriver', {
-                    get: () => false
-                });
-            """)
-            
-            base_url = "https://www.facebook.com/ads/library"
-            url = f"{base_url}?active_status={self.status}&ad_type=all&country={self.country}"
-            
-            if self.media_type != "all":
-                url += f"&media_type={self.media_type}"
-            else:
-                url += "&media_type=all"
-            
-            if keyword:
-                url += f"&q={keyword}"
-            
-            # Si un page_id est fourni, l'ajouter
-            if page_id:
-                url += f"&search_page_ids={page_id}"
-            
-            # Ajouter le filtre de date
-            if date_filter:
-                date_type = date_filter.get('type')
-                date1 = date_filter.get('date1')
-                date2 = date_filter.get('date2')
-                
-                if date_type == "before" and date1:
-                    url += f"&start_date[max]={date1}"
-                elif date_type == "on" and date1:
-                    url += f"&start_date[min]={date1}&start_date[max]={date1}"
-                elif date_type == "after" and date1:
-                    url += f"&start_date[min]={date1}"
-                elif date_type == "between" and date1 and date2:
-                    url += f"&start_date[min]={date1}&start_date[max]={date2}"
-            
-            if self.progress_callback:
-                self.progress_callback(0, f"🌍 Navigation vers Facebook Ads Library...")
-            
-            try:
-                await page.goto(url, wait_until="domcontentloaded", timeout=90000)
-                await asyncio.sleep(8)
-                await page.evaluate("window.scrollTo(0, 1000)")
-                await asyncio.sleep(5)
-            except Exception as e:
-                if self.progress_callback:
-                    self.progress_callback(0, f"❌ Erreur de chargement: {str(e)}")
-                await browser.close()
-                raise Exception(f"Impossible de charger la page Facebook")
-            
-            self.start_time = time.time()
-            last_count = 0
-            consecutive_same_count = 0
-            scroll_attempts = 0
-            
-            while len(self.ads_data) < max_ads:
-                elapsed = time.time() - self.start_time
-                if elapsed > max_scroll_time:
-                    if self.progress_callback:
-                        self.progress_callback(100, f"⏱️ Temps maximum atteint ({max_scroll_time}s)")
-                    break
-                
-                # Pause longue après 20 minutes
-                if elapsed > 1200:
-                    if self.request_count % random.randint(20, 40) == 0 and self.request_count > 0:
-                        pause_duration = random.uniform(120, 300)
-                        if self.progress_callback:
-                            self.progress_callback(
-                                (len(self.ads_data) / max_ads) * 100,
-                                f"⏸️ Pause longue de {int(pause_duration/60)} minutes..."
-                            )
-                        await asyncio.sleep(pause_duration)
-                
-                await self._extract_ads_from_page(page)
-                self.request_count += 1
-                scroll_attempts += 1
-                
-                # Sauvegarde automatique tous les 50 résultats
-                self._save_checkpoint()
-                
-                current_count = len(self.ads_data)
-                progress = min((current_count / max_ads) * 100, 100)
-                
-                if self.progress_callback:
-                    self.progress_callback(
-                        progress, 
-                        f"📊 {current_count} pubs | ⏱️ {int(elapsed)}s | 🔄 {self.request_count} req | 📜 {scroll_attempts} scrolls"
-                    )
-                
-                if current_count == last_count:
-                    consecutive_same_count += 1
-                    
-                    if consecutive_same_count >= 5:
-                        if self.progress_callback:
-                            self.progress_callback(
-                                progress,
-                                f"⚠️ Aucune nouvelle pub après 5 tentatives. Arrêt."
-                            )
-                        break
-                        
-                    if consecutive_same_count >= 2:
-                        scroll_amount = random.randint(2000, 3000)
-                        await page.evaluate(f"window.scrollBy(0, {scroll_amount})")
-                        await asyncio.sleep(4)
-                        await page.evaluate(f"window.scrollBy(0, -500)")
-                        await asyncio.sleep(2)
-                else:
-                    consecutive_same_count = 0
-                
-                last_count = current_count
-                
-                if consecutive_same_count == 0:
-                    scroll_amount = random.randint(800, 1200)
-                else:
-                    scroll_amount = random.randint(1500, 2500)
-                
-                await page.evaluate(f"window.scrollBy(0, {scroll_amount})")
-                
-                if consecutive_same_count >= 2:
-                    pause_duration = random.uniform(
-                        self.config['pause_max'], 
-                        self.config['pause_max'] + 3
-                    )
-                else:
-                    pause_duration = random.uniform(
-                        self.config['pause_min'], 
-                        self.config['pause_max']
-                    )
-                
-                await asyncio.sleep(pause_duration)
-                
-                is_at_bottom = await page.evaluate("""
-                    () => {
-                        return (window.innerHeight + window.scrollY) >= document.body.offsetHeight - 100;
-                    }
-                """)
-                
-                if is_at_bottom and consecutive_same_count >= 3:
-                    if self.progress_callback:
-                        self.progress_callback(
-                            progress,
-                            f"📍 Bas de page atteint. Fin du scraping."
-                        )
-                    break
-            
-            await browser.close()
-            
-            if self.progress_callback:
-                self.progress_callback(
-                    100,
-                    f"✅ Scraping terminé : {len(self.ads_data)} publicités extraites"
-                )
-            
-            return self.ads_data
+def get_scraping_runtime():
+    """
+    Boucle asyncio et pool de navigateurs conservés pour toute la session :
+    les navigateurs restent ouverts d'un pays, d'un mot-clé et d'un scraping à l'autre
+    """
+    if 'browser_pool' not in st.session_state:
+        if sys.platform == 'win32':
+            asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+        loop = asyncio.new_event_loop()
+        pool = BrowserPool(
+            size=st.session_state.config.get('browser_pool_size', 1),
+            max_age=st.session_state.config.get('browser_max_age', DEFAULT_MAX_AGE),
+            max_uses=st.session_state.config.get('browser_max_uses', DEFAULT_MAX_USES)
+        )
+        st.session_state.scraping_loop = loop
+        st.session_state.browser_pool = pool
+        atexit.register(shutdown_browser_pool, loop, pool)
     
-    async def _extract_ads_from_page(self, page):
-        """EXTRACTION AMÉLIORÉE avec correction des champs"""
-        new_ads = await page.evaluate('''() => {
-            const ads = [];
-            const processedIds = new Set();
-            
-            const allDivs = document.querySelectorAll('div');
-            
-            allDivs.forEach(div => {
-                const text = div.innerText || '';
-                
-                if (text.includes('ID dans la bibliothèque') || text.includes('Library ID')) {
-                    
-                    const idMatch = text.match(/ID dans la bibliothèque[\\s:]*([0-9]+)/i) ||
-                                  text.match(/Library ID[\\s:]*([0-9]+)/i);
-                    
-                    if (!idMatch) return;
-                    
-                    const adId = idMatch[1];
-                    
-                    if (processedIds.has(adId)) return;
-                    processedIds.add(adId);
-                    
-                    const adLibraryUrl = `https://www.facebook.com/ads/library/?id=${adId}`;
-                    
-                    // Extraire l'annonceur et l'ID de la page
-                    let advertiser = 'N/A';
-                    let pageId = 'N/A';
-                    
-                    const pageLinks = div.querySelectorAll('a[href*="facebook.com/"]');
-                    for (let link of pageLinks) {
-                        const linkText = link.innerText.trim();
-                        const href = link.href;
-                        
-                        if (linkText && !linkText.includes('Sponsorisé') && 
-                            !linkText.includes('Sponsored') &&
-                            linkText.length < 100 && linkText.length > 2) {
-                            advertiser = linkText;
-                            
-                            const pageIdMatch = href.match(/facebook\\.com\\/(\\d+)/);
-                            if (pageIdMatch) {
-                                pageId = pageIdMatch[1];
-                            }
-                            break;
-                        }
-                    }
-                    
-                    // ✅ CORRECTION: Extraire le statut réel de la pub
-                    let adStatus = 'N/A';
-                    const statusText = text.toLowerCase();
-                    if (statusText.includes('inactive') || statusText.includes('plus diffusée')) {
-                        adStatus = 'Inactive';
-                    } else if (statusText.includes('active') || statusText.includes('en cours')) {
-                        adStatus = 'Active';
-                    } else {
-                        // Par défaut, si on trouve une pub sur la page "active", elle est active
-                        adStatus = 'Active';
-                    }
-                    
-                    // Extraire date
-                    let startDate = 'N/A';
-                    const dateMatch = text.match(/Début de la diffusion le ([^·]+)/i) ||
-                                    text.match(/Started running on ([^·]+)/i) ||
-                                    text.match(/(\\d{1,2}\\s+[a-zéû]+\\s+\\d{4})/i);
-                    if (dateMatch) {
-                        startDate = dateMatch[1].trim();
-                    }
-                    
-                    // Extraire plateformes
-                    let platforms = 'N/A';
-                    if (text.includes('Plateformes') || text.includes('Platforms')) {
-                        platforms = 'Multiple';
-                    }
-                    
-                    // Extraire le texte de la pub
-                    let adText = 'N/A';
-                    const sponsoredIndex = text.indexOf('Sponsorisé');
-                    if (sponsoredIndex !== -1) {
-                        const afterSponsored = text.substring(sponsoredIndex + 10);
-                        const lines = afterSponsored.split('\\n').filter(l => l.trim().length > 20);
-                        if (lines.length > 0) {
-                            adText = lines[0].substring(0, 500);
-                        }
-                    }
-                    
-                    // ✅ CORRECTION: Récupérer la vraie image de la créative, pas le logo
-                    const allImages = div.querySelectorAll('img[src*="scontent"]');
-                    let mediaUrl = 'N/A';
-                    let mediaType = 'N/A';
-                    
-                    // Filtrer pour trouver la plus grande image (créative, pas logo)
-                    let largestImage = null;
-                    let maxSize = 0;
-                    
-                    allImages.forEach(img => {
-                        const width = img.naturalWidth || img.width || 0;
-                        const height = img.naturalHeight || img.height || 0;
-                        const size = width * height;
-                        
-                        // Ignorer les petites images (logos, icônes)
-                        if (size > maxSize && width > 100 && height > 100) {
-                            maxSize = size;
-                            largestImage = img;
-                        }
-                    });
-                    
-                    // Vérifier aussi les vidéos
-                    const videos = div.querySelectorAll('video[src]');
-                    
-                    if (videos.length > 0) {
-                        mediaUrl = videos[0].src;
-                        mediaType = 'video';
-                    } else if (largestImage) {
-                        mediaUrl = largestImage.src;
-                        mediaType = 'image';
-                    }
-                    
-                    // ✅ CORRECTION: Extraire le VRAI texte du CTA
-                    let ctaUrl = 'N/A';
-                    let ctaText = 'N/A';
-                    
-                    // Chercher les liens CTA
-                    const ctaLinks = div.querySelectorAll('a[href*="l.facebook.com"], a[role="button"]');
-                    
-                    for (let link of ctaLinks) {
-                        const linkText = link.innerText.trim();
-                        
-                        // Filtrer les vrais boutons CTA (courts et significatifs)
-                        if (linkText && linkText.length < 50 && linkText.length > 2) {
-                            const lowerText = linkText.toLowerCase();
-                            
-                            // Mots-clés typiques des CTA
-                            const ctaKeywords = [
-                                'en savoir plus', 'commander', 'acheter', 'réserver',
-                                'télécharger', 'essayer', 'découvrir', 'profiter',
-                                'voir plus', 's\\'inscrire', 'obtenir', 'contacter',
-                                'shop now', 'learn more', 'buy now', 'sign up',
-                                'get', 'download', 'book', 'order'
-                            ];
-                            
-                            const isCta = ctaKeywords.some(keyword => lowerText.includes(keyword));
-                            
-                            if (isCta) {
-                                ctaText = linkText;
-                                if (link.href && link.href.includes('l.facebook.com')) {
-                                    ctaUrl = link.href;
-                                }
-                                break;
-                            }
-                        }
-                    }
-                    
-                    ads.push({
-                        ad_id: adId,
-                        page_id: pageId,
-                        advertiser: advertiser,
-                        country: window.location.href.match(/country=([A-Z]+)/)?.[1] || 'ALL',
-                        ad_status: adStatus,
-                        search_term: new URLSearchParams(window.location.search).get('q') || 'N/A',
-                        text: adText.trim(),
-                        start_date: startDate,
-                        platforms: platforms,
-                        media_type: mediaType,
-                        media_url: mediaUrl,
-                        cta_text: ctaText,
-                        cta_url: ctaUrl,
-                        ad_library_url: adLibraryUrl,
-                        scraped_at: new Date().toISOString()
-                    });
-                }
-            });
-            
-            return ads;
-        }''')
-        
-        # Filtrer les pages en blacklist et les doublons
-        existing_ids = {ad['ad_id'] for ad in self.ads_data}
-        
-        for ad in new_ads:
-            if ad['ad_id'] in existing_ids:
-                continue
-            
-            # Vérifier la blacklist
-            should_ignore = False
-            advertiser = ad['advertiser']
-            page_id = ad['page_id']
-            
-            if advertiser != 'N/A' or page_id != 'N/A':
-                for ignored in self.blacklist:
-                    nom_page = ignored.get('nom_page', '')
-                    id_page = str(ignored.get('id_page', ''))
-                    
-                    if (nom_page and nom_page.lower() in advertiser.lower()) or \
-                       (id_page and id_page == page_id):
-                        should_ignore = True
-                        break
-            
-            if not should_ignore:
-                self.ads_data.append(ad)
+    loop = st.session_state.scraping_loop
+    asyncio.set_event_loop(loop)
+    return loop, st.session_state.browser_pool
 
-# ============================================
-# FONCTION DE SCRAPING EN ARRIÈRE-PLAN
-# ============================================
-
-def run_scraping_task(country, status, media_type, search_term, date_filter, blacklist, config, entry_id, page_id=None):
-    """Exécute le scraping dans un thread séparé"""
+def shutdown_browser_pool(loop, pool):
+    """Ferme les navigateurs du pool (arrêt de l'application)"""
     try:
-        st.session_state.scraping_in_progress = True
-        st.session_state.current_scraping_id = entry_id
-        
-        scraper = FacebookAdsLibraryScraper(
-            country=country,
-            status=status,
-            media_type=media_type,
-            blacklist=blacklist,
-            config=config,
-            entry_id=entry_id
-        )
-        
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        results = loop.run_until_complete(
-            scraper.scrape(
-                keyword=search_term,
-                date_filter=date_filter,
-                max_ads=config['max_ads'],
-                max_scroll_time=config['max_time'] * 60,
-                page_id=page_id
-            )
-        )
-        loop.close()
-        
-        # Mise à jour finale
-        add_to_history(
-            query_info={},
-            results_count=len(results),
-            results_data=results,
-            status="success",
-            entry_id=entry_id
-        )
-        
+        if not loop.is_closed():
+            loop.run_until_complete(pool.close())
+            loop.close()
     except Exception as e:
-        add_to_history(
-            query_info={},
-            results_count=0,
-            results_data=[],
-            status="error",
-            error_message=str(e),
-            entry_id=entry_id
-        )
-    finally:
-        st.session_state.scraping_in_progress = False
-        st.session_state.current_scraping_id = None
-        clear_scraping_state()
+        logger.warning(f"Fermeture du pool de navigateurs : {e}")
 
 # ============================================
 # INTÉGRATION VEILLE CONCURRENTIELLE
 # ============================================
 
 def launch_competitive_intelligence():
-    """Lance le script de veille en arrière-plan"""
+    """Lance le script de veille en arrière-plan (refusé si une veille est déjà en cours)"""
     try:
-        if sys.platform == 'win32':
-            # Windows: masquer la fenêtre console
-            subprocess.Popen(
-                ["python", "competitive_job.py"],
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
-        else:
-            # Linux/Mac
-            subprocess.Popen(["python", "competitive_job.py"])
-        
-        return True
+        return start_competitive_job() is not None
     except Exception as e:
         logger.error(f"Erreur lancement veille: {e}")
         return False
@@ -1122,6 +742,17 @@ def display_competitive_progress():
         
         st.sidebar.caption(f"📊 {status.get('results_count', 0)} pubs trouvées")
         
+        # Un concurrent par worker en parallèle
+        if status.get('status') == 'running':
+            for worker in status.get('workers', []):
+                if worker.get('state') == 'scraping':
+                    st.sidebar.caption(
+                        f"⚙️ Worker {worker['worker']} : {worker.get('competitor', '')} ({worker.get('ads', 0)} pubs)"
+                    )
+                else:
+                    label = "terminé" if worker.get('state') == 'done' else "en attente"
+                    st.sidebar.caption(f"⚙️ Worker {worker['worker']} : {label} ({worker.get('scanned', 0)} concurrents)")
+        
         last_update = status.get('last_update', '')
         if last_update:
             st.sidebar.caption(f"🕐 {last_update}")
@@ -1143,10 +774,13 @@ def display_competitive_progress():
 # PAGE HISTORIQUE - AVEC VUE FUSIONNÉE
 # ============================================
 
+RESULTS_PAGE_SIZE = 100  # publicités affichées par page dans la vue par scraping
+
 if st.session_state.current_page == "history":
     st.title("📜 Historique des scraping")
     
-    history = load_history()
+    # Métadonnées uniquement : les publicités sont chargées à la demande
+    history = load_history_summaries()
     
     if not history:
         st.info("Aucun historique disponible. Lancez un scraping pour commencer.")
@@ -1202,24 +836,12 @@ if st.session_state.current_page == "history":
             if search_term:
                 filtered_history = []
                 search_lower = search_term.lower()
+                # Recherche dans les publicités faite par la base
+                matching_entries = find_entries_with_ads(search_term)
                 
                 for h in history:
-                    match = False
-                    
                     query_str = json.dumps(h['query']).lower()
-                    if search_lower in query_str:
-                        match = True
-                    
-                    for result in h.get('results', []):
-                        if (search_lower in result.get('advertiser', '').lower() or
-                            search_lower in result.get('search_term', '').lower() or
-                            search_lower in result.get('page_id', '').lower() or
-                            search_lower in result.get('country', '').lower() or
-                            search_lower in result.get('text', '').lower()):
-                            match = True
-                            break
-                    
-                    if match:
+                    if search_lower in query_str or h['id'] in matching_entries:
                         filtered_history.append(h)
             
             # Filtre par statut
@@ -1230,14 +852,16 @@ if st.session_state.current_page == "history":
             
             # Filtre par type de média
             if media_filter != "Tous":
+                media_by_entry = {}
+                for row in load_ad_columns('entry_id, media_type'):
+                    media_by_entry.setdefault(row['entry_id'], set()).add(row.get('media_type') or 'N/A')
+                
                 temp_filtered = []
                 for h in filtered_history:
-                    results = h.get('results', [])
-                    if not results:
+                    media_types = media_by_entry.get(h['id'])
+                    if not media_types:
                         continue
                     
-                    media_types = set(r.get('media_type', 'N/A') for r in results)
-                    
                     if media_filter == "Image" and 'image' in media_types:
                         temp_filtered.append(h)
                     elif media_filter == "Vidéo" and 'video' in media_types:
@@ -1249,12 +873,15 @@ if st.session_state.current_page == "history":
             
             # Filtre par listes
             if list_filter != "Tous":
-                blacklist = st.session_state.blacklist
-                whitelist = st.session_state.whitelist
+                blacklist_matcher = PageMatcher(st.session_state.blacklist)
+                whitelist_matcher = PageMatcher(st.session_state.whitelist)
+                pages_by_entry = {}
+                for row in load_ad_columns('entry_id, advertiser, page_id'):
+                    pages_by_entry.setdefault(row['entry_id'], []).append(row)
                 temp_filtered = []
                 
                 for h in filtered_history:
-                    results = h.get('results', [])
+                    results = pages_by_entry.get(h['id'])
                     if not results:
                         continue
                     
@@ -1265,25 +892,11 @@ if st.session_state.current_page == "history":
                         advertiser = result.get('advertiser', '')
                         page_id = result.get('page_id', '')
                         
-                        # Check blacklist
-                        for item in blacklist:
-                            nom_page = item.get('nom_page', '')
-                            id_page = str(item.get('id_page', ''))
-                            
-                            if ((nom_page and nom_page.lower() in advertiser.lower()) or
-                                (id_page and id_page == page_id)):
-                                has_blacklist = True
-                                break
-                        
-                        # Check whitelist
-                        for item in whitelist:
-                            nom_page = item.get('nom_page', '')
-                            id_page = str(item.get('id_page', ''))
-                            
-                            if ((nom_page and nom_page.lower() in advertiser.lower()) or
-                                (id_page and id_page == page_id)):
-                                has_whitelist = True
-                                break
+                        # Check blacklist / whitelist
+                        if not has_blacklist:
+                            has_blacklist = blacklist_matcher.matches(advertiser, page_id)
+                        if not has_whitelist:
+                            has_whitelist = whitelist_matcher.matches(advertiser, page_id)
                         
                         if has_blacklist and has_whitelist:
                             break
@@ -1337,140 +950,163 @@ if st.session_state.current_page == "history":
                             st.session_state.current_page = "scraper"
                             st.rerun()
                     
-                    if entry['results']:
+                    if entry['results_count']:
                         st.markdown("---")
-                        st.subheader("📊 Résultats")
                         
-                        # Champ de recherche spécifique à ce scraping
-                        result_search = st.text_input(
-                            "🔍 Rechercher dans ces résultats",
-                            key=f"search_{entry['id']}",
-                            placeholder="Nom de page, texte, CTA..."
-                        )
-                        
-                        # Filtrer les résultats si recherche
-                        display_results = entry['results']
-                        if result_search:
-                            search_lower = result_search.lower()
-                            display_results = [
-                                r for r in entry['results']
-                                if (search_lower in r.get('advertiser', '').lower() or
-                                    search_lower in r.get('text', '').lower() or
-                                    search_lower in r.get('cta_text', '').lower() or
-                                    search_lower in r.get('page_id', '').lower())
-                            ]
-                        
-                        if not display_results:
-                            st.warning("Aucun résultat ne correspond à votre recherche")
-                        else:
-                            st.info(f"📊 {len(display_results)} résultat(s) affiché(s)")
+                        # Chargement à la demande : aucune publicité n'est lue tant que l'interrupteur est désactivé
+                        if st.toggle("📊 Afficher les résultats", key=f"show_results_{entry['id']}"):
+                            st.subheader("📊 Résultats")
                             
-                            df = pd.DataFrame(display_results)
-                            
-                            # Réorganisation des colonnes
-                            colonnes_a_afficher = [
-                                'media_url', 'cta_url', 'ad_library_url', 'page_id',
-                                'advertiser', 'country', 'ad_status', 'media_type',
-                                'text', 'start_date',
-                            ]
-                            colonnes_existantes = [col for col in colonnes_a_afficher if col in df.columns]
-                            df = df[colonnes_existantes]
+                            # Champ de recherche spécifique à ce scraping
+                            result_search = st.text_input(
+                                "🔍 Rechercher dans ces résultats",
+                                key=f"search_{entry['id']}",
+                                placeholder="Nom de page, texte, CTA..."
+                            )
                             
-                            df.insert(0, '⭐ Whitelist', False)
-                            df.insert(0, '🚫 Blacklist', False)
+                            # Page courante (retour à la première page à chaque nouvelle recherche)
+                            page_key = f"results_page_{entry['id']}"
+                            if st.session_state.get(f"{page_key}_search") != result_search:
+                                st.session_state[page_key] = 1
+                                st.session_state[f"{page_key}_search"] = result_search
+                            current_results_page = st.session_state[page_key]
                             
-                            edited_df = st.data_editor(
-                                df,
-                                width="stretch",
-                                hide_index=False,
-                                key=f"history_editor_{entry['id']}_{result_search}",
-                                column_config={
-                                    "🚫 Blacklist": st.column_config.CheckboxColumn("🚫", help="Ajouter à la blacklist", default=False, width="small"),
-                                    "⭐ Whitelist": st.column_config.CheckboxColumn("⭐", help="Ajouter à la whitelist", default=False, width="small"),
-                                    "media_url": st.column_config.LinkColumn("Média", display_text="📥 Voir", width="small"),
-                                    "cta_url": st.column_config.LinkColumn("Lien CTA", display_text="🔗 Ouvrir", width="small"),
-                                    "ad_library_url": st.column_config.LinkColumn("Voir pub", display_text="🔗 Ouvrir", width="small"),
-                                    "page_id": st.column_config.TextColumn("Page ID", width="small"),
-                                    "advertiser": st.column_config.TextColumn("Annonceur", width="medium"),
-                                    "country": st.column_config.TextColumn("Pays", width="small"),
-                                    "ad_status": st.column_config.TextColumn("Statut", width="small"),
-                                    "media_type": st.column_config.TextColumn("Type média", width="small"),
-                                    "text": st.column_config.TextColumn("Texte", width="large"),
-                                    "start_date": st.column_config.TextColumn("Date début", width="medium"),
-                                },
-                                disabled=["media_url", "cta_url", "ad_library_url", "page_id", "advertiser", "country", "ad_status", "media_type", "text", "start_date"]
-                            )
+                            # Une seule page de résultats lue (recherche plein texte, classée par pertinence)
+                            offset = (current_results_page - 1) * RESULTS_PAGE_SIZE
+                            if result_search:
+                                display_results, total_results = search_ads(
+                                    result_search, entry_id=entry['id'], offset=offset, limit=RESULTS_PAGE_SIZE
+                                )
+                            else:
+                                display_results, total_results = load_entry_ads_page(
+                                    entry['id'], offset=offset, limit=RESULTS_PAGE_SIZE
+                                )
+                            total_result_pages = max(1, (total_results + RESULTS_PAGE_SIZE - 1) // RESULTS_PAGE_SIZE)
                             
-                            # Validation et boutons d'ajout (code existant inchangé)
-                            both_checked = edited_df[(edited_df['🚫 Blacklist'] == True) & (edited_df['⭐ Whitelist'] == True)]
-                            if not both_checked.empty:
-                                st.error("❌ Une page ne peut pas être à la fois en blacklist ET whitelist.")
+                            if not display_results:
+                                st.warning("Aucun résultat ne correspond à votre recherche")
                             else:
-                                # Boutons pour ajouter aux listes
-                                col_btn1, col_btn2 = st.columns(2)
+                                st.info(
+                                    f"📄 Page {current_results_page}/{total_result_pages} "
+                                    f"({len(display_results)} résultat(s) affiché(s) sur {total_results})"
+                                )
+                            
+                                df = pd.DataFrame(display_results)
                                 
-                                with col_btn1:
-                                    blacklist_pages = edited_df[edited_df['🚫 Blacklist'] == True]
-                                    if not blacklist_pages.empty:
-                                        if st.button(f"✅ Ajouter {len(blacklist_pages)} page(s) à la blacklist", type="primary", key=f"add_blacklist_{entry['id']}"):
-                                            # Préparer les données
-                                            pages_data = [
-                                                {'page_id': row['page_id'], 'nom_page': row['advertiser']}
-                                                for _, row in blacklist_pages.iterrows()
-                                            ]
-                                            
-                                            # Appeler la fonction
-                                            result = add_pages_to_list_batch(
-                                                page_ids=pages_data,
-                                                list_type='blacklist',
-                                                source_id=entry['id']
-                                            )
-                                            
-                                            # Afficher le résultat
-                                            if result['success']:
-                                                st.success(result['message'])
-                                                st.session_state.blacklist = load_blacklist()
-                                                st.session_state.whitelist = load_whitelist()
-                                                st.rerun()
-                                            else:
-                                                if result.get('skipped_count', 0) > 0:
-                                                    st.warning(result['message'])
+                                # Réorganisation des colonnes
+                                colonnes_a_afficher = [
+                                    'media_url', 'cta_url', 'ad_library_url', 'page_id',
+                                    'advertiser', 'country', 'ad_status', 'media_type',
+                                    'text', 'start_date',
+                                ]
+                                colonnes_existantes = [col for col in colonnes_a_afficher if col in df.columns]
+                                df = df[colonnes_existantes]
+                                
+                                df.insert(0, '⭐ Whitelist', False)
+                                df.insert(0, '🚫 Blacklist', False)
+                                
+                                edited_df = st.data_editor(
+                                    df,
+                                    width="stretch",
+                                    hide_index=False,
+                                    key=f"history_editor_{entry['id']}_{result_search}_{current_results_page}",
+                                    column_config={
+                                        "🚫 Blacklist": st.column_config.CheckboxColumn("🚫", help="Ajouter à la blacklist", default=False, width="small"),
+                                        "⭐ Whitelist": st.column_config.CheckboxColumn("⭐", help="Ajouter à la whitelist", default=False, width="small"),
+                                        "media_url": st.column_config.LinkColumn("Média", display_text="📥 Voir", width="small"),
+                                        "cta_url": st.column_config.LinkColumn("Lien CTA", display_text="🔗 Ouvrir", width="small"),
+                                        "ad_library_url": st.column_config.LinkColumn("Voir pub", display_text="🔗 Ouvrir", width="small"),
+                                        "page_id": st.column_config.TextColumn("Page ID", width="small"),
+                                        "advertiser": st.column_config.TextColumn("Annonceur", width="medium"),
+                                        "country": st.column_config.TextColumn("Pays", width="small"),
+                                        "ad_status": st.column_config.TextColumn("Statut", width="small"),
+                                        "media_type": st.column_config.TextColumn("Type média", width="small"),
+                                        "text": st.column_config.TextColumn("Texte", width="large"),
+                                        "start_date": st.column_config.TextColumn("Date début", width="medium"),
+                                    },
+                                    disabled=["media_url", "cta_url", "ad_library_url", "page_id", "advertiser", "country", "ad_status", "media_type", "text", "start_date"]
+                                )
+                                
+                                # Validation et boutons d'ajout (code existant inchangé)
+                                both_checked = edited_df[(edited_df['🚫 Blacklist'] == True) & (edited_df['⭐ Whitelist'] == True)]
+                                if not both_checked.empty:
+                                    st.error("❌ Une page ne peut pas être à la fois en blacklist ET whitelist.")
+                                else:
+                                    # Boutons pour ajouter aux listes
+                                    col_btn1, col_btn2 = st.columns(2)
+                                
+                                    with col_btn1:
+                                        blacklist_pages = edited_df[edited_df['🚫 Blacklist'] == True]
+                                        if not blacklist_pages.empty:
+                                            if st.button(f"✅ Ajouter {len(blacklist_pages)} page(s) à la blacklist", type="primary", key=f"add_blacklist_{entry['id']}"):
+                                                # Préparer les données
+                                                pages_data = [
+                                                    {'page_id': row['page_id'], 'nom_page': row['advertiser']}
+                                                    for _, row in blacklist_pages.iterrows()
+                                                ]
+                                
+                                                # Appeler la fonction
+                                                result = add_pages_to_list_batch(
+                                                    page_ids=pages_data,
+                                                    list_type='blacklist',
+                                                    source_id=entry['id']
+                                                )
+                                
+                                                # Afficher le résultat
+                                                if result['success']:
+                                                    st.success(result['message'])
                                                     st.session_state.blacklist = load_blacklist()
                                                     st.session_state.whitelist = load_whitelist()
+                                                    st.rerun()
                                                 else:
-                                                    st.error(result['message'])
+                                                    if result.get('skipped_count', 0) > 0:
+                                                        st.warning(result['message'])
+                                                        st.session_state.blacklist = load_blacklist()
+                                                        st.session_state.whitelist = load_whitelist()
+                                                    else:
+                                                        st.error(result['message'])
                                 
-                                with col_btn2:
-                                    whitelist_pages = edited_df[edited_df['⭐ Whitelist'] == True]
-                                    if not whitelist_pages.empty:
-                                        if st.button(f"✅ Ajouter {len(whitelist_pages)} page(s) à la whitelist", type="primary", key=f"add_whitelist_{entry['id']}"):
-                                            page_ids = whitelist_pages['page_id'].tolist()
-                                            
-                                            result = add_pages_to_list_batch(
-                                                page_ids=page_ids,
-                                                list_type='whitelist',
-                                                source_id=entry['id'],
-                                                config=st.session_state.config
-                                            )
-                                            
-                                            if result['success']:
-                                                st.success(result['message'])
-                                                st.session_state.whitelist = load_whitelist()
-                                                st.session_state.blacklist = load_blacklist()
-                                                st.rerun()
-                                            else:
-                                                st.warning(result['message'])
-                            
-                            # Téléchargements
-                            st.markdown("---")
-                            col_dl1, col_dl2 = st.columns(2)
-                            with col_dl1:
-                                df_export = pd.DataFrame(display_results)
-                                csv = df_export.to_csv(index=False, encoding='utf-8-sig')
-                                st.download_button("📥 Télécharger CSV", data=csv, file_name=f"facebook_ads_{entry['id']}.csv", mime="text/csv", key=f"csv_{entry['id']}")
-                            with col_dl2:
-                                json_str = json.dumps(display_results, ensure_ascii=False, indent=2)
-                                st.download_button("📥 Télécharger JSON", data=json_str, file_name=f"facebook_ads_{entry['id']}.json", mime="application/json", key=f"json_{entry['id']}")
+                                    with col_btn2:
+                                        whitelist_pages = edited_df[edited_df['⭐ Whitelist'] == True]
+                                        if not whitelist_pages.empty:
+                                            if st.button(f"✅ Ajouter {len(whitelist_pages)} page(s) à la whitelist", type="primary", key=f"add_whitelist_{entry['id']}"):
+                                                page_ids = whitelist_pages['page_id'].tolist()
+                                
+                                                result = add_pages_to_list_batch(
+                                                    page_ids=page_ids,
+                                                    list_type='whitelist',
+                                                    source_id=entry['id'],
+                                                    config=st.session_state.config
+                                                )
+                                
+                                                if result['success']:
+                                                    st.success(result['message'])
+                                                    st.session_state.whitelist = load_whitelist()
+                                                    st.session_state.blacklist = load_blacklist()
+                                                    st.rerun()
+                                                else:
+                                                    st.warning(result['message'])
+                                
+                                # Navigation entre les pages
+                                col_nav1, col_nav2, col_nav3 = st.columns([1, 2, 1])
+                                with col_nav1:
+                                    if st.button("◀️ Précédent", disabled=(current_results_page == 1), key=f"prev_{entry['id']}"):
+                                        st.session_state[page_key] -= 1
+                                        st.rerun()
+                                with col_nav2:
+                                    st.markdown(f"<div style='text-align: center; padding-top: 5px;'>Page {current_results_page} / {total_result_pages}</div>", unsafe_allow_html=True)
+                                with col_nav3:
+                                    if st.button("Suivant ▶️", disabled=(current_results_page == total_result_pages), key=f"next_{entry['id']}"):
+                                        st.session_state[page_key] += 1
+                                        st.rerun()
+                                
+                                # Téléchargements (tous les résultats correspondants, lus seulement sur demande)
+                                st.markdown("---")
+                                if result_search:
+                                    load_export = lambda entry_id=entry['id'], search=result_search: search_ads(search, entry_id=entry_id)[0]
+                                else:
+                                    load_export = lambda entry_id=entry['id']: iter_entry_ads(entry_id)
+                                export_panel(load_export, f"facebook_ads_{entry['id']}", key=entry['id'])
         
         # ============================================
         # VUE GLOBALE FUSIONNÉE (NOUVEAU)
@@ -1481,47 +1117,13 @@ if st.session_state.current_page == "history":
                 st.session_state.current_page_history_fusion = 1
             
             # ============================================
-            # FUSION DE TOUTES LES PUBLICITÉS
+            # CATALOGUE (UNE PUBLICITÉ PAR AD_ID)
             # ============================================
             
-            def fusionner_publicites(all_ads):
-                """Fusionne les doublons en complétant les données manquantes"""
-                pubs_par_id = {}
-                
-                for ad in all_ads:
-                    ad_id = ad.get('ad_id')
-                    
-                    if not ad_id or ad_id == 'N/A':
-                        continue
-                    
-                    if ad_id not in pubs_par_id:
-                        pubs_par_id[ad_id] = ad.copy()
-                    else:
-                        existing = pubs_par_id[ad_id]
-                        
-                        # Compléter les champs 'N/A' avec les nouvelles valeurs
-                        for key, value in ad.items():
-                            if existing.get(key) in ['N/A', '', None] and value not in ['N/A', '', None]:
-                                existing[key] = value
-                        
-                        # Garder la date de scraping la plus récente
-                        if ad.get('scraped_at', '') > existing.get('scraped_at', ''):
-                            existing['scraped_at'] = ad['scraped_at']
-                
-                return list(pubs_par_id.values())
-            
-            # Collecter toutes les pubs
-            all_ads_raw = []
-            scrapings_count = 0
-            
-            for entry in history:
-                if entry.get('results'):
-                    all_ads_raw.extend(entry['results'])
-                    scrapings_count += 1
-            
-            # Fusionner et supprimer doublons
-            all_ads_unique = fusionner_publicites(all_ads_raw)
-            total_ads = len(all_ads_unique)
+            # Fusion faite à l'enregistrement des publicités (ad_catalog.py) :
+            # la vue lit le catalogue, filtré par la base
+            catalog = catalog_stats()
+            total_ads = catalog['ads']
             
             # ============================================
             # FILTRES (DANS L'EXPANDER)
@@ -1555,8 +1157,7 @@ if st.session_state.current_page == "history":
                 col4, col5, col6 = st.columns(3)
                 
                 with col4:
-                    # Extraire les pays uniques
-                    pays_disponibles = sorted(list(set(ad.get('country', 'N/A') for ad in all_ads_unique if ad.get('country') and ad.get('country') != 'N/A')))
+                    pays_disponibles = load_catalog_countries()
                     pays_filter_fusion = st.multiselect(
                         "🌍 Pays",
                         options=pays_disponibles,
@@ -1583,51 +1184,27 @@ if st.session_state.current_page == "history":
             # APPLIQUER LES FILTRES (EN DEHORS DE L'EXPANDER)
             # ============================================
             
-            filtered_ads = all_ads_unique.copy()
-            
-            # Filtre recherche textuelle
+            # Recherche (plein texte, classée par pertinence), type de média et pays : filtrés par la base
+            media_type_fusion = {"Image": "image", "Vidéo": "video"}.get(media_filter_fusion)
             if search_term_fusion:
-                search_lower = search_term_fusion.lower()
-                filtered_ads = [
-                    ad for ad in filtered_ads
-                    if (search_lower in ad.get('advertiser', '').lower() or
-                        search_lower in ad.get('text', '').lower() or
-                        search_lower in ad.get('cta_text', '').lower() or
-                        search_lower in str(ad.get('page_id', '')))
-                ]
-            
-            # Filtre type de média
-            if media_filter_fusion == "Image":
-                filtered_ads = [ad for ad in filtered_ads if ad.get('media_type') == 'image']
-            elif media_filter_fusion == "Vidéo":
-                filtered_ads = [ad for ad in filtered_ads if ad.get('media_type') == 'video']
+                filtered_ads, _ = search_ads(
+                    search_term_fusion, media_type=media_type_fusion, countries=pays_filter_fusion or None
+                )
+            else:
+                filtered_ads = load_catalog(media_type=media_type_fusion, countries=pays_filter_fusion or None)
             
             # Filtre blacklist/whitelist
             if list_filter_fusion != "Tous":
-                blacklist = st.session_state.blacklist
-                whitelist = st.session_state.whitelist
+                blacklist_matcher = PageMatcher(st.session_state.blacklist)
+                whitelist_matcher = PageMatcher(st.session_state.whitelist)
                 temp_filtered = []
                 
                 for ad in filtered_ads:
                     advertiser = ad.get('advertiser', '')
                     page_id = ad.get('page_id', '')
                     
-                    has_blacklist = False
-                    has_whitelist = False
-                    
-                    for item in blacklist:
-                        nom_page = item.get('nom_page', '')
-                        id_page = str(item.get('id_page', ''))
-                        if ((nom_page and nom_page.lower() in advertiser.lower()) or (id_page and id_page == page_id)):
-                            has_blacklist = True
-                            break
-                    
-                    for item in whitelist:
-                        nom_page = item.get('nom_page', '')
-                        id_page = str(item.get('id_page', ''))
-                        if ((nom_page and nom_page.lower() in advertiser.lower()) or (id_page and id_page == page_id)):
-                            has_whitelist = True
-                            break
+                    has_blacklist = blacklist_matcher.matches(advertiser, page_id)
+                    has_whitelist = whitelist_matcher.matches(advertiser, page_id)
                     
                     if list_filter_fusion == "Contient blacklist" and has_blacklist:
                         temp_filtered.append(ad)
@@ -1640,10 +1217,6 @@ if st.session_state.current_page == "history":
                 
                 filtered_ads = temp_filtered
             
-            # Filtre par pays
-            if pays_filter_fusion:
-                filtered_ads = [ad for ad in filtered_ads if ad.get('country') in pays_filter_fusion]
-            
             # Filtre par dates de scraping
             if date_debut_fusion and date_fin_fusion:
                 temp_filtered = []
@@ -1666,9 +1239,9 @@ if st.session_state.current_page == "history":
             with col_stat1:
                 st.metric("📊 Publicités trouvées", f"{len(filtered_ads)} / {total_ads}")
             with col_stat2:
-                st.metric("📁 Scrapings sources", scrapings_count)
+                st.metric("📁 Scrapings sources", catalog['entries'])
             with col_stat3:
-                st.metric("🗑️ Doublons supprimés", len(all_ads_raw) - total_ads)
+                st.metric("🗑️ Doublons supprimés", catalog['raw'] - total_ads)
             
             # ============================================
             # PAGINATION
@@ -1811,27 +1384,13 @@ if st.session_state.current_page == "history":
                         st.session_state.current_page_history_fusion += 1
                         st.rerun()
                 
-                # Téléchargements (TOUTES les pubs filtrées, pas juste la page)
-                col_dl1, col_dl2 = st.columns(2)
-                with col_dl1:
-                    df_export_fusion = pd.DataFrame(filtered_ads)
-                    csv_fusion = df_export_fusion.to_csv(index=False, encoding='utf-8-sig')
-                    st.download_button(
-                        f"📥 Télécharger CSV ({len(filtered_ads)} pubs)",
-                        data=csv_fusion,
-                        file_name=f"facebook_ads_fusion_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                        mime="text/csv",
-                        key="csv_fusion"
-                    )
-                with col_dl2:
-                    json_str_fusion = json.dumps(filtered_ads, ensure_ascii=False, indent=2)
-                    st.download_button(
-                        f"📥 Télécharger JSON ({len(filtered_ads)} pubs)",
-                        data=json_str_fusion,
-                        file_name=f"facebook_ads_fusion_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-                        mime="application/json",
-                        key="json_fusion"
-                    )
+                # Téléchargements (TOUTES les pubs filtrées, pas juste la page), produits à la demande
+                st.caption(f"📥 Export : {len(filtered_ads)} publicités filtrées")
+                export_panel(
+                    lambda: filtered_ads,
+                    f"facebook_ads_fusion_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+                    key="fusion"
+                )
 
 # ============================================
 # PAGE BLACKLIST
@@ -1893,8 +1452,7 @@ elif st.session_state.current_page == "blacklist":
                 
                 if not already_exists:
                     # Utiliser directement le résultat de la fonction
-                    st.session_state.blacklist.append(result)
-                    save_blacklist(st.session_state.blacklist)
+                    st.session_state.blacklist.extend(add_pages('blacklist', [result]) or [])
                     
                     st.success("✅ Page ajoutée avec succès !")
                     with st.expander("📋 Détails de la page ajoutée", expanded=True):
@@ -1918,8 +1476,7 @@ elif st.session_state.current_page == "blacklist":
                         'date_creation': 'N/A',
                         'id_permanent': 'N/A'
                     }
-                    st.session_state.blacklist.append(fallback_page)
-                    save_blacklist(st.session_state.blacklist)
+                    st.session_state.blacklist.extend(add_pages('blacklist', [fallback_page]) or [])
                     st.success("✅ Page ajoutée (sans ID permanent)")
                     st.rerun()
         else:
@@ -1971,11 +1528,11 @@ elif st.session_state.current_page == "blacklist":
                 pages_to_remove = edited_df[edited_df['Retirer'] == True]
                 if not pages_to_remove.empty:
                     ids_to_remove = set(pages_to_remove['id_page'].tolist())
+                    remove_pages('blacklist', ids_to_remove)
                     st.session_state.blacklist = [
                         p for p in st.session_state.blacklist
                         if p.get('id_page') not in ids_to_remove
                     ]
-                    save_blacklist(st.session_state.blacklist)
                     st.success(f"✅ {len(ids_to_remove)} page(s) retirée(s) de la blacklist !")
                     st.rerun()
                 else:
@@ -2045,8 +1602,7 @@ elif st.session_state.current_page == "whitelist":
                 
                 if not already_exists:
                     # Utiliser directement le résultat de la fonction
-                    st.session_state.whitelist.append(result)
-                    save_whitelist(st.session_state.whitelist)
+                    st.session_state.whitelist.extend(add_pages('whitelist', [result]) or [])
                     
                     st.success("✅ Concurrent ajouté avec succès !")
                     with st.expander("📋 Détails du concurrent ajouté", expanded=True):
@@ -2070,8 +1626,7 @@ elif st.session_state.current_page == "whitelist":
                         'date_creation': 'N/A',
                         'id_permanent': 'N/A'
                     }
-                    st.session_state.whitelist.append(fallback_page)
-                    save_whitelist(st.session_state.whitelist)
+                    st.session_state.whitelist.extend(add_pages('whitelist', [fallback_page]) or [])
                     st.success("✅ Concurrent ajouté (sans ID permanent)")
                     st.rerun()
         else:
@@ -2123,11 +1678,11 @@ elif st.session_state.current_page == "whitelist":
                 pages_to_remove = edited_df[edited_df['Retirer'] == True]
                 if not pages_to_remove.empty:
                     ids_to_remove = set(pages_to_remove['id_page'].tolist())
+                    remove_pages('whitelist', ids_to_remove)
                     st.session_state.whitelist = [
                         p for p in st.session_state.whitelist
                         if p.get('id_page') not in ids_to_remove
                     ]
-                    save_whitelist(st.session_state.whitelist)
                     st.success(f"✅ {len(ids_to_remove)} concurrent(s) retiré(s) de la whitelist !")
                     st.rerun()
                 else:
@@ -2189,8 +1744,7 @@ elif st.session_state.current_page == "whitelist":
 
     # Afficher le nombre de pages à traiter
     try:
-        with open('whitelist.json', 'r', encoding='utf-8') as f:
-            whitelist = json.load(f)
+        whitelist = load_whitelist()
             
         missing_count = sum(1 for item in whitelist 
                            if not item.get('id_permanent') 
@@ -2351,6 +1905,8 @@ elif st.session_state.current_page == "competitive":
         if st.button("🚀 Démarrer", type="primary", use_container_width=True):
             if not st.session_state.whitelist:
                 st.error("❌ Aucun concurrent dans la whitelist")
+            elif is_competitive_running():
+                st.warning("⏳ Une veille est déjà en cours")
             else:
                 if launch_competitive_intelligence():
                     st.success("✅ Veille lancée en arrière-plan !")
@@ -2370,30 +1926,40 @@ elif st.session_state.current_page == "competitive":
             if st.button("🔄 Rafraîchir les rapports", use_container_width=True):
                 st.rerun()
         
-    # Charger les rapports
-    reports = load_daily_reports()
+    # En-têtes seulement : les publicités d'un rapport sont lues à l'ouverture
+    reports = load_reports()
     
     if not reports:
         st.info("Aucun rapport de veille disponible pour le moment.")
     else:
         st.markdown(f"### 📊 {len(reports)} rapport(s) disponible(s)")
         
-        for report in reports:
+        for report_index, report in enumerate(reports):
             report_date = report.get('date', 'N/A')
             competitors_count = report.get('competitors_scanned', 0)
             results_count = report.get('results_count', 0)
             
             with st.expander(f"📅 {report_date} - {results_count} publicités - {competitors_count} concurrent(s) scannés"):
                 
-                col1, col2, col3 = st.columns(3)
+                col1, col2, col3, col4 = st.columns(4)
                 with col1:
                     st.metric("Publicités trouvées", results_count)
                 with col2:
-                    st.metric("Concurrents scannés", competitors_count)
+                    # Rapports antérieurs aux repères : pas de distinction nouvelles / déjà vues
+                    st.metric("Nouvelles", report['new_count'] if 'new_count' in report else "—")
                 with col3:
+                    st.metric("Concurrents scannés", competitors_count)
+                with col4:
                     st.metric("Date", report_date.split()[0])
                 
-                if report.get('results'):
+                show_results = results_count > 0 and st.toggle(
+                    "Afficher les publicités",
+                    value=report_index == 0,
+                    key=f"comp_show_{report['id']}"
+                )
+                report_results = load_report_ads(report['id']) if show_results else []
+                
+                if report_results:
                     st.markdown("---")
                     st.subheader("📊 Résultats")
                     
@@ -2404,12 +1970,20 @@ elif st.session_state.current_page == "competitive":
                         placeholder="Concurrent, texte, CTA..."
                     )
                     
+                    only_new = 'new_count' in report and st.checkbox(
+                        "🆕 Nouvelles publicités uniquement",
+                        key=f"comp_new_{report['id']}",
+                        help="Publicités jamais collectées lors des veilles précédentes"
+                    )
+                    
                     # Filtrer les résultats
-                    display_results = report['results']
+                    display_results = report_results
+                    if only_new:
+                        display_results = [r for r in display_results if r.get('scan_tag') == 'new']
                     if result_search:
                         search_lower = result_search.lower()
                         display_results = [
-                            r for r in report['results']
+                            r for r in display_results
                             if (search_lower in r.get('competitor_name', '').lower() or
                                 search_lower in r.get('advertiser', '').lower() or
                                 search_lower in r.get('text', '').lower() or
@@ -2438,26 +2012,178 @@ elif st.session_state.current_page == "competitive":
                             }
                         )
                         
-                        # Téléchargement
-                        col_dl1, col_dl2 = st.columns(2)
-                        with col_dl1:
-                            csv = df.to_csv(index=False, encoding='utf-8-sig')
-                            st.download_button(
-                                "📥 Télécharger CSV",
-                                data=csv,
-                                file_name=f"veille_competitive_{report['id']}.csv",
-                                mime="text/csv",
-                                key=f"comp_csv_{report['id']}"
-                            )
-                        with col_dl2:
-                            json_str = json.dumps(display_results, ensure_ascii=False, indent=2)
-                            st.download_button(
-                                "📥 Télécharger JSON",
-                                data=json_str,
-                                file_name=f"veille_competitive_{report['id']}.json",
-                                mime="application/json",
-                                key=f"comp_json_{report['id']}"
-                            )
+                        # Téléchargement (produit à la demande)
+                        export_panel(
+                            lambda results=display_results: results,
+                            f"veille_competitive_{report['id']}",
+                            key=f"comp_{report['id']}"
+                        )
+
+# ============================================
+# PAGE PLANIFICATION
+# ============================================
+
+elif st.session_state.current_page == "schedule":
+    st.title("⏰ Planification")
+    
+    st.info("💡 Le planificateur lance les recherches enregistrées et la veille concurrentielle selon leur horaire, même sans l'interface ouverte")
+    
+    # Statut du planificateur
+    scheduler_status = load_scheduler_status()
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        if is_scheduler_alive(scheduler_status):
+            st.success(f"🟢 Planificateur actif (pid {scheduler_status.get('pid')}, mis à jour {scheduler_status.get('last_update')})")
+        else:
+            st.warning("🔴 Planificateur arrêté : aucune exécution planifiée ne sera lancée")
+    with col2:
+        if not is_scheduler_alive(scheduler_status):
+            if st.button("▶️ Démarrer", type="primary", use_container_width=True):
+                try:
+                    spawn_python(["scheduler.py"])
+                    st.success("✅ Planificateur lancé en arrière-plan")
+                    time.sleep(2)
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"❌ Erreur lors du lancement : {e}")
+        if st.button("🔄 Rafraîchir", use_container_width=True, key="refresh_schedule"):
+            st.rerun()
+    
+    st.caption(
+        "Veille concurrentielle : horaire de la section 🤖 Veille automatique de la sidebar. "
+        "Réglages du planificateur dans config.json : scheduler_max_concurrent (jobs simultanés), "
+        "scheduler_jitter (décalage aléatoire en secondes), scheduler_catchup_hours (rattrapage des exécutions manquées)."
+    )
+    
+    # Jobs planifiés
+    st.markdown("### 📋 Exécutions")
+    if scheduler_status and scheduler_status.get('jobs'):
+        state_labels = {
+            'running': "⚙️ En cours",
+            'queued': "⏳ En attente",
+            'idle': "🕐 Planifié",
+            'invalid': "❌ Horaire invalide"
+        }
+        jobs_df = pd.DataFrame([{
+            'Job': job.get('name'),
+            'Horaire': job.get('cron', ''),
+            'État': state_labels.get(job.get('state'), job.get('state')),
+            'Prochaine exécution': job.get('run_at') or job.get('next_run') or '',
+            'Dernier lancement': job.get('last_started') or '',
+            'Dernier résultat': job.get('last_status') or ''
+        } for job in scheduler_status['jobs']])
+        st.dataframe(jobs_df, use_container_width=True, hide_index=True)
+    else:
+        st.caption("Aucun job planifié (ou planificateur jamais démarré)")
+    
+    st.markdown("---")
+    
+    # Recherches enregistrées
+    st.markdown("### 🔎 Recherches enregistrées")
+    saved_searches = st.session_state.config.get('saved_searches', [])
+    
+    with st.expander("➕ Nouvelle recherche enregistrée", expanded=not saved_searches):
+        with st.form("new_saved_search", clear_on_submit=True):
+            search_name = st.text_input("Nom", placeholder="ex : Nike France")
+            search_countries = st.multiselect(
+                "🌍 Pays",
+                options=list(COUNTRY_NAMES.items()),
+                format_func=lambda x: x[1]
+            )
+            col1, col2 = st.columns(2)
+            with col1:
+                search_status = st.radio(
+                    "📌 État de la publicité",
+                    options=["active", "inactive", "all"],
+                    format_func=lambda x: {"active": "Active", "inactive": "Inactive", "all": "Toutes"}[x],
+                    horizontal=True
+                )
+            with col2:
+                search_media = st.radio(
+                    "🎬 Type de média",
+                    options=["all", "image", "video"],
+                    format_func=lambda x: {"all": "Tous", "image": "Images", "video": "Vidéos"}[x],
+                    horizontal=True
+                )
+            search_term = st.text_input("🔍 Mot-clé (vide = toutes les publicités)")
+            search_cron = st.text_input(
+                "⏰ Horaire (cron)",
+                value="0 9 * * *",
+                help="minute heure jour mois jour_semaine — ex : '0 9 * * *' (tous les jours à 9h), "
+                     "'30 7 * * 1-5' (jours ouvrés à 7h30), '0 */6 * * *' (toutes les 6 heures)"
+            )
+            search_enabled = st.checkbox("Activée", value=True)
+            
+            if st.form_submit_button("💾 Enregistrer", type="primary"):
+                try:
+                    schedule = CronSchedule(search_cron)
+                    next_run = schedule.next_after(datetime.now())
+                    cron_error = None
+                except ValueError as e:
+                    cron_error = str(e)
+                if cron_error:
+                    st.error(f"❌ {cron_error}")
+                elif not search_name.strip():
+                    st.error("❌ Donnez un nom à la recherche")
+                elif not search_countries:
+                    st.error("❌ Sélectionnez au moins un pays")
+                else:
+                    new_search = {
+                        'id': datetime.now().strftime('%Y%m%d%H%M%S%f'),
+                        'name': search_name.strip(),
+                        'countries': [list(country) for country in search_countries],
+                        'status': search_status,
+                        'media_type': search_media,
+                        'search_term': search_term.strip(),
+                        'date_filter': None,
+                        'cron': schedule.expression,
+                        'enabled': search_enabled
+                    }
+                    st.session_state.config = {
+                        **st.session_state.config,
+                        'saved_searches': saved_searches + [new_search]
+                    }
+                    save_config(st.session_state.config)
+                    st.success(f"✅ Recherche enregistrée — prochaine exécution : {next_run.strftime('%d/%m/%Y %H:%M')}")
+                    time.sleep(1)
+                    st.rerun()
+    
+    if not saved_searches:
+        st.caption("Aucune recherche enregistrée")
+    
+    for search in saved_searches:
+        try:
+            next_run = CronSchedule(search['cron']).next_after(datetime.now()).strftime('%d/%m/%Y %H:%M')
+        except ValueError:
+            next_run = "horaire invalide"
+        countries_label = ", ".join(name for _, name in search.get('countries', []))
+        
+        col1, col2, col3 = st.columns([4, 1, 1])
+        with col1:
+            st.markdown(f"**{search['name']}** — `{search['cron']}`")
+            st.caption(
+                f"🌍 {countries_label} | 🔍 {search.get('search_term') or 'Toutes les publicités'} | "
+                f"⏭️ {next_run if search.get('enabled', True) else 'désactivée'}"
+            )
+        with col2:
+            enabled = st.toggle("Activée", value=search.get('enabled', True), key=f"enabled_{search['id']}")
+            if enabled != search.get('enabled', True):
+                st.session_state.config = {
+                    **st.session_state.config,
+                    'saved_searches': [
+                        {**s, 'enabled': enabled} if s['id'] == search['id'] else s for s in saved_searches
+                    ]
+                }
+                save_config(st.session_state.config)
+                st.rerun()
+        with col3:
+            if st.button("🗑️", key=f"delete_search_{search['id']}", help="Supprimer"):
+                st.session_state.config = {
+                    **st.session_state.config,
+                    'saved_searches': [s for s in saved_searches if s['id'] != search['id']]
+                }
+                save_config(st.session_state.config)
+                st.rerun()
 
 # ============================================
 # PAGE PRINCIPALE - SCRAPER
@@ -2625,6 +2351,16 @@ elif st.session_state.current_page == "scraper":
             value=default_search
             )
         )
+        
+        # Politique de ressources propre à ce scraping (défaut : réglage global)
+        policy_options = list(RESOURCE_POLICIES)
+        default_policy = resolve_policy(st.session_state.config)
+        job_resource_policy = st.selectbox(
+            "📦 Ressources chargées",
+            options=policy_options,
+            format_func=lambda x: POLICY_LABELS[x],
+            index=policy_options.index(default_policy)
+        )
     
     st.markdown("---")
     
@@ -2668,6 +2404,7 @@ elif st.session_state.current_page == "scraper":
                 'blacklist_count': len(st.session_state.blacklist),
                 'mode': "Invisible" if st.session_state.config['headless'] else "Visible",
                 'pause': f"{st.session_state.config['pause_min']}-{st.session_state.config['pause_max']}s",
+                'resource_policy': job_resource_policy,
                 'scraped_urls' : []  # Liste pour stocker les URLs par pays
             }
 
@@ -2685,6 +2422,9 @@ elif st.session_state.current_page == "scraper":
             all_results = []
             temp_success = []
             temp_failed = []
+            job_config = {**st.session_state.config, 'resource_policy': job_resource_policy}
+            blocked_requests = 0
+            blocked_bytes = 0
             
             # Créer une entrée d'historique unique
             entry_id = add_to_history(
@@ -2694,28 +2434,8 @@ elif st.session_state.current_page == "scraper":
                 status="in_progress"
             )
             
-            # Boucle sur chaque pays
-            for index, country in enumerate(selected_countries, 1):
-                country_code = country[0]
-                country_name = country[1]
-                
-                # Affichage empilé de la progression
-                countries_progress = []
-                for i in range(1, index + 1):
-                    if i < index:
-                        # Pays précédents (terminés)
-                        prev_country = selected_countries[i-1]
-                        if prev_country[1] in temp_success:
-                            countries_progress.append(f"🌍 Pays {i}/{countries_count} : {prev_country[1]} ✅")
-                        else:
-                            countries_progress.append(f"🌍 Pays {i}/{countries_count} : {prev_country[1]} ❌")
-                    else:
-                        # Pays actuel
-                        countries_progress.append(f"🌍 Pays {i}/{countries_count} : {country_name} ⏳ (en cours)")
-                
-                countries_status_container.markdown("\n\n".join(countries_progress))
-                
-                # Construction de l'URL pour ce pays
+            # URLs scrapées (une par pays)
+            for country_code, country_name in selected_countries:
                 base_url = "https://www.facebook.com/ads/library"
                 scraping_url = f"{base_url}?active_status={status}&ad_type=all&country={country_code}"
                 
@@ -2745,67 +2465,112 @@ elif st.session_state.current_page == "scraper":
                     "country": country_name,
                     "url": scraping_url
                 })
-                print(query_info["scraped_urls"])
-
-
-                status_text.text(f"🌍 Scraping du pays {index}/{countries_count} : {country_name}")
+            
+            # Progression par pays, combinée dans la barre et l'affichage empilé
+            country_states = {country[0]: 'pending' for country in selected_countries}
+            country_progress = {country[0]: 0 for country in selected_countries}
+            country_messages = {}
+            
+            def render_countries():
+                countries_progress = []
+                for i, (code, name) in enumerate(selected_countries, 1):
+                    state = country_states[code]
+                    if state == 'success':
+                        countries_progress.append(f"🌍 Pays {i}/{countries_count} : {name} ✅")
+                    elif state == 'failed':
+                        countries_progress.append(f"🌍 Pays {i}/{countries_count} : {name} ❌")
+                    elif state == 'running':
+                        detail = country_messages.get(code, '')
+                        countries_progress.append(f"🌍 Pays {i}/{countries_count} : {name} ⏳ (en cours) {detail}")
+                    else:
+                        countries_progress.append(f"🌍 Pays {i}/{countries_count} : {name} 🕒 (en attente)")
+                countries_status_container.markdown("\n\n".join(countries_progress))
+            
+            def update_overall_progress():
+                overall = sum(country_progress.values()) / countries_count
+                progress_bar.progress(int(min(overall, 100)))
+                running = [name for code, name in selected_countries if country_states[code] == 'running']
+                done = len([code for code in country_states if country_states[code] in ('success', 'failed')])
+                status_text.text(
+                    f"🌍 {done}/{countries_count} pays terminés"
+                    + (f" | en cours : {', '.join(running)}" if running else "")
+                )
+            
+            def create_country_scraper(country):
+                code = country[0]
                 
-                # Callback de progression pour ce pays
                 def update_progress(progress, message):
-                    progress_bar.progress(int(progress))
-                    status_text.text(f"🌍 Pays {index}/{countries_count} : {country_name} - {message}")
-                
-                # Scraping de ce pays
-                try:
-                    if sys.platform == 'win32':
-                        asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
-                    
-                    scraper = FacebookAdsLibraryScraper(
-                        country=country,
-                        status=status,
-                        media_type=media_type,
-                        blacklist=st.session_state.blacklist,
-                        config=st.session_state.config,
-                        entry_id=entry_id
-                    )
-                    scraper.set_progress_callback(update_progress)
-                    
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    country_results = loop.run_until_complete(
-                        scraper.scrape(
-                            keyword=search_term,
-                            date_filter=date_filter_obj,
-                            max_ads=st.session_state.config['max_ads'],
-                            max_scroll_time=st.session_state.config['max_time'] * 60
-                        )
+                    country_progress[code] = min(progress, 100)
+                    country_messages[code] = message
+                    update_overall_progress()
+                    render_countries()
+                
+                scraper = FacebookAdsLibraryScraper(
+                    country=country,
+                    status=status,
+                    media_type=media_type,
+                    blacklist=st.session_state.blacklist,
+                    config=job_config,
+                    entry_id=entry_id,
+                    pool=pool,
+                    pacing=pacing,
+                    writer=writer
+                )
+                scraper.set_progress_callback(update_progress)
+                scrapers[code] = scraper
+                return scraper
+            
+            def on_country_state(country, state, detail):
+                code, name = country
+                country_states[code] = state
+                if state == 'success':
+                    country_progress[code] = 100
+                    logger.info(f"✅ {name} : {len(detail)} publicités extraites")
+                elif state == 'failed':
+                    country_progress[code] = 100
+                    logger.error(f"❌ Erreur sur {name} : {detail}")
+                    st.warning(f"⚠️ Erreur lors du scraping de {name} : {detail}")
+                update_overall_progress()
+                render_countries()
+            
+            # Pays scrapés en parallèle (navigateur du pool de la session),
+            # avec un intervalle minimal commun entre deux requêtes
+            loop, pool = get_scraping_runtime()
+            pacing = PacingBudget(job_config.get('global_min_interval', job_config['pause_min']))
+            # Sauvegardes automatiques : spool local immédiat, envoi à la base en arrière-plan
+            writer = WriteBehindQueue(store_entry_ads)
+            scrapers = {}
+            render_countries()
+            
+            async def scrape_all_countries():
+                # La sortie du bloc envoie les derniers lots avant la mise à jour finale
+                async with writer:
+                    return await scrape_countries(
+                        selected_countries,
+                        create_country_scraper,
+                        scrape_kwargs={
+                            'keyword': search_term,
+                            'date_filter': date_filter_obj,
+                            'max_ads': job_config['max_ads'],
+                            'max_scroll_time': job_config['max_time'] * 60
+                        },
+                        max_concurrency=job_config.get('max_concurrency', 2),
+                        on_state=on_country_state
                     )
-                    loop.close()
-                    
-                    # Ajouter les résultats de ce pays
-                    all_results.extend(country_results)
+            
+            country_outcomes = loop.run_until_complete(scrape_all_countries())
+            logger.info(writer.summary())
+            
+            for (country_code, country_name), outcome in country_outcomes:
+                if isinstance(outcome, Exception):
+                    temp_failed.append(f"{country_name} ({outcome})")
+                else:
+                    all_results.extend(outcome)
                     temp_success.append(country_name)
-                    
-                    # Mise à jour incrémentale de l'historique
-                    update_history_incrementally(entry_id, country_results)
-                    
-                    logger.info(f"✅ {country_name} : {len(country_results)} publicités extraites")
-                    
-                except Exception as e:
-                    error_msg = str(e)
-                    temp_failed.append(f"{country_name} ({error_msg})")
-                    logger.error(f"❌ Erreur sur {country_name} : {error_msg}")
-                    st.warning(f"⚠️ Erreur lors du scraping de {country_name} : {error_msg}")
-                    continue
-                
-                # Pause entre pays (sauf après le dernier)
-                if index < countries_count:
-                    pause_duration = random.uniform(
-                        st.session_state.config['pause_min'],
-                        st.session_state.config['pause_max']
-                    )
-                    status_text.text(f"⏸️ Pause de {int(pause_duration)}s avant le pays suivant...")
-                    time.sleep(pause_duration)
+            
+            for scraper in scrapers.values():
+                blocked_requests += scraper.resource_blocker.blocked_requests
+                blocked_bytes += scraper.resource_blocker.blocked_bytes
             
             # Affichage final empilé
             final_countries_progress = []
@@ -2828,11 +2593,11 @@ elif st.session_state.current_page == "scraper":
             # Mettre à jour query_info avec les URLs
             query_info['scraped_urls'] = scraped_urls
             
-            # Mise à jour finale de l'historique
+            # Mise à jour finale de l'historique (publicités déjà enregistrées par pays)
             add_to_history(
                 query_info=query_info,
                 results_count=len(all_results),
-                results_data=all_results,
+                results_data=[],
                 status=final_status,
                 error_message="; ".join(temp_failed) if temp_failed else None,
                 entry_id=entry_id
@@ -2857,6 +2622,12 @@ elif st.session_state.current_page == "scraper":
             else:
                 st.error(f"❌ Échec complet du scraping")
                 st.error(f"**Erreurs ({len(temp_failed)}/{countries_count})** : {', '.join(temp_failed)}")
+            
+            if blocked_requests:
+                st.caption(
+                    f"📦 {blocked_requests} requêtes bloquées "
+                    f"(~{blocked_bytes / 1_048_576:.1f} Mo non téléchargés, estimation)"
+                )
 
 st.markdown("---")
 st.caption("💡 Astuce : Utilisez la navigation en haut de la sidebar pour accéder aux différentes sections")
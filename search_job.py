@@ -0,0 +1,194 @@
+"""
+search_job.py
+Exécute une recherche enregistrée, sans Streamlit (lancé par le planificateur)
+
+Les recherches enregistrées sont dans config.json (clé saved_searches),
+créées depuis la page Planification de l'interface :
+    {"id": "...", "name": "...", "countries": [["FR", "France"], ...],
+     "status": "active", "media_type": "all", "search_term": "nike",
+     "date_filter": null, "cron": "0 9 * * 1-5", "enabled": true}
+
+Le résultat est une entrée d'historique comme un scraping lancé depuis
+l'interface (mêmes paramètres de scraping que config.json).
+
+USAGE:
+    python search_job.py <id de la recherche>
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sys
+from urllib.parse import quote
+
+from ads_scraper import FacebookAdsLibraryScraper, scrape_countries
+from browser_pool import BrowserPool, DEFAULT_MAX_AGE, DEFAULT_MAX_USES
+from pacing import PacingBudget
+from resource_policy import resolve_policy
+from storage import load_blacklist, add_to_history, store_entry_ads
+from write_behind import WriteBehindQueue, get_spool
+
+CONFIG_FILE = "config.json"
+LOG_FILE = "scheduler.log"
+
+logger = logging.getLogger(__name__)
+
+# Valeurs utilisées si config.json ne les définit pas (mêmes défauts que l'interface)
+DEFAULT_JOB_CONFIG = {
+    'pause_min': 2,
+    'pause_max': 5,
+    'max_ads': 500,
+    'max_time': 30,
+    'max_concurrency': 2,
+}
+
+
+def load_config():
+    if os.path.exists(CONFIG_FILE):
+        try:
+            with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Erreur lecture {CONFIG_FILE}: {e}")
+    return {}
+
+
+def load_saved_searches(config=None):
+    """Recherches enregistrées de config.json"""
+    config = load_config() if config is None else config
+    return config.get('saved_searches', [])
+
+
+def find_saved_search(search_id, config=None):
+    for search in load_saved_searches(config):
+        if search.get('id') == search_id:
+            return search
+    return None
+
+
+def build_query_info(search, config):
+    """Résumé de la requête enregistré dans l'historique (même forme que l'interface)"""
+    countries = [tuple(country) for country in search['countries']]
+    return {
+        'countries': [name for _, name in countries],
+        'countries_list': [code for code, _ in countries],
+        'countries_count': len(countries),
+        'status': search.get('status', 'active'),
+        'media_type': search.get('media_type', 'all'),
+        'search_term': search.get('search_term') or "Toutes les publicités",
+        'date_filter_type': (search.get('date_filter') or {}).get('type', 'none'),
+        'date_filter': search.get('date_filter'),
+        'max_ads': config['max_ads'],
+        'max_time': f"{config['max_time']} minutes",
+        'mode': "Invisible" if config['headless'] else "Visible",
+        'pause': f"{config['pause_min']}-{config['pause_max']}s",
+        'resource_policy': resolve_policy(config),
+        'saved_search': search.get('name', search['id']),
+        'scraped_urls': []
+    }
+
+
+async def run_saved_search_async(search, config=None):
+    """Scrape les pays d'une recherche enregistrée ; retourne l'ID de l'entrée d'historique (None si non créée)"""
+    config = {**DEFAULT_JOB_CONFIG, **(config if config is not None else load_config())}
+    # Lancé en tâche de fond : navigateur toujours masqué
+    config['headless'] = True
+    countries = [tuple(country) for country in search['countries']]
+    blacklist = load_blacklist()
+    query_info = build_query_info(search, config)
+
+    entry_id = add_to_history(query_info=query_info, results_count=0, results_data=[], status="in_progress")
+    if entry_id is None:
+        # Sans entrée, les publicités scrapées ne pourraient pas être rattachées à la recherche
+        logger.error(f"Recherche '{query_info['saved_search']}' annulée : entrée d'historique non créée")
+        return None
+    logger.info(f"Recherche '{query_info['saved_search']}' : entrée {entry_id}, {len(countries)} pays")
+
+    pacing = PacingBudget(config.get('global_min_interval', config['pause_min']))
+    # Spool propre à la recherche : l'interface et les autres jobs écrivent dans le leur
+    writer = WriteBehindQueue(store_entry_ads, spool=get_spool(os.path.join("spool", f"search_{search['id']}.jsonl")))
+
+    async with BrowserPool(
+        size=1,
+        max_age=config.get('browser_max_age', DEFAULT_MAX_AGE),
+        max_uses=config.get('browser_max_uses', DEFAULT_MAX_USES)
+    ) as pool:
+        def create_country_scraper(country):
+            return FacebookAdsLibraryScraper(
+                country=country,
+                status=search.get('status', 'active'),
+                media_type=search.get('media_type', 'all'),
+                blacklist=blacklist,
+                config=config,
+                entry_id=entry_id,
+                pool=pool,
+                pacing=pacing,
+                writer=writer
+            )
+
+        async with writer:
+            outcomes = await scrape_countries(
+                countries,
+                create_country_scraper,
+                scrape_kwargs={
+                    'keyword': quote(search.get('search_term') or ''),
+                    'date_filter': search.get('date_filter'),
+                    'max_ads': config['max_ads'],
+                    'max_scroll_time': config['max_time'] * 60
+                },
+                max_concurrency=config.get('max_concurrency', 2)
+            )
+    logger.info(writer.summary())
+
+    results_count = 0
+    failed = []
+    for (country_code, country_name), outcome in outcomes:
+        if isinstance(outcome, Exception):
+            failed.append(f"{country_name} ({outcome})")
+        else:
+            results_count += len(outcome)
+
+    if not failed:
+        final_status = "success"
+    elif len(failed) == len(countries):
+        final_status = "error"
+    else:
+        final_status = "partial"
+
+    # Publicités déjà enregistrées au fil du scraping
+    add_to_history(
+        query_info=query_info,
+        results_count=results_count,
+        results_data=[],
+        status=final_status,
+        error_message="; ".join(failed) if failed else None,
+        entry_id=entry_id
+    )
+    logger.info(f"Recherche '{query_info['saved_search']}' terminée ({final_status}) : {results_count} publicités")
+    return entry_id
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(LOG_FILE, encoding='utf-8'),
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
+    if len(sys.argv) != 2:
+        print("USAGE: python search_job.py <id de la recherche>")
+        sys.exit(2)
+
+    saved_search = find_saved_search(sys.argv[1])
+    if saved_search is None:
+        logger.error(f"Recherche enregistrée introuvable : {sys.argv[1]}")
+        sys.exit(1)
+    try:
+        if asyncio.run(run_saved_search_async(saved_search)) is None:
+            sys.exit(1)
+    except Exception as e:
+        logger.error(f"ERREUR FATALE: {e}", exc_info=True)
+        sys.exit(1)
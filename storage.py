@@ -0,0 +1,939 @@
+"""
+storage.py
+Stockage des données : blacklist, whitelist, historique, publicités, rapports
+
+Deux implémentations, choisies par la clé "storage_backend" de config.json :
+- supabase : base distante partagée (supabase_db.py), défaut
+- sqlite   : fichier local en mode WAL (clé "sqlite_path"), pour une
+  installation sur un seul poste, les benchmarks et les essais hors ligne
+
+L'interface Streamlit et tous les scripts (veille, récupération d'ID)
+passent par les fonctions de ce module : ils lisent et écrivent donc les
+mêmes données, quel que soit le stockage choisi.
+
+USAGE:
+    from storage import load_whitelist, add_pages
+    add_pages('whitelist', [page])
+
+    python storage.py import-local      # whitelist.json et rapports JSON -> stockage configuré
+    python storage.py rebuild-catalog   # catalogue reconstruit depuis les publicités enregistrées
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+
+from ad_catalog import merge_ads
+from ad_search import AD_SEARCH_FIELDS, fts5_query
+
+logger = logging.getLogger(__name__)
+
+CONFIG_FILE = "config.json"
+
+DEFAULT_BACKEND = "supabase"
+DEFAULT_SQLITE_PATH = "scraper.db"
+STORAGE_BACKENDS = ('supabase', 'sqlite')
+
+# Anciens fichiers locaux des scripts (import-local)
+LEGACY_WHITELIST_FILE = "whitelist.json"
+LEGACY_REPORTS_FILE = "daily_competitive_reports.json"
+
+PAGE_LISTS = ('blacklist', 'whitelist')
+PAGE_COLUMNS = ('id_page', 'nom_page', 'date_ajout', 'date_creation', 'id_permanent')
+TASK_COLUMNS = (
+    'report_id', 'competitor_id', 'competitor_name', 'position',
+    'state', 'attempts', 'last_error', 'next_attempt_at', 'updated_at',
+)
+AD_COLUMNS = ('entry_id', 'ad_id', 'country', 'advertiser', 'page_id', 'media_type')
+
+
+class StorageBackend(ABC):
+    """
+    Interface commune des stockages
+
+    Les méthodes de lecture retournent des listes de dictionnaires au format
+    historique (pages, entrées d'historique, publicités, rapports).
+    Un stockage auquel il manque une méthode ne peut pas être instancié.
+    """
+
+    name = None
+
+    # Listes de pages
+    @abstractmethod
+    def load_pages(self, list_name): ...
+    @abstractmethod
+    def add_pages(self, list_name, pages): ...
+    @abstractmethod
+    def remove_pages(self, list_name, page_ids): ...
+    @abstractmethod
+    def update_page(self, list_name, id_page, fields): ...
+
+    # Historique et publicités
+    @abstractmethod
+    def load_history(self): ...
+    @abstractmethod
+    def load_history_summaries(self): ...
+    @abstractmethod
+    def count_history(self): ...
+    @abstractmethod
+    def add_to_history(self, query_info, results_count, results_data, status="success", error_message=None, entry_id=None): ...
+    @abstractmethod
+    def store_entry_ads(self, entry_id, ads): ...
+    @abstractmethod
+    def load_entry_ads(self, entry_id): ...
+    @abstractmethod
+    def load_entry_ads_page(self, entry_id, offset=0, limit=100): ...
+    @abstractmethod
+    def search_ads(self, search, entry_id=None, media_type=None, countries=None, offset=0, limit=None): ...
+    @abstractmethod
+    def find_entries_with_ads(self, search): ...
+    @abstractmethod
+    def load_ad_columns(self, columns): ...
+
+    # Catalogue (une publicité par ad_id, cf. ad_catalog.py)
+    @abstractmethod
+    def load_catalog(self, media_type=None, countries=None): ...
+    @abstractmethod
+    def load_catalog_countries(self): ...
+    @abstractmethod
+    def catalog_stats(self): ...
+    @abstractmethod
+    def rebuild_catalog(self): ...
+
+    # Rapports de veille : en-tête (compteurs, erreurs) + publicités en ajout seul
+    @abstractmethod
+    def load_reports(self): ...
+    @abstractmethod
+    def save_report_header(self, header): ...
+    @abstractmethod
+    def append_report_ads(self, report_id, ads): ...
+    @abstractmethod
+    def load_report_ads(self, report_id): ...
+
+    # Tâches d'une veille (une par concurrent, cf. competitive_job.py)
+    @abstractmethod
+    def load_report_tasks(self, report_id): ...
+    @abstractmethod
+    def save_report_tasks(self, tasks): ...
+
+    # Repères de la veille (cf. watermarks.py)
+    @abstractmethod
+    def load_watermarks(self): ...
+    @abstractmethod
+    def save_watermark(self, watermark): ...
+
+    @abstractmethod
+    def summary(self): ...
+
+
+# ============================================
+# SUPABASE
+# ============================================
+
+class SupabaseBackend(StorageBackend):
+    """Stockage distant : délègue à supabase_db (client partagé, nouvelles tentatives)"""
+
+    name = 'supabase'
+
+    def __init__(self):
+        # Import différé : le mode sqlite ne charge ni supabase ni streamlit
+        import supabase_db
+        self.db = supabase_db
+
+    def load_pages(self, list_name):
+        return self.db.load_blacklist() if list_name == 'blacklist' else self.db.load_whitelist()
+
+    def add_pages(self, list_name, pages):
+        return self.db.add_pages(list_name, pages)
+
+    def remove_pages(self, list_name, page_ids):
+        return self.db.remove_pages(list_name, page_ids)
+
+    def update_page(self, list_name, id_page, fields):
+        return self.db.update_page(list_name, id_page, fields)
+
+    def load_history(self):
+        return self.db.load_history()
+
+    def load_history_summaries(self):
+        return self.db.load_history_summaries()
+
+    def count_history(self):
+        return self.db.count_history()
+
+    def add_to_history(self, query_info, results_count, results_data, status="success", error_message=None, entry_id=None):
+        return self.db.add_to_history(
+            query_info, results_count, results_data,
+            status=status, error_message=error_message, entry_id=entry_id
+        )
+
+    def store_entry_ads(self, entry_id, ads):
+        self.db.store_entry_ads(entry_id, ads)
+
+    def load_entry_ads(self, entry_id):
+        return self.db.load_entry_ads(entry_id)
+
+    def load_entry_ads_page(self, entry_id, offset=0, limit=100):
+        return self.db.load_entry_ads_page(entry_id, offset=offset, limit=limit)
+
+    def search_ads(self, search, entry_id=None, media_type=None, countries=None, offset=0, limit=None):
+        return self.db.search_ads(
+            search, entry_id=entry_id, media_type=media_type, countries=countries, offset=offset, limit=limit
+        )
+
+    def find_entries_with_ads(self, search):
+        return self.db.find_entries_with_ads(search)
+
+    def load_ad_columns(self, columns):
+        return self.db.load_ad_columns(columns)
+
+    def load_catalog(self, media_type=None, countries=None):
+        return self.db.load_catalog(media_type=media_type, countries=countries)
+
+    def load_catalog_countries(self):
+        return self.db.load_catalog_countries()
+
+    def catalog_stats(self):
+        return self.db.catalog_stats()
+
+    def rebuild_catalog(self):
+        return self.db.rebuild_catalog()
+
+    def load_reports(self):
+        return self.db.load_reports()
+
+    def save_report_header(self, header):
+        return self.db.save_report_header(header)
+
+    def append_report_ads(self, report_id, ads):
+        return self.db.append_report_ads(report_id, ads)
+
+    def load_report_ads(self, report_id):
+        return self.db.load_report_ads(report_id)
+
+    def load_report_tasks(self, report_id):
+        return self.db.load_report_tasks(report_id)
+
+    def save_report_tasks(self, tasks):
+        return self.db.save_report_tasks(tasks)
+
+    def load_watermarks(self):
+        return self.db.load_watermarks()
+
+    def save_watermark(self, watermark):
+        return self.db.save_watermark(watermark)
+
+    def summary(self):
+        return self.db.request_stats.summary()
+
+
+# ============================================
+# SQLITE (LOCAL)
+# ============================================
+
+_SQLITE_SCHEMA = """
+create table if not exists blacklist (
+    id            integer primary key autoincrement,
+    id_page       text unique,
+    nom_page      text,
+    date_ajout    text,
+    date_creation text,
+    id_permanent  text
+);
+create table if not exists whitelist (
+    id            integer primary key autoincrement,
+    id_page       text unique,
+    nom_page      text,
+    date_ajout    text,
+    date_creation text,
+    id_permanent  text
+);
+create table if not exists scraping_history (
+    id            text primary key,
+    date          text,
+    query         text,
+    results_count integer default 0,
+    status        text,
+    error_message text,
+    created_at    text not null default (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+);
+create table if not exists scraping_ads (
+    position   integer primary key,
+    entry_id   text not null references scraping_history(id) on delete cascade,
+    ad_id      text not null,
+    country    text,
+    advertiser text,
+    page_id    text,
+    media_type text,
+    data       text not null,
+    unique (entry_id, ad_id)
+);
+create table if not exists ad_catalog (
+    ad_id      text primary key,
+    country    text,
+    advertiser text,
+    page_id    text,
+    media_type text,
+    scraped_at text,
+    data       text not null
+);
+create index if not exists ad_catalog_scraped_at_idx on ad_catalog (scraped_at desc);
+
+-- Index plein texte (minuscules, sans accents), tenus à jour par triggers ;
+-- rowid = position (scraping_ads) ou rowid (ad_catalog)
+create virtual table if not exists scraping_ads_fts using fts5(doc, tokenize = 'unicode61 remove_diacritics 2');
+create virtual table if not exists ad_catalog_fts using fts5(doc, tokenize = 'unicode61 remove_diacritics 2');
+create table if not exists competitive_reports (
+    id     text primary key,
+    date   text,
+    report text not null
+);
+create table if not exists competitive_report_ads (
+    position  integer primary key,
+    report_id text not null references competitive_reports(id) on delete cascade,
+    ad_id     text not null,
+    data      text not null,
+    unique (report_id, ad_id)
+);
+create table if not exists competitive_tasks (
+    report_id       text not null references competitive_reports(id) on delete cascade,
+    competitor_id   text not null,
+    competitor_name text,
+    position        integer not null default 0,
+    state           text not null default 'pending',
+    attempts        integer not null default 0,
+    last_error      text,
+    next_attempt_at text,
+    updated_at      text,
+    primary key (report_id, competitor_id)
+);
+create table if not exists competitor_watermarks (
+    page_id           text primary key,
+    latest_start_date text,
+    ads               text not null,
+    updated_at        text
+);
+"""
+
+
+# Texte indexé (mêmes champs que ad_search.AD_SEARCH_FIELDS)
+_FTS_DOCUMENT = " || ' ' || ".join(
+    f"coalesce(new.{field}, '')" if field in ('advertiser', 'page_id', 'country')
+    else f"coalesce(json_extract(new.data, '$.{field}'), '')"
+    for field in AD_SEARCH_FIELDS
+)
+
+
+def _fts_triggers(table, key):
+    return f"""
+create trigger if not exists {table}_fts_insert after insert on {table} begin
+    insert into {table}_fts (rowid, doc) values (new.{key}, {_FTS_DOCUMENT});
+end;
+create trigger if not exists {table}_fts_update after update on {table} begin
+    delete from {table}_fts where rowid = old.{key};
+    insert into {table}_fts (rowid, doc) values (new.{key}, {_FTS_DOCUMENT});
+end;
+create trigger if not exists {table}_fts_delete after delete on {table} begin
+    delete from {table}_fts where rowid = old.{key};
+end;
+"""
+
+
+_SQLITE_TRIGGERS = _fts_triggers('scraping_ads', 'position') + _fts_triggers('ad_catalog', 'rowid')
+
+# Lignes écrites avant la création des index (base d'une version précédente)
+_FTS_BACKFILL = "".join(
+    f"insert into {table}_fts (rowid, doc) select new.{key}, {_FTS_DOCUMENT} from {table} as new "
+    f"where new.{key} not in (select rowid from {table}_fts);"
+    for table, key in (('scraping_ads', 'position'), ('ad_catalog', 'rowid'))
+)
+
+
+# Rapports enregistrés d'un bloc (publicités dans l'en-tête) : publicités
+# déplacées dans competitive_report_ads
+_REPORTS_SPLIT = """
+insert into competitive_report_ads (report_id, ad_id, data)
+select r.id, coalesce(json_extract(j.value, '$.ad_id'), j.key), j.value
+from competitive_reports r, json_each(r.report, '$.results') j
+where json_type(r.report, '$.results') = 'array'
+on conflict (report_id, ad_id) do nothing;
+update competitive_reports set report = json_remove(report, '$.results')
+where json_type(report, '$.results') is not null;
+"""
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    Stockage local dans un fichier SQLite
+
+    Une connexion par thread (la file d'écriture différée écrit depuis un
+    thread) ; le mode WAL laisse l'interface lire pendant les écritures.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path=DEFAULT_SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("pragma journal_mode=wal")
+            conn.execute("pragma synchronous=normal")
+            conn.execute("pragma foreign_keys=on")
+            conn.executescript(_SQLITE_SCHEMA)
+            conn.executescript(_SQLITE_TRIGGERS)
+            with conn:
+                conn.executescript(_FTS_BACKFILL)
+                conn.executescript(_REPORTS_SPLIT)
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _check_list(list_name):
+        if list_name not in PAGE_LISTS:
+            raise ValueError(f"Liste inconnue : {list_name}")
+
+    # Listes de pages
+
+    def load_pages(self, list_name):
+        self._check_list(list_name)
+        return [dict(row) for row in self._conn().execute(f"select * from {list_name} order by id")]
+
+    def add_pages(self, list_name, pages):
+        self._check_list(list_name)
+        conn = self._conn()
+        added_ids = []
+        with conn:
+            for page in pages:
+                if not page.get('id_page'):
+                    continue
+                values = [str(page.get('id_page'))] + [page.get(col) for col in PAGE_COLUMNS[1:]]
+                cursor = conn.execute(
+                    f"insert or ignore into {list_name} ({', '.join(PAGE_COLUMNS)}) values (?, ?, ?, ?, ?)",
+                    values
+                )
+                if cursor.rowcount:
+                    added_ids.append(cursor.lastrowid)
+        if not added_ids:
+            return []
+        placeholders = ', '.join('?' * len(added_ids))
+        return [dict(row) for row in conn.execute(
+            f"select * from {list_name} where id in ({placeholders}) order by id", added_ids
+        )]
+
+    def remove_pages(self, list_name, page_ids):
+        self._check_list(list_name)
+        conn = self._conn()
+        with conn:
+            conn.executemany(f"delete from {list_name} where id_page = ?", [(str(p),) for p in page_ids if p])
+        return True
+
+    def update_page(self, list_name, id_page, fields):
+        self._check_list(list_name)
+        fields = {k: v for k, v in fields.items() if k in PAGE_COLUMNS and k != 'id_page'}
+        if not fields:
+            return True
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                f"update {list_name} set {', '.join(f'{k} = ?' for k in fields)} where id_page = ?",
+                list(fields.values()) + [str(id_page)]
+            )
+        return True
+
+    # Historique et publicités
+
+    @staticmethod
+    def _entry(row):
+        entry = dict(row)
+        entry['query'] = json.loads(entry['query']) if entry.get('query') else {}
+        return entry
+
+    def load_history_summaries(self):
+        rows = self._conn().execute("select * from scraping_history order by created_at desc")
+        return [self._entry(row) for row in rows]
+
+    def load_history(self):
+        history = self.load_history_summaries()
+        ads_by_entry = {}
+        for row in self._conn().execute("select entry_id, data from scraping_ads order by entry_id, position"):
+            ads_by_entry.setdefault(row['entry_id'], []).append(json.loads(row['data']))
+        for entry in history:
+            entry['results'] = ads_by_entry.get(entry['id'], [])
+        return history
+
+    def count_history(self):
+        return self._conn().execute("select count(*) from scraping_history").fetchone()[0]
+
+    def _count_entry_ads(self, entry_id):
+        return self._conn().execute("select count(*) from scraping_ads where entry_id = ?", (entry_id,)).fetchone()[0]
+
+    def _upsert_ads(self, conn, entry_id, ads):
+        rows = {}
+        for ad in ads:
+            if ad.get('ad_id'):
+                rows[str(ad['ad_id'])] = (
+                    entry_id, str(ad['ad_id']), ad.get('country'), ad.get('advertiser'),
+                    ad.get('page_id'), ad.get('media_type'), json.dumps(ad, ensure_ascii=False)
+                )
+        conn.executemany(
+            """insert into scraping_ads (entry_id, ad_id, country, advertiser, page_id, media_type, data)
+               values (?, ?, ?, ?, ?, ?, ?)
+               on conflict (entry_id, ad_id) do update set
+                   country = excluded.country, advertiser = excluded.advertiser, page_id = excluded.page_id,
+                   media_type = excluded.media_type, data = excluded.data""",
+            list(rows.values())
+        )
+        self._merge_into_catalog(conn, ads)
+
+    def _write_catalog(self, conn, catalog):
+        conn.executemany(
+            """insert into ad_catalog (ad_id, country, advertiser, page_id, media_type, scraped_at, data)
+               values (?, ?, ?, ?, ?, ?, ?)
+               on conflict (ad_id) do update set
+                   country = excluded.country, advertiser = excluded.advertiser, page_id = excluded.page_id,
+                   media_type = excluded.media_type, scraped_at = excluded.scraped_at, data = excluded.data""",
+            [(ad_id, ad.get('country'), ad.get('advertiser'), ad.get('page_id'), ad.get('media_type'),
+              ad.get('scraped_at'), json.dumps(ad, ensure_ascii=False)) for ad_id, ad in catalog.items()]
+        )
+
+    def _merge_into_catalog(self, conn, ads):
+        incoming = merge_ads(ads)
+        ad_ids = list(incoming)
+        # Par paquets : nombre de paramètres limité par requête SQLite
+        for start in range(0, len(ad_ids), 500):
+            chunk = ad_ids[start:start + 500]
+            placeholders = ', '.join('?' * len(chunk))
+            catalog = {
+                row['ad_id']: json.loads(row['data'])
+                for row in conn.execute(f"select ad_id, data from ad_catalog where ad_id in ({placeholders})", chunk)
+            }
+            merge_ads([incoming[ad_id] for ad_id in chunk], catalog)
+            self._write_catalog(conn, catalog)
+
+    def add_to_history(self, query_info, results_count, results_data, status="success", error_message=None, entry_id=None):
+        conn = self._conn()
+        with conn:
+            # Mise à jour
+            if entry_id:
+                if results_data:
+                    self._upsert_ads(conn, entry_id, results_data)
+                conn.execute(
+                    "update scraping_history set results_count = ?, status = ?, error_message = ? where id = ?",
+                    (results_count, status, error_message, entry_id)
+                )
+                return entry_id
+
+            # Création
+            # Microsecondes : deux recherches lancées dans la même seconde ont chacune leur entrée
+            new_id = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+            conn.execute(
+                "insert into scraping_history (id, date, query, results_count, status, error_message) values (?, ?, ?, ?, ?, ?)",
+                (new_id, datetime.now().strftime('%Y-%m-%d %H:%M:%S'), json.dumps(query_info, ensure_ascii=False),
+                 results_count, status, error_message)
+            )
+            if results_data:
+                self._upsert_ads(conn, new_id, results_data)
+            return new_id
+
+    def store_entry_ads(self, entry_id, ads):
+        conn = self._conn()
+        with conn:
+            self._upsert_ads(conn, entry_id, ads)
+
+    def load_entry_ads(self, entry_id):
+        rows = self._conn().execute("select data from scraping_ads where entry_id = ? order by position", (entry_id,))
+        return [json.loads(row['data']) for row in rows]
+
+    def load_entry_ads_page(self, entry_id, offset=0, limit=100):
+        rows = self._conn().execute(
+            "select data from scraping_ads where entry_id = ? order by position limit ? offset ?",
+            (entry_id, limit, offset)
+        )
+        return [json.loads(row['data']) for row in rows], self._count_entry_ads(entry_id)
+
+    def search_ads(self, search, entry_id=None, media_type=None, countries=None, offset=0, limit=None):
+        query = fts5_query(search)
+        if query is None:
+            return [], 0
+        if entry_id is not None:
+            source = "scraping_ads_fts f join scraping_ads t on t.position = f.rowid"
+            where, params = ["scraping_ads_fts match ?", "t.entry_id = ?"], [query, entry_id]
+        else:
+            source = "ad_catalog_fts f join ad_catalog t on t.rowid = f.rowid"
+            where, params = ["ad_catalog_fts match ?"], [query]
+            if media_type:
+                where.append("t.media_type = ?")
+                params.append(media_type)
+            if countries:
+                where.append(f"t.country in ({', '.join('?' * len(countries))})")
+                params += list(countries)
+        where = ' and '.join(where)
+        conn = self._conn()
+        total = conn.execute(f"select count(*) from {source} where {where}", params).fetchone()[0]
+        # rank : pertinence bm25 calculée par FTS5 (meilleurs résultats d'abord)
+        rows = conn.execute(
+            f"select t.data from {source} where {where} order by f.rank limit ? offset ?",
+            params + [-1 if limit is None else limit, offset]
+        )
+        return [json.loads(row['data']) for row in rows], total
+
+    def find_entries_with_ads(self, search):
+        query = fts5_query(search)
+        if query is None:
+            return set()
+        rows = self._conn().execute(
+            "select distinct t.entry_id from scraping_ads_fts f join scraping_ads t on t.position = f.rowid "
+            "where scraping_ads_fts match ?",
+            (query,)
+        )
+        return {row['entry_id'] for row in rows}
+
+    def load_ad_columns(self, columns):
+        names = [c.strip() for c in columns.split(',')]
+        unknown = [c for c in names if c not in AD_COLUMNS]
+        if unknown:
+            raise ValueError(f"Colonnes inconnues : {unknown}")
+        rows = self._conn().execute(f"select {', '.join(names)} from scraping_ads order by entry_id, position")
+        return [dict(row) for row in rows]
+
+    # Catalogue
+
+    def load_catalog(self, media_type=None, countries=None):
+        where, params = ["1 = 1"], []
+        if media_type:
+            where.append("media_type = ?")
+            params.append(media_type)
+        if countries:
+            where.append(f"country in ({', '.join('?' * len(countries))})")
+            params += list(countries)
+        rows = self._conn().execute(
+            f"select data from ad_catalog where {' and '.join(where)} order by scraped_at desc, ad_id", params
+        )
+        return [json.loads(row['data']) for row in rows]
+
+    def load_catalog_countries(self):
+        rows = self._conn().execute(
+            "select distinct country from ad_catalog where country is not null and country not in ('', 'N/A') order by country"
+        )
+        return [row['country'] for row in rows]
+
+    def catalog_stats(self):
+        conn = self._conn()
+        return {
+            'ads': conn.execute("select count(*) from ad_catalog").fetchone()[0],
+            'raw': conn.execute("select count(*) from scraping_ads").fetchone()[0],
+            'entries': conn.execute("select count(*) from scraping_history where results_count > 0").fetchone()[0]
+        }
+
+    def rebuild_catalog(self):
+        conn = self._conn()
+        rows = conn.execute("select data from scraping_ads order by entry_id, position")
+        catalog = merge_ads(json.loads(row['data']) for row in rows)
+        with conn:
+            self._write_catalog(conn, catalog)
+        return len(catalog)
+
+    # Rapports de veille
+
+    def load_reports(self):
+        rows = self._conn().execute("select report from competitive_reports order by id desc")
+        return [json.loads(row['report']) for row in rows]
+
+    def save_report_header(self, header):
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "insert into competitive_reports (id, date, report) values (?, ?, ?) "
+                "on conflict (id) do update set date = excluded.date, report = excluded.report",
+                (header['id'], header.get('date'), json.dumps(header, ensure_ascii=False))
+            )
+        return True
+
+    def append_report_ads(self, report_id, ads):
+        rows = [
+            (report_id, str(ad['ad_id']), json.dumps(ad, ensure_ascii=False))
+            for ad in ads if ad.get('ad_id')
+        ]
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                "insert into competitive_report_ads (report_id, ad_id, data) values (?, ?, ?) "
+                "on conflict (report_id, ad_id) do nothing",
+                rows
+            )
+        return True
+
+    def load_report_ads(self, report_id):
+        rows = self._conn().execute(
+            "select data from competitive_report_ads where report_id = ? order by position", (report_id,)
+        )
+        return [json.loads(row['data']) for row in rows]
+
+    def load_report_tasks(self, report_id):
+        rows = self._conn().execute(
+            "select * from competitive_tasks where report_id = ? order by position", (report_id,)
+        )
+        return [dict(row) for row in rows]
+
+    def save_report_tasks(self, tasks):
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                f"insert into competitive_tasks ({', '.join(TASK_COLUMNS)}) "
+                f"values ({', '.join('?' for _ in TASK_COLUMNS)}) "
+                "on conflict (report_id, competitor_id) do update set "
+                + ', '.join(f"{column} = excluded.{column}" for column in TASK_COLUMNS[2:]),
+                [tuple(task.get(column) for column in TASK_COLUMNS) for task in tasks]
+            )
+        return True
+
+    # Repères de la veille
+
+    def load_watermarks(self):
+        rows = self._conn().execute("select page_id, latest_start_date, ads, updated_at from competitor_watermarks")
+        return {
+            row['page_id']: {
+                'page_id': row['page_id'],
+                'latest_start_date': row['latest_start_date'],
+                'ads': json.loads(row['ads']),
+                'updated_at': row['updated_at'],
+            }
+            for row in rows
+        }
+
+    def save_watermark(self, watermark):
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "insert into competitor_watermarks (page_id, latest_start_date, ads, updated_at) values (?, ?, ?, ?) "
+                "on conflict (page_id) do update set latest_start_date = excluded.latest_start_date, "
+                "ads = excluded.ads, updated_at = excluded.updated_at",
+                (watermark['page_id'], watermark['latest_start_date'],
+                 json.dumps(watermark['ads']), watermark['updated_at'])
+            )
+        return True
+
+    def summary(self):
+        size = os.path.getsize(self.path) / 1_048_576 if os.path.exists(self.path) else 0
+        return f"SQLite : {self.path} ({size:.1f} Mo)"
+
+
+# ============================================
+# SÉLECTION DU STOCKAGE
+# ============================================
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def load_storage_settings(config_file=CONFIG_FILE):
+    """(stockage, chemin SQLite) définis dans config.json (défauts si absents)"""
+    config = {}
+    if os.path.exists(config_file):
+        try:
+            with open(config_file, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+        except Exception as e:
+            logger.error(f"Erreur lecture {config_file} (stockage par défaut utilisé): {e}", exc_info=True)
+    return resolve_storage(config)
+
+
+def resolve_storage(config):
+    backend = config.get('storage_backend') or DEFAULT_BACKEND
+    if backend not in STORAGE_BACKENDS:
+        backend = DEFAULT_BACKEND
+    return backend, config.get('sqlite_path') or DEFAULT_SQLITE_PATH
+
+
+def get_storage(config=None):
+    """Stockage configuré (une instance par processus et par réglage)"""
+    key = resolve_storage(config) if config is not None else load_storage_settings()
+    with _backends_lock:
+        if key not in _backends:
+            backend, sqlite_path = key
+            _backends[key] = SQLiteBackend(sqlite_path) if backend == 'sqlite' else SupabaseBackend()
+        return _backends[key]
+
+
+# ============================================
+# FONCTIONS (stockage de config.json)
+# ============================================
+
+def load_blacklist():
+    return get_storage().load_pages('blacklist')
+
+def load_whitelist():
+    return get_storage().load_pages('whitelist')
+
+def add_pages(list_name, pages):
+    """Ajoute des pages (id_page déjà présents ignorés) ; retourne les pages ajoutées"""
+    return get_storage().add_pages(list_name, pages)
+
+def remove_pages(list_name, page_ids):
+    return get_storage().remove_pages(list_name, page_ids)
+
+def update_page(list_name, id_page, fields):
+    return get_storage().update_page(list_name, id_page, fields)
+
+def load_history():
+    return get_storage().load_history()
+
+def load_history_summaries():
+    return get_storage().load_history_summaries()
+
+def count_history():
+    return get_storage().count_history()
+
+def add_to_history(query_info, results_count, results_data, url=None, status="success", error_message=None, entry_id=None):
+    return get_storage().add_to_history(
+        query_info, results_count, results_data,
+        status=status, error_message=error_message, entry_id=entry_id
+    )
+
+def store_entry_ads(entry_id, ads):
+    """Ajoute des publicités à une entrée (lève une exception en cas d'échec)"""
+    get_storage().store_entry_ads(entry_id, ads)
+
+def update_history_incrementally(entry_id, new_results):
+    """Comme store_entry_ads, mais retourne False en cas d'échec (erreur journalisée)"""
+    try:
+        store_entry_ads(entry_id, new_results)
+        return True
+    except Exception as e:
+        logger.error(f"Enregistrement de {len(new_results)} publicités pour {entry_id} échoué : {e}", exc_info=True)
+        return False
+
+def load_entry_ads(entry_id):
+    return get_storage().load_entry_ads(entry_id)
+
+def load_entry_ads_page(entry_id, offset=0, limit=100):
+    """(publicités de la page, nombre total de publicités de l'entrée)"""
+    return get_storage().load_entry_ads_page(entry_id, offset=offset, limit=limit)
+
+def iter_entry_ads(entry_id, page_size=1000):
+    """Publicités d'une entrée lues page par page (exports sans tout charger d'un coup)"""
+    offset = 0
+    while True:
+        ads, total = load_entry_ads_page(entry_id, offset=offset, limit=page_size)
+        yield from ads
+        offset += page_size
+        if not ads or offset >= total:
+            return
+
+def search_ads(search, entry_id=None, media_type=None, countries=None, offset=0, limit=None):
+    """
+    Recherche plein texte classée par pertinence, sans tenir compte des
+    accents, mots en préfixe (cf. ad_search.py)
+
+    Dans les publicités d'une entrée, ou dans le catalogue si entry_id est
+    None. Retourne (publicités, nombre total de résultats).
+    """
+    return get_storage().search_ads(
+        search, entry_id=entry_id, media_type=media_type, countries=countries, offset=offset, limit=limit
+    )
+
+def find_entries_with_ads(search):
+    return get_storage().find_entries_with_ads(search)
+
+def load_ad_columns(columns):
+    return get_storage().load_ad_columns(columns)
+
+def load_catalog(media_type=None, countries=None):
+    """Publicités du catalogue (une par ad_id), scrapings les plus récents d'abord"""
+    return get_storage().load_catalog(media_type=media_type, countries=countries)
+
+def load_catalog_countries():
+    return get_storage().load_catalog_countries()
+
+def catalog_stats():
+    return get_storage().catalog_stats()
+
+def rebuild_catalog():
+    return get_storage().rebuild_catalog()
+
+def load_reports():
+    """En-têtes des rapports de veille (sans publicités), du plus récent au plus ancien"""
+    return get_storage().load_reports()
+
+def report_header(report):
+    """Rapport sans ses publicités (compteurs, statut, erreurs)"""
+    return {key: value for key, value in report.items() if key != 'results'}
+
+def save_report_header(report):
+    """Enregistre l'en-tête d'un rapport (taille constante, publicités exclues)"""
+    return get_storage().save_report_header(report_header(report))
+
+def append_report_ads(report_id, ads):
+    """Ajoute des publicités à un rapport : coût proportionnel aux seules nouvelles publicités"""
+    return get_storage().append_report_ads(report_id, ads)
+
+def load_report_ads(report_id):
+    return get_storage().load_report_ads(report_id)
+
+def load_report_tasks(report_id):
+    """Tâches d'une veille (une par concurrent), dans l'ordre de la whitelist"""
+    return get_storage().load_report_tasks(report_id)
+
+def save_report_tasks(tasks):
+    """Crée ou met à jour des tâches (clé : report_id + competitor_id)"""
+    return get_storage().save_report_tasks(tasks)
+
+def save_report(report):
+    """Enregistre un rapport complet (en-tête + publicités, cf. import_local_files)"""
+    return save_report_header(report) and append_report_ads(report['id'], report.get('results') or [])
+
+def load_watermarks():
+    """Repères de la veille par page_id (cf. watermarks.py)"""
+    return get_storage().load_watermarks()
+
+def save_watermark(watermark):
+    return get_storage().save_watermark(watermark)
+
+def storage_summary():
+    return get_storage().summary()
+
+
+# ============================================
+# IMPORT DES ANCIENS FICHIERS LOCAUX
+# ============================================
+
+def import_local_files():
+    """
+    Copie whitelist.json et daily_competitive_reports.json (anciens fichiers
+    des scripts) dans le stockage configuré ; relançable sans doublons
+    """
+    imported = {'whitelist': 0, 'reports': 0}
+    if os.path.exists(LEGACY_WHITELIST_FILE):
+        with open(LEGACY_WHITELIST_FILE, 'r', encoding='utf-8') as f:
+            pages = [{k: v for k, v in page.items() if k in PAGE_COLUMNS} for page in json.load(f)]
+        imported['whitelist'] = len(add_pages('whitelist', pages) or [])
+    if os.path.exists(LEGACY_REPORTS_FILE):
+        with open(LEGACY_REPORTS_FILE, 'r', encoding='utf-8') as f:
+            reports = json.load(f)
+        for report in reports:
+            save_report(report)
+        imported['reports'] = len(reports)
+    return imported
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == "import-local":
+        backend, _ = load_storage_settings()
+        imported = import_local_files()
+        print(f"Stockage {backend} : {imported['whitelist']} page(s) whitelist ajoutée(s), "
+              f"{imported['reports']} rapport(s) importé(s)")
+    elif len(sys.argv) > 1 and sys.argv[1] == "rebuild-catalog":
+        print(f"Catalogue reconstruit : {rebuild_catalog()} publicité(s) unique(s)")
+    else:
+        print("USAGE: python storage.py import-local|rebuild-catalog")
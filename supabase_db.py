@@ -1,23 +1,252 @@
+import logging
 import os
-from supabase import create_client, Client
-import streamlit as st
+import random
+import threading
+import time
+
+import httpx
+from supabase import create_client, Client, ClientOptions
+from postgrest import APIError, CountMethod, ReturnMethod
+
+try:
+    import streamlit as st
+except ImportError:
+    # Scripts sans interface (benchmarks, jobs en arrière-plan) : erreurs journalisées seulement
+    st = None
+
+from ad_catalog import merge_ads
+from ad_search import matches, tsquery
+
+# ============================================
+# CONNEXION (client partagé)
+# ============================================
+# Un seul client par processus (interface Streamlit, boucle de scraping,
+# scripts lancés en sous-processus) : les connexions HTTP sont gardées
+# ouvertes entre les requêtes au lieu d'un nouveau client (et d'une
+# nouvelle poignée de main TLS) à chaque appel.
+
+SUPABASE_TIMEOUT = 30  # secondes par requête
+RETRY_ATTEMPTS = 3
+RETRY_BACKOFF = 0.5  # secondes, doublé à chaque nouvelle tentative
+
+# Erreurs passagères : passerelle/serveur indisponible, base injoignable
+_RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504, 520}
+_RETRYABLE_CODES = {'PGRST000', 'PGRST001', 'PGRST002', '40001', '57P01'}
+
+_client_lock = threading.Lock()
+_client_state = {'client': None, 'http': None, 'pid': None}
+
+logger = logging.getLogger(__name__)
+
+def _report_error(message):
+    """Erreur journalisée, et affichée dans l'interface si elle tourne sous Streamlit"""
+    logger.error(message)
+    if st is not None:
+        st.error(message)
+
+def _credentials():
+    # Local (.env)
+    if "SUPABASE_URL" in os.environ:
+        return os.environ["SUPABASE_URL"], os.environ["SUPABASE_KEY"]
+    if st is None:
+        raise RuntimeError("SUPABASE_URL / SUPABASE_KEY non définis")
+    # Streamlit Cloud (secrets.toml)
+    return st.secrets["supabase"]["url"], st.secrets["supabase"]["key"]
 
 def get_supabase() -> Client:
-    """Connexion Supabase (local + cloud)"""
+    """Connexion Supabase (local + cloud), partagée par tout le processus"""
+    client = _client_state['client']
+    if client is not None and _client_state['pid'] == os.getpid():
+        return client
+    
+    with _client_lock:
+        # Un processus forké ne réutilise pas les sockets de son parent
+        if _client_state['client'] is None or _client_state['pid'] != os.getpid():
+            try:
+                url, key = _credentials()
+                http = httpx.Client(
+                    timeout=httpx.Timeout(SUPABASE_TIMEOUT, connect=10),
+                    limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=120),
+                    follow_redirects=True
+                )
+                _client_state['client'] = create_client(url, key, options=ClientOptions(httpx_client=http))
+                _client_state['http'] = http
+                _client_state['pid'] = os.getpid()
+            except Exception as e:
+                _report_error(f"Erreur connexion Supabase: {e}")
+                raise
+        return _client_state['client']
+
+def reset_supabase():
+    """Ferme les connexions du client partagé (recréé au prochain appel)"""
+    with _client_lock:
+        http = _client_state['http']
+        _client_state.update({'client': None, 'http': None, 'pid': None})
+    if http is not None:
+        http.close()
+
+class RequestStats:
+    """Nombre, durée, erreurs et nouvelles tentatives des requêtes, par opération"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.operations = {}
+    
+    def record(self, label, elapsed, retries, ok):
+        with self._lock:
+            op = self.operations.setdefault(label, {
+                'requests': 0, 'errors': 0, 'retries': 0, 'total_ms': 0.0, 'max_ms': 0.0
+            })
+            op['requests'] += 1
+            op['errors'] += 0 if ok else 1
+            op['retries'] += retries
+            op['total_ms'] += elapsed * 1000
+            op['max_ms'] = max(op['max_ms'], elapsed * 1000)
+    
+    def snapshot(self):
+        with self._lock:
+            return {label: dict(op) for label, op in self.operations.items()}
+    
+    def summary(self):
+        ops = self.snapshot()
+        requests = sum(op['requests'] for op in ops.values())
+        if not requests:
+            return "Supabase : aucune requête"
+        total_ms = sum(op['total_ms'] for op in ops.values())
+        errors = sum(op['errors'] for op in ops.values())
+        retries = sum(op['retries'] for op in ops.values())
+        return (
+            f"Supabase : {requests} requêtes, {total_ms / requests:.0f} ms en moyenne "
+            f"({retries} nouvelles tentatives, {errors} erreurs)"
+        )
+
+request_stats = RequestStats()
+
+def _is_retryable(error, idempotent):
+    # Connexion impossible : la requête n'est jamais partie, on peut toujours réessayer
+    if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+        return True
+    if not idempotent:
+        return False
+    if isinstance(error, httpx.TransportError):
+        return True
+    if isinstance(error, APIError):
+        code = str(error.code)
+        return code in _RETRYABLE_CODES or (code.isdigit() and int(code) in _RETRYABLE_STATUS)
+    return False
+
+def _execute(query, label, idempotent=True):
+    """
+    Exécute une requête avec nouvelles tentatives (attente exponentielle)
+    
+    idempotent=False (insert) : seules les erreurs de connexion, où la
+    requête n'a pas été envoyée, sont réessayées.
+    """
+    start = time.perf_counter()
+    for attempt in range(RETRY_ATTEMPTS):
+        try:
+            response = query.execute()
+            request_stats.record(label, time.perf_counter() - start, attempt, ok=True)
+            return response
+        except Exception as e:
+            if attempt == RETRY_ATTEMPTS - 1 or not _is_retryable(e, idempotent):
+                request_stats.record(label, time.perf_counter() - start, attempt, ok=False)
+                raise
+            time.sleep(RETRY_BACKOFF * 2 ** attempt * random.uniform(1, 1.5))
+
+def check_supabase_health():
+    """
+    Sonde de santé : une requête minimale sur scraping_history, sans nouvelle tentative
+    
+    Returns:
+        {'ok': bool, 'latency_ms': float, 'error': str ou None}
+    """
+    start = time.perf_counter()
     try:
-        # Local (.env)
-        if "SUPABASE_URL" in os.environ:
-            url = os.environ["SUPABASE_URL"]
-            key = os.environ["SUPABASE_KEY"]
-        # Streamlit Cloud (secrets.toml)
-        else:
-            url = st.secrets["supabase"]["url"]
-            key = st.secrets["supabase"]["key"]
-        
-        return create_client(url, key)
+        get_supabase().table('scraping_history').select('id', count=CountMethod.exact, head=True).limit(1).execute()
+        return {'ok': True, 'latency_ms': (time.perf_counter() - start) * 1000, 'error': None}
     except Exception as e:
-        st.error(f"Erreur connexion Supabase: {e}")
-        raise
+        return {'ok': False, 'latency_ms': (time.perf_counter() - start) * 1000, 'error': str(e)}
+
+# ============================================
+# LISTES DE PAGES (blacklist / whitelist)
+# ============================================
+# Opérations incrémentales, clé = id_page (index unique, cf.
+# migrations/002_pages_id_page_unique.sql) : seules les pages ajoutées,
+# retirées ou modifiées sont envoyées, quelle que soit la taille de la liste.
+
+PAGES_BATCH_SIZE = 500
+
+def _page_key(page):
+    return str(page.get('id_page') or '')
+
+def add_pages(list_name, pages, batch_size=PAGES_BATCH_SIZE):
+    """
+    Ajoute des pages à une liste (pages sans id_page ou déjà présentes ignorées)
+    
+    Returns:
+        Pages réellement ajoutées (lignes créées), None en cas d'erreur
+    """
+    # Doublons du lot : la première occurrence est conservée
+    rows = {}
+    for page in pages:
+        if _page_key(page) and _page_key(page) not in rows:
+            rows[_page_key(page)] = {k: v for k, v in page.items() if k != 'id'}
+    rows = list(rows.values())
+    
+    try:
+        supabase = get_supabase()
+        added = []
+        for start in range(0, len(rows), batch_size):
+            response = _execute(supabase.table(list_name).upsert(
+                rows[start:start + batch_size],
+                on_conflict='id_page',
+                ignore_duplicates=True
+            ), 'add_pages')
+            added.extend(response.data)
+        return added
+    except Exception as e:
+        _report_error(f"Erreur add_pages ({list_name}): {e}")
+        return None
+
+def remove_pages(list_name, page_ids, batch_size=PAGES_BATCH_SIZE):
+    """Retire des pages d'une liste à partir de leurs id_page"""
+    page_ids = list({str(page_id) for page_id in page_ids if page_id})
+    try:
+        supabase = get_supabase()
+        for start in range(0, len(page_ids), batch_size):
+            _execute(supabase.table(list_name).delete().in_('id_page', page_ids[start:start + batch_size]), 'remove_pages')
+        return True
+    except Exception as e:
+        _report_error(f"Erreur remove_pages ({list_name}): {e}")
+        return False
+
+def update_page(list_name, id_page, fields):
+    """Met à jour les champs d'une page (ex : id_permanent récupéré plus tard)"""
+    fields = {k: v for k, v in fields.items() if k not in ('id', 'id_page')}
+    if not fields:
+        return True
+    try:
+        supabase = get_supabase()
+        _execute(supabase.table(list_name).update(fields).eq('id_page', str(id_page)), 'update_page')
+        return True
+    except Exception as e:
+        _report_error(f"Erreur update_page ({list_name}): {e}")
+        return False
+
+def _sync_pages(list_name, pages):
+    """Aligne la table sur la liste fournie en n'envoyant que la différence"""
+    supabase = get_supabase()
+    existing = {_page_key(row) for row in _execute(supabase.table(list_name).select('id_page'), 'sync_pages').data}
+    wanted = {_page_key(page): page for page in pages if _page_key(page)}
+    
+    removed = existing - set(wanted)
+    if removed and not remove_pages(list_name, removed):
+        return False
+    added = [page for key, page in wanted.items() if key not in existing]
+    if added and add_pages(list_name, added) is None:
+        return False
+    return True
 
 # ============================================
 # BLACKLIST
@@ -27,27 +256,18 @@ def load_blacklist():
     """Charge la blacklist depuis Supabase"""
     try:
         supabase = get_supabase()
-        response = supabase.table('blacklist').select('*').execute()
+        response = _execute(supabase.table('blacklist').select('*'), 'load_blacklist')
         return response.data
     except Exception as e:
-        st.error(f"Erreur load_blacklist: {e}")
+        _report_error(f"Erreur load_blacklist: {e}")
         return []
 
 def save_blacklist(blacklist):
-    """Sauvegarde la blacklist (REMPLACE tout)"""
+    """Sauvegarde la blacklist (préférer add_pages / remove_pages)"""
     try:
-        supabase = get_supabase()
-        
-        # Supprimer tout
-        supabase.table('blacklist').delete().neq('id', 0).execute()
-        
-        # Réinsérer
-        if blacklist:
-            supabase.table('blacklist').insert(blacklist).execute()
-        
-        return True
+        return _sync_pages('blacklist', blacklist)
     except Exception as e:
-        st.error(f"Erreur save_blacklist: {e}")
+        _report_error(f"Erreur save_blacklist: {e}")
         return False
 
 # ============================================
@@ -58,105 +278,607 @@ def load_whitelist():
     """Charge la whitelist depuis Supabase"""
     try:
         supabase = get_supabase()
-        response = supabase.table('whitelist').select('*').execute()
+        response = _execute(supabase.table('whitelist').select('*'), 'load_whitelist')
         return response.data
     except Exception as e:
-        st.error(f"Erreur load_whitelist: {e}")
+        _report_error(f"Erreur load_whitelist: {e}")
         return []
 
 def save_whitelist(whitelist):
-    """Sauvegarde la whitelist (REMPLACE tout)"""
+    """Sauvegarde la whitelist (préférer add_pages / remove_pages)"""
+    try:
+        return _sync_pages('whitelist', whitelist)
+    except Exception as e:
+        _report_error(f"Erreur save_whitelist: {e}")
+        return False
+
+# ============================================
+# PUBLICITÉS SCRAPÉES (table scraping_ads)
+# ============================================
+# Une ligne par (entry_id, ad_id), cf. migrations/001_scraping_ads.sql.
+# Les écritures sont des upserts groupés : renvoyer une publicité déjà
+# enregistrée ne crée pas de doublon.
+
+ADS_TABLE = 'scraping_ads'
+ADS_BATCH_SIZE = 500
+ADS_PAGE_SIZE = 1000  # nombre max de lignes renvoyées par requête
+
+def _ad_row(entry_id, ad):
+    """Ligne scraping_ads d'une publicité (colonnes de filtre + publicité complète)"""
+    return {
+        'entry_id': entry_id,
+        'ad_id': str(ad['ad_id']),
+        'country': ad.get('country'),
+        'advertiser': ad.get('advertiser'),
+        'page_id': ad.get('page_id'),
+        'media_type': ad.get('media_type'),
+        'data': ad
+    }
+
+def _upsert_ads(entry_id, ads, batch_size=ADS_BATCH_SIZE):
+    # Un même lot ne peut pas contenir deux fois la même clé
+    rows = {}
+    for ad in ads:
+        if ad.get('ad_id'):
+            rows[str(ad['ad_id'])] = _ad_row(entry_id, ad)
+    rows = list(rows.values())
+    
+    supabase = get_supabase()
+    for start in range(0, len(rows), batch_size):
+        _execute(supabase.table(ADS_TABLE).upsert(
+            rows[start:start + batch_size],
+            on_conflict='entry_id,ad_id',
+            returning=ReturnMethod.minimal
+        ), 'save_ads_batch')
+    
+    _merge_into_catalog(ads, batch_size)
+
+def save_ads_batch(entry_id, ads, batch_size=ADS_BATCH_SIZE):
+    """Enregistre des publicités d'une entrée (upserts par lots, idempotents)"""
     try:
+        _upsert_ads(entry_id, ads, batch_size)
+        return True
+    except Exception as e:
+        _report_error(f"Erreur save_ads_batch: {e}")
+        return False
+
+def count_entry_ads(entry_id):
+    """Nombre de publicités enregistrées pour une entrée"""
+    supabase = get_supabase()
+    response = _execute(supabase.table(ADS_TABLE).select('ad_id', count=CountMethod.exact, head=True).eq('entry_id', entry_id), 'count_entry_ads')
+    return response.count or 0
+
+def _load_ad_rows(query_builder):
+    """Lit toutes les lignes d'une requête, page par page"""
+    rows = []
+    start = 0
+    while True:
+        response = _execute(query_builder().range(start, start + ADS_PAGE_SIZE - 1), 'load_ad_rows')
+        rows.extend(response.data)
+        if len(response.data) < ADS_PAGE_SIZE:
+            return rows
+        start += ADS_PAGE_SIZE
+
+def _fts(builder, search):
+    """Filtre plein texte (colonne search_tsv, cf. migrations/005_ads_search.sql)"""
+    return builder.filter('search_tsv', 'fts(simple)', tsquery(search))
+
+def _legacy_entry_results(entry_id):
+    """Résultats JSON d'une entrée pas encore migrée vers scraping_ads"""
+    supabase = get_supabase()
+    response = _execute(supabase.table('scraping_history').select('results').eq('id', entry_id), 'legacy_results')
+    return (response.data[0].get('results') if response.data else None) or []
+
+def load_entry_ads(entry_id):
+    """Publicités d'une entrée, dans l'ordre d'enregistrement"""
+    try:
+        supabase = get_supabase()
+        ads = [row['data'] for row in _load_ad_rows(
+            lambda: supabase.table(ADS_TABLE).select('data').eq('entry_id', entry_id).order('position')
+        )]
+        return ads or _legacy_entry_results(entry_id)
+    except Exception as e:
+        _report_error(f"Erreur load_entry_ads: {e}")
+        return []
+
+def load_entry_ads_page(entry_id, offset=0, limit=100):
+    """
+    Une page de publicités d'une entrée
+    
+    Returns:
+        (publicités de la page, nombre total de publicités)
+    """
+    try:
+        supabase = get_supabase()
+        response = _execute(
+            supabase.table(ADS_TABLE).select('data', count=CountMethod.exact).eq('entry_id', entry_id)
+            .order('position').range(offset, offset + limit - 1),
+            'load_entry_ads_page'
+        )
+        if not response.count:
+            # Entrée pas encore migrée : pagination sur le JSON d'origine
+            legacy = _legacy_entry_results(entry_id)
+            return legacy[offset:offset + limit], len(legacy)
+        return [row['data'] for row in response.data], response.count
+    except Exception as e:
+        _report_error(f"Erreur load_entry_ads_page: {e}")
+        return [], 0
+
+def search_ads(search, entry_id=None, media_type=None, countries=None, offset=0, limit=None):
+    """
+    Recherche plein texte classée par pertinence (règles de ad_search.py)
+    
+    Args:
+        search: saisie de l'utilisateur
+        entry_id: publicités d'une entrée ; None : catalogue (filtrable par
+            type de média et pays)
+        offset, limit: pagination (limit None : tous les résultats)
+    
+    Returns:
+        (publicités, nombre total de résultats)
+    """
+    try:
+        query = tsquery(search)
+        if query is None:
+            return [], 0
         supabase = get_supabase()
+        params = {
+            'q': query,
+            'p_entry_id': entry_id,
+            'p_media_type': media_type,
+            'p_countries': list(countries) if countries else None
+        }
+        ads, total = [], 0
+        start = offset
+        while True:
+            size = ADS_PAGE_SIZE if limit is None else min(ADS_PAGE_SIZE, limit - len(ads))
+            response = _execute(supabase.rpc('search_ads', {**params, 'p_limit': size, 'p_offset': start}), 'search_ads')
+            ads.extend(row['data'] for row in response.data)
+            if response.data:
+                total = response.data[0]['total']
+            if len(response.data) < size or len(ads) == limit:
+                break
+            start += size
         
-        # Supprimer tout
-        supabase.table('whitelist').delete().neq('id', 0).execute()
+        if entry_id and not total and count_entry_ads(entry_id) == 0:
+            legacy = [ad for ad in _legacy_entry_results(entry_id) if matches(ad, search)]
+            end = None if limit is None else offset + limit
+            return legacy[offset:end], len(legacy)
+        return ads, total
+    except Exception as e:
+        _report_error(f"Erreur search_ads: {e}")
+        return [], 0
+
+def find_entries_with_ads(search):
+    """IDs des entrées ayant au moins une publicité qui correspond à search"""
+    if tsquery(search) is None:
+        return set()
+    try:
+        supabase = get_supabase()
+        rows = _load_ad_rows(
+            lambda: _fts(supabase.table(ADS_TABLE).select('entry_id'), search).order('entry_id')
+        )
+        return {row['entry_id'] for row in rows}
+    except Exception as e:
+        _report_error(f"Erreur find_entries_with_ads: {e}")
+        return set()
+
+def load_ad_columns(columns):
+    """
+    Quelques colonnes de toutes les publicités (ex : 'entry_id, media_type'),
+    pour les filtres de l'historique sans charger les publicités complètes
+    """
+    try:
+        supabase = get_supabase()
+        return _load_ad_rows(
+            lambda: supabase.table(ADS_TABLE).select(columns).order('entry_id').order('position')
+        )
+    except Exception as e:
+        _report_error(f"Erreur load_ad_columns: {e}")
+        return []
+
+# ============================================
+# CATALOGUE DES PUBLICITÉS (table ad_catalog)
+# ============================================
+# Une ligne par ad_id, fusionnée à chaque enregistrement de publicités
+# (règles de ad_catalog.py, reprises en SQL par merge_ad_catalog),
+# cf. migrations/004_ad_catalog.sql et 009_merge_ad_catalog.sql.
+
+CATALOG_TABLE = 'ad_catalog'
+
+def _catalog_row(ad_id, ad):
+    return {
+        'ad_id': ad_id,
+        'country': ad.get('country'),
+        'advertiser': ad.get('advertiser'),
+        'page_id': ad.get('page_id'),
+        'media_type': ad.get('media_type'),
+        'scraped_at': ad.get('scraped_at'),
+        'data': ad
+    }
+
+def _upsert_catalog(catalog, batch_size=ADS_BATCH_SIZE):
+    rows = [_catalog_row(ad_id, ad) for ad_id, ad in catalog.items()]
+    supabase = get_supabase()
+    for start in range(0, len(rows), batch_size):
+        _execute(supabase.table(CATALOG_TABLE).upsert(
+            rows[start:start + batch_size],
+            on_conflict='ad_id',
+            returning=ReturnMethod.minimal
+        ), 'merge_catalog')
+
+def _merge_into_catalog(ads, batch_size=ADS_BATCH_SIZE):
+    """
+    Fusionne des publicités avec leurs versions du catalogue (lève une exception en cas d'échec)
+    
+    La fusion est faite par la base (fonction merge_ad_catalog, cf.
+    migrations/009_merge_ad_catalog.sql) : un appel par lot, sans relecture.
+    """
+    # Doublons du lot fusionnés avant l'envoi : un upsert ne peut pas modifier deux fois la même ligne
+    incoming = [dict(ad, ad_id=ad_id) for ad_id, ad in merge_ads(ads).items()]
+    supabase = get_supabase()
+    for start in range(0, len(incoming), batch_size):
+        _execute(supabase.rpc('merge_ad_catalog', {'ads': incoming[start:start + batch_size]}), 'merge_catalog')
+
+def load_catalog(media_type=None, countries=None):
+    """Publicités du catalogue (filtrées par la base), scrapings les plus récents d'abord"""
+    try:
+        supabase = get_supabase()
         
-        # Réinsérer
-        if whitelist:
-            supabase.table('whitelist').insert(whitelist).execute()
+        def query():
+            builder = supabase.table(CATALOG_TABLE).select('data')
+            if media_type:
+                builder = builder.eq('media_type', media_type)
+            if countries:
+                builder = builder.in_('country', list(countries))
+            return builder.order('scraped_at', desc=True).order('ad_id')
         
-        return True
+        return [row['data'] for row in _load_ad_rows(query)]
     except Exception as e:
-        st.error(f"Erreur save_whitelist: {e}")
-        return False
+        _report_error(f"Erreur load_catalog: {e}")
+        return []
+
+def load_catalog_countries():
+    """Pays présents dans le catalogue"""
+    try:
+        supabase = get_supabase()
+        rows = _load_ad_rows(lambda: supabase.table(CATALOG_TABLE).select('country').order('ad_id'))
+        return sorted({row['country'] for row in rows if row.get('country') and row['country'] != 'N/A'})
+    except Exception as e:
+        _report_error(f"Erreur load_catalog_countries: {e}")
+        return []
+
+def catalog_stats():
+    """Publicités uniques, publicités enregistrées (doublons compris) et scrapings sources"""
+    try:
+        supabase = get_supabase()
+        unique = _execute(supabase.table(CATALOG_TABLE).select('ad_id', count=CountMethod.exact, head=True), 'catalog_stats')
+        raw = _execute(supabase.table(ADS_TABLE).select('ad_id', count=CountMethod.exact, head=True), 'catalog_stats')
+        entries = _execute(
+            supabase.table('scraping_history').select('id', count=CountMethod.exact, head=True).gt('results_count', 0),
+            'catalog_stats'
+        )
+        return {'ads': unique.count or 0, 'raw': raw.count or 0, 'entries': entries.count or 0}
+    except Exception as e:
+        _report_error(f"Erreur catalog_stats: {e}")
+        return {'ads': 0, 'raw': 0, 'entries': 0}
+
+def rebuild_catalog():
+    """
+    Reconstruit le catalogue à partir de toutes les publicités enregistrées
+    (entrées dans l'ordre chronologique) ; relançable sans risque
+    
+    Returns:
+        Nombre de publicités uniques
+    """
+    supabase = get_supabase()
+    rows = _load_ad_rows(
+        lambda: supabase.table(ADS_TABLE).select('data').order('entry_id').order('position')
+    )
+    catalog = merge_ads(row['data'] for row in rows)
+    _upsert_catalog(catalog)
+    return len(catalog)
 
 # ============================================
 # SCRAPING HISTORY
 # ============================================
 
 def load_history():
-    """Charge l'historique des scraping"""
+    """
+    Charge l'historique des scraping avec toutes les publicités
+    (préférer load_history_summaries + load_entry_ads_page)
+    
+    Les publicités (table scraping_ads) sont rattachées à chaque entrée dans
+    'results' ; les entrées pas encore migrées gardent leur JSON d'origine.
+    """
     try:
         supabase = get_supabase()
-        response = supabase.table('scraping_history').select('*').order('created_at', desc=True).execute()
+        response = _execute(supabase.table('scraping_history').select('*').order('created_at', desc=True), 'load_history')
+        history = response.data
+        
+        rows = _load_ad_rows(
+            lambda: supabase.table(ADS_TABLE).select('entry_id, data').order('entry_id').order('position')
+        )
+        ads_by_entry = {}
+        for row in rows:
+            ads_by_entry.setdefault(row['entry_id'], []).append(row['data'])
+        
+        for entry in history:
+            if entry['id'] in ads_by_entry:
+                entry['results'] = ads_by_entry[entry['id']]
+        return history
+    except Exception as e:
+        _report_error(f"Erreur load_history: {e}")
+        return []
+
+HISTORY_SUMMARY_COLUMNS = 'id, date, query, results_count, status, error_message, created_at'
+
+def load_history_summaries():
+    """Historique sans les publicités (métadonnées et nombre de résultats)"""
+    try:
+        supabase = get_supabase()
+        response = _execute(
+            supabase.table('scraping_history').select(HISTORY_SUMMARY_COLUMNS).order('created_at', desc=True),
+            'load_history_summaries'
+        )
         return response.data
     except Exception as e:
-        st.error(f"Erreur load_history: {e}")
+        _report_error(f"Erreur load_history_summaries: {e}")
         return []
 
+def count_history():
+    """Nombre d'entrées de l'historique (requête de comptage uniquement)"""
+    try:
+        supabase = get_supabase()
+        response = _execute(
+            supabase.table('scraping_history').select('id', count=CountMethod.exact, head=True),
+            'count_history'
+        )
+        return response.count or 0
+    except Exception as e:
+        _report_error(f"Erreur count_history: {e}")
+        return 0
+
 def save_history(history):
     """NE PAS UTILISER - Utiliser add_to_history à la place"""
     pass
 
 def add_to_history(query_info, results_count, results_data, url=None, status="success", error_message=None, entry_id=None):
-    """Ajoute ou met à jour une entrée dans l'historique"""
+    """
+    Ajoute ou met à jour une entrée dans l'historique
+    
+    scraping_history ne contient que le résumé ; results_data est enregistré
+    dans scraping_ads (liste vide si les publicités sont déjà enregistrées).
+    results_count est le total tenu par l'appelant au fil du scraping.
+    """
     try:
         supabase = get_supabase()
         
         # Mise à jour
         if entry_id:
-            supabase.table('scraping_history').update({
+            # Publicités non enregistrées : l'entrée ne doit pas passer pour complète
+            if results_data and not save_ads_batch(entry_id, results_data):
+                status = 'error'
+                error_message = error_message or "Échec de l'enregistrement des publicités"
+            _execute(supabase.table('scraping_history').update({
                 'results_count': results_count,
-                'results': results_data,
                 'status': status,
                 'error_message': error_message
-            }).eq('id', entry_id).execute()
+            }).eq('id', entry_id), 'add_to_history')
             return entry_id
         
         # Création
         from datetime import datetime
-        new_id = entry_id or datetime.now().strftime('%Y%m%d_%H%M%S')
+        # Microsecondes : deux recherches lancées dans la même seconde (planificateur) ont chacune leur entrée
+        new_id = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
         
         entry = {
             'id': new_id,
             'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
             'query': query_info,
             'results_count': results_count,
-            'results': results_data,
+            'results': [],
             'status': status,
             'error_message': error_message
         }
         
-        supabase.table('scraping_history').insert(entry).execute()
+        _execute(supabase.table('scraping_history').insert(entry), 'add_to_history', idempotent=False)
+        if results_data and not save_ads_batch(new_id, results_data):
+            _execute(supabase.table('scraping_history').update({
+                'status': 'error',
+                'error_message': error_message or "Échec de l'enregistrement des publicités"
+            }).eq('id', new_id), 'add_to_history')
         return new_id
         
     except Exception as e:
-        st.error(f"Erreur add_to_history: {e}")
+        _report_error(f"Erreur add_to_history: {e}")
         return None
 
+def store_entry_ads(entry_id, new_results):
+    """
+    Ajoute des publicités à une entrée
+    
+    Le nombre de résultats n'est pas recompté à chaque point de sauvegarde :
+    il est écrit par la mise à jour finale (add_to_history).
+    Lève une exception en cas d'échec (utilisée par la file d'écriture
+    différée, qui réessaie plus tard).
+    """
+    _upsert_ads(entry_id, new_results)
+
 def update_history_incrementally(entry_id, new_results):
-    """Met à jour progressivement une entrée"""
+    """Ajoute des publicités à une entrée (sans relire les résultats existants)"""
     try:
-        supabase = get_supabase()
+        store_entry_ads(entry_id, new_results)
+        return True
+    except Exception as e:
+        _report_error(f"Erreur update_history_incrementally: {e}")
+        return False
+
+def migrate_history_results():
+    """
+    Déplace les résultats JSON des entrées existantes vers scraping_ads
+    
+    Idempotent : une entrée déjà migrée (results vide) est ignorée, et une
+    migration interrompue peut être relancée sans créer de doublons.
+    
+    Returns:
+        Nombre d'entrées migrées
+    """
+    supabase = get_supabase()
+    entry_ids = [row['id'] for row in _execute(supabase.table('scraping_history').select('id'), 'migrate_history').data]
+    
+    migrated = 0
+    for entry_id in entry_ids:
+        # Une entrée à la fois : le JSON complet n'est chargé qu'une fois
+        response = _execute(supabase.table('scraping_history').select('results').eq('id', entry_id), 'migrate_history')
+        results = (response.data[0].get('results') if response.data else None) or []
+        if not results:
+            continue
         
-        # Récupérer l'entrée actuelle
-        response = supabase.table('scraping_history').select('results').eq('id', entry_id).execute()
+        if not save_ads_batch(entry_id, results):
+            raise RuntimeError(f"Migration interrompue sur l'entrée {entry_id}")
         
-        if response.data:
-            current_results = response.data[0].get('results', [])
-            current_results.extend(new_results)
-            
-            # Mettre à jour
-            supabase.table('scraping_history').update({
-                'results': current_results,
-                'results_count': len(current_results)
-            }).eq('id', entry_id).execute()
-            
-            return True
+        _execute(supabase.table('scraping_history').update({
+            'results': [],
+            'results_count': count_entry_ads(entry_id)
+        }).eq('id', entry_id), 'migrate_history')
+        migrated += 1
+        print(f"✅ {entry_id} : {len(results)} publicités migrées")
+    
+    return migrated
+
+# ============================================
+# RAPPORTS DE VEILLE CONCURRENTIELLE
+# ============================================
+
+REPORTS_TABLE = 'competitive_reports'
+REPORT_ADS_TABLE = 'competitive_report_ads'
+
+def load_reports():
+    """En-têtes des rapports de veille (sans publicités), du plus récent au plus ancien"""
+    try:
+        supabase = get_supabase()
+        response = _execute(supabase.table(REPORTS_TABLE).select('report').order('id', desc=True), 'load_reports')
+        return [row['report'] for row in response.data]
+    except Exception as e:
+        _report_error(f"Erreur load_reports: {e}")
+        return []
+
+def save_report_header(header):
+    """Crée ou remplace l'en-tête d'un rapport (clé : header['id'])"""
+    try:
+        supabase = get_supabase()
+        _execute(supabase.table(REPORTS_TABLE).upsert(
+            {'id': header['id'], 'date': header.get('date'), 'report': header},
+            on_conflict='id',
+            returning=ReturnMethod.minimal
+        ), 'save_report_header')
+        return True
+    except Exception as e:
+        _report_error(f"Erreur save_report_header: {e}")
+        return False
+
+def append_report_ads(report_id, ads, batch_size=ADS_BATCH_SIZE):
+    """Ajoute des publicités à un rapport (déjà présentes : ignorées)"""
+    rows = {}
+    for ad in ads:
+        if ad.get('ad_id'):
+            rows[str(ad['ad_id'])] = {'report_id': report_id, 'ad_id': str(ad['ad_id']), 'data': ad}
+    rows = list(rows.values())
+    try:
+        supabase = get_supabase()
+        for start in range(0, len(rows), batch_size):
+            _execute(supabase.table(REPORT_ADS_TABLE).upsert(
+                rows[start:start + batch_size],
+                on_conflict='report_id,ad_id',
+                ignore_duplicates=True,
+                returning=ReturnMethod.minimal
+            ), 'append_report_ads')
+        return True
+    except Exception as e:
+        _report_error(f"Erreur append_report_ads: {e}")
+        return False
+
+def load_report_ads(report_id):
+    """Publicités d'un rapport, dans l'ordre d'enregistrement"""
+    try:
+        supabase = get_supabase()
+        ads = [row['data'] for row in _load_ad_rows(
+            lambda: supabase.table(REPORT_ADS_TABLE).select('data').eq('report_id', report_id).order('position')
+        )]
+        if ads:
+            return ads
+        # Rapport enregistré avant la migration 007 (publicités dans l'en-tête)
+        response = _execute(
+            supabase.table(REPORTS_TABLE).select('report').eq('id', report_id).limit(1), 'load_report_ads'
+        )
+        return (response.data[0]['report'].get('results') or []) if response.data else []
+    except Exception as e:
+        _report_error(f"Erreur load_report_ads: {e}")
+        return []
+
+TASKS_TABLE = 'competitive_tasks'
+
+def load_report_tasks(report_id):
+    """Tâches d'une veille (une par concurrent), dans l'ordre de la whitelist"""
+    try:
+        supabase = get_supabase()
+        response = _execute(
+            supabase.table(TASKS_TABLE).select('*').eq('report_id', report_id).order('position'),
+            'load_report_tasks'
+        )
+        return response.data
+    except Exception as e:
+        _report_error(f"Erreur load_report_tasks: {e}")
+        return []
+
+def save_report_tasks(tasks):
+    """Crée ou met à jour des tâches (clé : report_id + competitor_id)"""
+    if not tasks:
+        return True
+    try:
+        supabase = get_supabase()
+        _execute(supabase.table(TASKS_TABLE).upsert(
+            list(tasks),
+            on_conflict='report_id,competitor_id',
+            returning=ReturnMethod.minimal
+        ), 'save_report_tasks')
+        return True
+    except Exception as e:
+        _report_error(f"Erreur save_report_tasks: {e}")
         return False
+
+# ============================================
+# REPÈRES DE LA VEILLE (cf. watermarks.py)
+# ============================================
+
+def load_watermarks():
+    """Repères de la veille par page_id"""
+    try:
+        supabase = get_supabase()
+        response = _execute(supabase.table('competitor_watermarks').select('*'), 'load_watermarks')
+        return {row['page_id']: row for row in response.data}
     except Exception as e:
-        st.error(f"Erreur update_history_incrementally: {e}")
+        _report_error(f"Erreur load_watermarks: {e}")
+        return {}
+
+def save_watermark(watermark):
+    """Crée ou remplace le repère d'un concurrent"""
+    try:
+        supabase = get_supabase()
+        _execute(supabase.table('competitor_watermarks').upsert(
+            {
+                'page_id': watermark['page_id'],
+                'latest_start_date': watermark['latest_start_date'],
+                'ads': watermark['ads'],
+                'updated_at': watermark['updated_at']
+            },
+            on_conflict='page_id',
+            returning=ReturnMethod.minimal
+        ), 'save_watermark')
+        return True
+    except Exception as e:
+        _report_error(f"Erreur save_watermark: {e}")
         return False
 
 # ============================================
@@ -178,7 +900,14 @@ def load_config():
             "max_ads": 500,
             "max_time": 30,
             "auto_scrape_enabled": False,
-            "auto_scrape_time": "08:00"
+            "auto_scrape_time": "08:00",
+            "capture_mode": "dom",
+            "cursor_pagination": True,
+            "resource_policy": "media",
+            "max_concurrency": 2,
+            "global_min_interval": 2,
+            "storage_backend": "supabase",
+            "sqlite_path": "scraper.db"
         }
 
 def save_config(config):
@@ -186,4 +915,23 @@ def save_config(config):
     import json
     CONFIG_FILE = "config.json"
     with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-        json.dump(config, f, indent=2)
\ No newline at end of file
+        json.dump(config, f, indent=2)
+
+if __name__ == "__main__":
+    import sys
+    
+    if len(sys.argv) > 1 and sys.argv[1] == "migrate":
+        count = migrate_history_results()
+        print(f"Migration terminée : {count} entrée(s) migrée(s)")
+    elif len(sys.argv) > 1 and sys.argv[1] == "rebuild-catalog":
+        count = rebuild_catalog()
+        print(f"Catalogue reconstruit : {count} publicité(s) unique(s)")
+    elif len(sys.argv) > 1 and sys.argv[1] == "health":
+        health = check_supabase_health()
+        if health['ok']:
+            print(f"✅ Supabase joignable ({health['latency_ms']:.0f} ms)")
+        else:
+            print(f"❌ Supabase injoignable : {health['error']}")
+            sys.exit(1)
+    else:
+        print("USAGE: python supabase_db.py migrate|rebuild-catalog|health")
@@ -0,0 +1,80 @@
+"""
+Décodage hors ligne des réponses de la Ads Library (ads_network.py)
+
+Les fixtures de tests/fixtures/ sont écrites à la main, au format des
+réponses de la Ads Library (GraphQL en streaming, page HTML initiale),
+avec des IDs, noms et URLs fictifs.
+"""
+
+import json
+import re
+from pathlib import Path
+
+from ads_extractor import AD_FIELDS, EXTRACTOR_LIBRARY_JS
+from ads_network import NetworkAdCapture
+from exports import EXPORT_COLUMNS
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+
+def ingest_fixture(name):
+    capture = NetworkAdCapture(country='FR', search_term='exemple')
+    ads = capture.ingest((FIXTURES / name).read_text(encoding='utf-8'), is_html=name.endswith('.html'))
+    return ads, capture
+
+
+def test_dom_and_export_schemas_agree():
+    # parseCard construit la publicité à partir de la liste AD_FIELDS injectée dans le script
+    assert f"const AD_FIELDS = {json.dumps(list(AD_FIELDS))};" in EXTRACTOR_LIBRARY_JS
+    assert EXPORT_COLUMNS == list(AD_FIELDS)
+
+
+def test_graphql_page_decodes_to_ad_schema():
+    ads, capture = ingest_fixture("graphql_search_page.txt")
+
+    # Documents concaténés (streaming) : la publicité répétée n'est gardée qu'une fois
+    assert [ad['ad_id'] for ad in ads] == ['900000000000001', '900000000000002', '900000000000003']
+    for ad in ads:
+        assert list(ad) == list(AD_FIELDS)
+        assert all(isinstance(value, str) for value in ad.values())
+        assert ad['country'] == 'FR'
+        assert ad['search_term'] == 'exemple'
+        assert ad['ad_library_url'] == f"https://www.facebook.com/ads/library/?id={ad['ad_id']}"
+        assert re.fullmatch(r'\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d\.\d{3}Z', ad['scraped_at'])
+
+    assert capture.page_info == {'end_cursor': 'AQHRfixture_cursor_1', 'has_next_page': True}
+
+
+def test_graphql_page_field_values():
+    ads, _ = ingest_fixture("graphql_search_page.txt")
+    image_ad, video_ad, carousel_ad = ads
+
+    assert image_ad['platforms'] == "Facebook, Instagram, Audience Network, Messenger"
+    assert image_ad['start_date'] == "12 mars 2025"
+    assert image_ad['advertiser'] == "Boutique Exemple"
+    assert image_ad['page_id'] == "100000000000001"
+    assert image_ad['ad_status'] == 'Active'
+    assert image_ad['media_type'] == 'image'
+    assert image_ad['media_url'] == "https://scontent.example/v/t39/creative_1.jpg"
+    assert image_ad['cta_text'] == "Acheter"
+    assert image_ad['cta_url'] == "https://example.com/collection"
+
+    assert video_ad['platforms'] == "Instagram"
+    assert video_ad['media_type'] == 'video'
+    assert video_ad['media_url'] == "https://video.example/v/t42/clip_2_hd.mp4"
+    assert video_ad['text'] == "Le café du matin, torréfié près de chez vous."
+
+    # Carrousel sans corps : texte, média et CTA de la première carte
+    assert carousel_ad['ad_status'] == 'Inactive'
+    assert carousel_ad['platforms'] == "Facebook, Threads"
+    assert carousel_ad['text'] == "Carrousel : trois modèles, trois couleurs, un seul prix."
+    assert carousel_ad['media_url'] == "https://scontent.example/v/t39/card_3_1.jpg"
+    assert carousel_ad['cta_text'] == "Commander"
+
+
+def test_initial_html_page_decodes_embedded_results():
+    ads, capture = ingest_fixture("search_page_initial.html")
+
+    assert [ad['ad_id'] for ad in ads] == ['900000000000001', '900000000000002']
+    assert all(list(ad) == list(AD_FIELDS) for ad in ads)
+    assert capture.page_info['has_next_page'] is True
@@ -0,0 +1,87 @@
+"""
+Expressions cron (cron.py) : syntaxe des champs et calcul des occurrences
+"""
+
+from datetime import datetime
+
+import pytest
+
+from cron import CronSchedule, daily_at
+
+
+def occurrences(expression, start, count):
+    schedule = CronSchedule(expression)
+    moments = []
+    for _ in range(count):
+        start = schedule.next_after(start)
+        moments.append(start)
+    return moments
+
+
+def test_fields_ranges_steps_lists():
+    schedule = CronSchedule("0-10/5 8,12,18 * * *")
+    assert schedule.minutes == {0, 5, 10}
+    assert schedule.hours == {8, 12, 18}
+
+    assert CronSchedule("*/15 * * * *").minutes == {0, 15, 30, 45}
+    # Valeur suivie d'un pas : jusqu'au maximum du champ
+    assert CronSchedule("5/20 * * * *").minutes == {5, 25, 45}
+    assert CronSchedule("0 0 1-31/10 * *").days == {1, 11, 21, 31}
+
+
+def test_weekday_seven_is_sunday():
+    # datetime.weekday() : lundi = 0, dimanche = 6
+    assert CronSchedule("0 0 * * 0").weekdays == {6}
+    assert CronSchedule("0 0 * * 7").weekdays == {6}
+    assert CronSchedule("0 0 * * 1-5").weekdays == {0, 1, 2, 3, 4}
+
+
+@pytest.mark.parametrize("expression", [
+    "* * * *", "60 * * * *", "* 24 * * *", "* * 0 * *", "* * * 13 *",
+    "* * * * 8", "*/0 * * * *", "5-1 * * * *", "a * * * *", "1-b * * * *",
+])
+def test_invalid_expressions(expression):
+    with pytest.raises(ValueError):
+        CronSchedule(expression)
+
+
+def test_next_after_is_strictly_after():
+    schedule = CronSchedule("30 8 * * *")
+    assert schedule.next_after(datetime(2025, 3, 10, 8, 29, 59)) == datetime(2025, 3, 10, 8, 30)
+    assert schedule.next_after(datetime(2025, 3, 10, 8, 30)) == datetime(2025, 3, 11, 8, 30)
+
+
+def test_weekdays_only():
+    # 14 mars 2025 : vendredi
+    assert occurrences("0 9 * * 1-5", datetime(2025, 3, 14, 10, 0), 2) == [
+        datetime(2025, 3, 17, 9, 0), datetime(2025, 3, 18, 9, 0)
+    ]
+
+
+def test_day_of_month_or_day_of_week():
+    # Jour du mois ET jour de la semaine restreints : l'un OU l'autre (le 1er, ou chaque lundi)
+    schedule = CronSchedule("0 6 1 * 1")
+    assert schedule.matches(datetime(2025, 3, 1, 6, 0))    # samedi 1er
+    assert schedule.matches(datetime(2025, 3, 3, 6, 0))    # lundi
+    assert not schedule.matches(datetime(2025, 3, 4, 6, 0))
+    assert occurrences("0 6 1 * 1", datetime(2025, 2, 25), 3) == [
+        datetime(2025, 3, 1, 6, 0), datetime(2025, 3, 3, 6, 0), datetime(2025, 3, 10, 6, 0)
+    ]
+
+    # Un seul des deux restreint : il doit correspondre
+    assert occurrences("0 6 15 * *", datetime(2025, 3, 1), 1) == [datetime(2025, 3, 15, 6, 0)]
+
+
+def test_month_and_year_rollover():
+    assert occurrences("0 0 29 2 *", datetime(2025, 1, 1), 1) == [datetime(2028, 2, 29, 0, 0)]
+    assert occurrences("59 23 31 12 *", datetime(2025, 12, 31, 23, 59), 1) == [datetime(2026, 12, 31, 23, 59)]
+
+
+def test_expression_without_occurrence():
+    with pytest.raises(ValueError):
+        CronSchedule("0 0 31 2 *").next_after(datetime(2025, 1, 1))
+
+
+def test_daily_at():
+    assert daily_at("08:30") == "30 8 * * *"
+    assert daily_at("00:05") == "5 0 * * *"
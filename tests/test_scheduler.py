@@ -0,0 +1,194 @@
+"""
+Planificateur (scheduler.py) avec une horloge injectée : rattrapage,
+décalage aléatoire, concurrence et reprise des jobs après redémarrage
+
+Aucun processus n'est lancé : Scheduler.spawn est remplacé par un faux job.
+"""
+
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime
+
+from scheduler import DATE_FORMAT, Scheduler
+
+
+class FakeProcess:
+    def __init__(self, pid):
+        self.pid = pid
+        self.returncode = None
+
+    def poll(self):
+        return self.returncode
+
+
+class FixedJitter:
+    """Décalage aléatoire toujours égal au maximum"""
+
+    def uniform(self, low, high):
+        return high
+
+
+class RecordingScheduler(Scheduler):
+    def __init__(self, *args, pid=1000, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pid = pid
+        self.spawned = []
+
+    def spawn(self, job):
+        process = FakeProcess(self.pid + len(self.spawned))
+        self.spawned.append((job['id'], process))
+        return process
+
+
+def make_scheduler(tmp_path, searches, jitter=0, max_concurrent=1, catchup_hours=12, state=None, **kwargs):
+    config = {
+        'saved_searches': [
+            {'id': search_id, 'name': search_id, 'cron': cron} for search_id, cron in searches.items()
+        ],
+        'scheduler_jitter': jitter,
+        'scheduler_max_concurrent': max_concurrent,
+        'scheduler_catchup_hours': catchup_hours,
+    }
+    (tmp_path / "config.json").write_text(json.dumps(config), encoding='utf-8')
+    if state is not None:
+        (tmp_path / "state.json").write_text(json.dumps(state), encoding='utf-8')
+    return RecordingScheduler(
+        config_file=str(tmp_path / "config.json"),
+        state_file=str(tmp_path / "state.json"),
+        status_file=str(tmp_path / "status.json"),
+        rng=FixedJitter(),
+        **kwargs
+    )
+
+
+def scheduled_state(**last_scheduled):
+    return {
+        f"search:{search_id}": {'cron': cron, 'last_scheduled': moment.strftime(DATE_FORMAT)}
+        for search_id, (cron, moment) in last_scheduled.items()
+    }
+
+
+def saved_state(tmp_path):
+    return json.loads((tmp_path / "state.json").read_text(encoding='utf-8'))
+
+
+def test_new_job_waits_for_next_occurrence_then_jitter(tmp_path):
+    scheduler = make_scheduler(tmp_path, {'a': "0 8 * * *"}, jitter=120)
+
+    # Nouveau job : pas de rattrapage de l'occurrence du jour déjà passée
+    scheduler.tick(datetime(2025, 3, 10, 7, 0))
+    assert not scheduler.queued and not scheduler.spawned
+
+    scheduler.tick(datetime(2025, 3, 10, 8, 0, 10))
+    assert scheduler.queued['search:a']['run_at'] == datetime(2025, 3, 10, 8, 2, 10)
+
+    scheduler.tick(datetime(2025, 3, 10, 8, 1, 0))
+    assert not scheduler.spawned
+
+    scheduler.tick(datetime(2025, 3, 10, 8, 2, 10))
+    assert [job_id for job_id, _ in scheduler.spawned] == ['search:a']
+    assert saved_state(tmp_path)['search:a']['last_scheduled'] == "2025-03-10 08:00:00"
+
+
+def test_missed_occurrences_run_once(tmp_path):
+    scheduler = make_scheduler(
+        tmp_path, {'a': "0 * * * *"},
+        state=scheduled_state(a=("0 * * * *", datetime(2025, 3, 10, 5, 0)))
+    )
+
+    scheduler.tick(datetime(2025, 3, 10, 9, 30))
+
+    assert [job_id for job_id, _ in scheduler.spawned] == ['search:a']
+    assert saved_state(tmp_path)['search:a']['last_scheduled'] == "2025-03-10 09:00:00"
+
+    scheduler.tick(datetime(2025, 3, 10, 9, 31))
+    assert len(scheduler.spawned) == 1
+
+
+def test_occurrence_outside_catchup_window_is_skipped(tmp_path):
+    scheduler = make_scheduler(
+        tmp_path, {'a': "0 8 * * *"}, catchup_hours=12,
+        state=scheduled_state(a=("0 8 * * *", datetime(2025, 3, 9, 8, 0)))
+    )
+
+    scheduler.tick(datetime(2025, 3, 10, 21, 0))
+
+    assert not scheduler.spawned
+    state = saved_state(tmp_path)['search:a']
+    assert state['last_scheduled'] == "2025-03-10 08:00:00"
+    assert state['last_status'].startswith("manqué")
+
+
+def test_queued_occurrence_survives_restart(tmp_path):
+    state = scheduled_state(a=("0 8 * * *", datetime(2025, 3, 9, 8, 0)))
+    scheduler = make_scheduler(tmp_path, {'a': "0 8 * * *"}, jitter=300, state=state)
+
+    scheduler.tick(datetime(2025, 3, 10, 8, 0, 5))
+    assert 'search:a' in scheduler.queued
+    # Pas encore lancé : l'occurrence n'est pas consommée
+    assert saved_state(tmp_path)['search:a']['last_scheduled'] == "2025-03-09 08:00:00"
+
+    # Planificateur arrêté pendant le décalage, puis relancé
+    restarted = make_scheduler(tmp_path, {'a': "0 8 * * *"}, jitter=0)
+    restarted.tick(datetime(2025, 3, 10, 8, 3))
+
+    assert [job_id for job_id, _ in restarted.spawned] == ['search:a']
+    assert saved_state(tmp_path)['search:a']['last_scheduled'] == "2025-03-10 08:00:00"
+
+
+def test_max_concurrent_and_no_overlap(tmp_path):
+    searches = {'a': "0 8 * * *", 'b': "0 8 * * *"}
+    state = scheduled_state(a=("0 8 * * *", datetime(2025, 3, 9, 8, 0)), b=("0 8 * * *", datetime(2025, 3, 9, 8, 0)))
+    scheduler = make_scheduler(tmp_path, searches, max_concurrent=1, state=state)
+
+    scheduler.tick(datetime(2025, 3, 10, 8, 0))
+    assert len(scheduler.spawned) == 1
+    assert len(scheduler.queued) == 1
+
+    scheduler.tick(datetime(2025, 3, 10, 8, 1))
+    assert len(scheduler.spawned) == 1
+
+    first_id, first_process = scheduler.spawned[0]
+    first_process.returncode = 0
+    scheduler.tick(datetime(2025, 3, 10, 8, 2))
+    assert len(scheduler.spawned) == 2
+    assert saved_state(tmp_path)[first_id]['last_status'] == 'success'
+
+    # Occurrence suivante alors que le second job tourne encore : ignorée
+    second_id, _ = scheduler.spawned[1]
+    scheduler.tick(datetime(2025, 3, 11, 8, 0))
+    assert saved_state(tmp_path)[second_id]['last_status'].startswith("ignoré")
+    assert [job_id for job_id, _ in scheduler.spawned].count(second_id) == 1
+
+
+def test_running_job_is_recovered_after_restart(tmp_path):
+    state = scheduled_state(a=("0 * * * *", datetime(2025, 3, 10, 7, 0)))
+    # PID du processus de test : toujours vivant
+    scheduler = make_scheduler(tmp_path, {'a': "0 * * * *"}, state=state, pid=os.getpid())
+    scheduler.tick(datetime(2025, 3, 10, 8, 0))
+    assert saved_state(tmp_path)['search:a']['running']['pid'] == os.getpid()
+
+    restarted = make_scheduler(tmp_path, {'a': "0 * * * *"})
+    assert restarted.running['search:a']['pid'] == os.getpid()
+
+    # Le job repris tourne toujours : pas de second lancement
+    restarted.tick(datetime(2025, 3, 10, 9, 0))
+    assert not restarted.spawned
+    assert saved_state(tmp_path)['search:a']['last_status'].startswith("ignoré")
+
+
+def test_dead_job_is_marked_interrupted_after_restart(tmp_path):
+    finished = subprocess.Popen([sys.executable, "-c", "pass"])
+    finished.wait()
+    state = scheduled_state(a=("0 8 * * *", datetime(2025, 3, 10, 8, 0)))
+    state['search:a']['running'] = {'pid': finished.pid, 'started': "2025-03-10 08:00:00"}
+
+    scheduler = make_scheduler(tmp_path, {'a': "0 8 * * *"}, state=state)
+    scheduler.tick(datetime(2025, 3, 10, 8, 30))
+
+    assert not scheduler.running
+    state = saved_state(tmp_path)['search:a']
+    assert 'running' not in state
+    assert state['last_status'].startswith("interrompu")
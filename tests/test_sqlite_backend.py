@@ -0,0 +1,175 @@
+"""
+Stockage SQLite (storage.SQLiteBackend) sur une base jetable
+
+Listes de pages, historique et publicités, découpage des anciens rapports,
+catalogue et index plein texte (FTS5).
+"""
+
+import pytest
+
+from storage import SQLiteBackend
+
+
+@pytest.fixture
+def db(tmp_path):
+    return SQLiteBackend(str(tmp_path / "scraper.db"))
+
+
+def make_page(id_page, nom_page="Page"):
+    return {'id_page': id_page, 'nom_page': nom_page, 'date_ajout': '2025-03-10', 'date_creation': None,
+            'id_permanent': None}
+
+
+def make_ad(ad_id, **fields):
+    ad = {'ad_id': ad_id, 'page_id': '123', 'advertiser': "Annonceur", 'country': 'FR', 'media_type': 'image',
+          'text': "Texte de la publicité", 'cta_text': 'N/A', 'search_term': 'exemple',
+          'scraped_at': '2025-03-10T08:00:00.000Z'}
+    ad.update(fields)
+    return ad
+
+
+def search_ids(db, search, **kwargs):
+    ads, total = db.search_ads(search, **kwargs)
+    assert total == len(ads)
+    return sorted(ad['ad_id'] for ad in ads)
+
+
+def test_add_and_remove_pages_are_idempotent(db):
+    added = db.add_pages('blacklist', [make_page('1'), make_page('2')])
+    assert [page['id_page'] for page in added] == ['1', '2']
+
+    # Page déjà présente : ignorée, seule la nouvelle est retournée
+    added = db.add_pages('blacklist', [make_page('2', "Autre nom"), make_page('3')])
+    assert [page['id_page'] for page in added] == ['3']
+    assert db.add_pages('blacklist', [make_page('1')]) == []
+
+    assert db.remove_pages('blacklist', ['2', '2'])
+    assert db.remove_pages('blacklist', ['2', 'inconnue'])
+    pages = db.load_pages('blacklist')
+    assert [page['id_page'] for page in pages] == ['1', '3']
+    assert pages[0]['nom_page'] == "Page"
+    assert db.load_pages('whitelist') == []
+
+    with pytest.raises(ValueError):
+        db.load_pages('autre')
+
+
+def test_history_entry_then_ads(db):
+    entry_id = db.add_to_history({'search_term': 'exemple'}, 0, [], status='in_progress')
+    assert db.load_history_summaries()[0]['status'] == 'in_progress'
+
+    db.store_entry_ads(entry_id, [make_ad('1'), make_ad('2')])
+    # Point de sauvegarde renvoyé (écriture différée) : pas de doublon
+    db.store_entry_ads(entry_id, [make_ad('2', advertiser="Nouveau nom"), make_ad('3')])
+    db.add_to_history({'search_term': 'exemple'}, 3, [], status='success', entry_id=entry_id)
+
+    entry = db.load_history_summaries()[0]
+    assert (entry['id'], entry['status'], entry['results_count']) == (entry_id, 'success', 3)
+    assert entry['query'] == {'search_term': 'exemple'}
+    assert [ad['ad_id'] for ad in db.load_entry_ads(entry_id)] == ['1', '2', '3']
+    assert db.load_entry_ads(entry_id)[1]['advertiser'] == "Nouveau nom"
+
+    page, total = db.load_entry_ads_page(entry_id, offset=1, limit=1)
+    assert [ad['ad_id'] for ad in page] == ['2']
+    assert total == 3
+
+    # Deux entrées créées dans la même seconde : identifiants distincts
+    assert db.add_to_history({}, 0, []) != db.add_to_history({}, 0, [])
+
+
+def test_legacy_reports_are_split_on_connect(tmp_path):
+    path = str(tmp_path / "scraper.db")
+    legacy = SQLiteBackend(path)
+    # Rapport d'une version précédente : publicités dans l'en-tête
+    legacy.save_report_header({
+        'id': '20250310_080000', 'date': '2025-03-10 08:00:00', 'results_count': 2,
+        'results': [make_ad('1'), make_ad('2')]
+    })
+
+    db = SQLiteBackend(path)
+    reports = db.load_reports()
+    assert len(reports) == 1
+    assert 'results' not in reports[0]
+    assert reports[0]['results_count'] == 2
+    assert [ad['ad_id'] for ad in db.load_report_ads('20250310_080000')] == ['1', '2']
+
+    # Découpage relancé à chaque connexion : sans effet la seconde fois
+    again = SQLiteBackend(path)
+    assert [ad['ad_id'] for ad in again.load_report_ads('20250310_080000')] == ['1', '2']
+
+
+def test_catalog_merges_ad_seen_from_two_countries(db):
+    first = db.add_to_history({}, 0, [])
+    second = db.add_to_history({}, 0, [])
+    db.store_entry_ads(first, [make_ad('7', country='FR', cta_text='N/A')])
+    db.store_entry_ads(second, [make_ad('7', country='BE', cta_text="Acheter", media_type='',
+                                        scraped_at='2025-03-11T08:00:00.000Z')])
+
+    catalog = db.load_catalog()
+    assert len(catalog) == 1
+    ad = catalog[0]
+    # Champs déjà renseignés conservés, champs vides complétés, scraping le plus récent
+    assert ad['country'] == 'FR'
+    assert ad['media_type'] == 'image'
+    assert ad['cta_text'] == "Acheter"
+    assert ad['scraped_at'] == '2025-03-11T08:00:00.000Z'
+    assert db.catalog_stats()['ads'] == 1
+    assert db.catalog_stats()['raw'] == 2
+
+    assert db.load_catalog(countries=['FR'])[0]['ad_id'] == '7'
+    assert db.load_catalog(countries=['BE']) == []
+    assert db.rebuild_catalog() == 1
+
+
+def test_fts_folds_accents(db):
+    entry_id = db.add_to_history({}, 0, [])
+    db.store_entry_ads(entry_id, [
+        make_ad('1', text="Découvrez notre publicité"),
+        make_ad('2', text="Café torréfié", advertiser="Brûlerie"),
+        make_ad('3', text="Sans rapport"),
+    ])
+
+    assert search_ids(db, "publicite", entry_id=entry_id) == ['1']
+    assert search_ids(db, "PUBLICITÉ", entry_id=entry_id) == ['1']
+    assert search_ids(db, "cafe torrefie") == ['2']
+    assert search_ids(db, "brulerie") == ['2']
+    assert db.find_entries_with_ads("publicite") == {entry_id}
+
+
+def test_fts_prefix_queries(db):
+    entry_id = db.add_to_history({}, 0, [])
+    db.store_entry_ads(entry_id, [
+        make_ad('1', text="Chaussures de running"),
+        make_ad('2', text="Chaussettes en laine"),
+        make_ad('3', text="Chapeau"),
+    ])
+
+    assert search_ids(db, "chauss", entry_id=entry_id) == ['1', '2']
+    assert search_ids(db, "chaussu", entry_id=entry_id) == ['1']
+    # Tous les mots doivent correspondre (ET), chacun en préfixe
+    assert search_ids(db, "chauss lai", entry_id=entry_id) == ['2']
+    assert search_ids(db, "hauss", entry_id=entry_id) == []
+    # Saisie sans mot : pas de recherche
+    assert db.search_ads("  ' - ", entry_id=entry_id) == ([], 0)
+
+
+def test_fts_triggers_follow_update_and_delete(db):
+    entry_id = db.add_to_history({}, 0, [])
+    db.store_entry_ads(entry_id, [make_ad('1', text="Ancienne accroche")])
+    assert search_ids(db, "ancienne", entry_id=entry_id) == ['1']
+
+    # Mise à jour (upsert) : l'index suit le nouveau texte
+    db.store_entry_ads(entry_id, [make_ad('1', text="Nouvelle accroche")])
+    assert search_ids(db, "ancienne", entry_id=entry_id) == []
+    assert search_ids(db, "nouvelle", entry_id=entry_id) == ['1']
+
+    # Suppression : publicité retirée de l'index
+    conn = db._conn()
+    with conn:
+        conn.execute("delete from scraping_ads where entry_id = ?", (entry_id,))
+    assert search_ids(db, "nouvelle", entry_id=entry_id) == []
+    assert conn.execute("select count(*) from scraping_ads_fts").fetchone()[0] == 0
+
+    with conn:
+        conn.execute("delete from ad_catalog")
+    assert search_ids(db, "accroche") == []
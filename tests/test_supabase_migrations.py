@@ -0,0 +1,154 @@
+"""
+Migrations SQL et écritures de supabase_db sur une base Postgres locale
+
+Ignoré sauf si une base JETABLE est configurée (ses tables sont supprimées
+puis recréées) :
+    DATABASE_URL=postgresql://...   migrations appliquées directement
+    SUPABASE_URL / SUPABASE_KEY     PostgREST servant la même base
+                                    (Supabase local ou postgrest seul)
+
+    DATABASE_URL=... SUPABASE_URL=... SUPABASE_KEY=... python -m pytest tests
+"""
+
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+if not (os.environ.get("DATABASE_URL") and os.environ.get("SUPABASE_URL") and os.environ.get("SUPABASE_KEY")):
+    pytest.skip("DATABASE_URL / SUPABASE_URL / SUPABASE_KEY non définis", allow_module_level=True)
+
+psycopg = pytest.importorskip("psycopg")
+supabase_db = pytest.importorskip("supabase_db")
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+
+# Tables créées dans Supabase avant la première migration
+BASE_SCHEMA = """
+create table scraping_history (
+    id            text primary key,
+    date          text,
+    query         jsonb,
+    results       jsonb default '[]'::jsonb,
+    results_count integer default 0,
+    status        text,
+    error_message text,
+    created_at    timestamptz not null default now()
+);
+create table blacklist (
+    id            bigint generated always as identity primary key,
+    id_page       text,
+    nom_page      text,
+    date_ajout    text,
+    date_creation text,
+    id_permanent  text
+);
+create table whitelist (like blacklist including all);
+"""
+
+APP_TABLES = [
+    'competitive_tasks', 'competitive_report_ads', 'competitive_reports', 'competitor_watermarks',
+    'ad_catalog', 'scraping_ads', 'scraping_history', 'blacklist', 'whitelist'
+]
+
+
+def apply_migrations(conn):
+    for path in sorted(MIGRATIONS_DIR.glob("*.sql")):
+        conn.execute(path.read_text(encoding="utf-8"))
+
+
+def wait_for_schema_reload(conn, timeout=15):
+    """PostgREST relit le schéma de façon asynchrone après NOTIFY"""
+    conn.execute("notify pgrst, 'reload schema'")
+    supabase_db.reset_supabase()
+    deadline = time.time() + timeout
+    while True:
+        try:
+            supabase_db.get_supabase().table('scraping_ads').select('ad_id').limit(1).execute()
+            return
+        except Exception:
+            if time.time() > deadline:
+                raise
+            time.sleep(0.5)
+
+
+@pytest.fixture(scope="module")
+def conn():
+    with psycopg.connect(os.environ["DATABASE_URL"], autocommit=True) as connection:
+        for table in APP_TABLES:
+            connection.execute(f"drop table if exists {table} cascade")
+        connection.execute(BASE_SCHEMA)
+        apply_migrations(connection)
+        wait_for_schema_reload(connection)
+        yield connection
+
+
+def add_entry(conn, entry_id, results=()):
+    conn.execute(
+        "insert into scraping_history (id, date, query, results, status) values (%s, '2025-01-01 00:00:00', '{}', %s, 'success')",
+        (entry_id, psycopg.types.json.Jsonb(list(results)))
+    )
+
+
+def make_ad(ad_id, advertiser="Annonceur"):
+    return {'ad_id': ad_id, 'page_id': '123', 'advertiser': advertiser, 'country': 'FR',
+            'media_type': 'image', 'text': "Texte de la publicité", 'platforms': 'Facebook, Instagram'}
+
+
+def test_migrations_are_idempotent(conn):
+    add_entry(conn, 'migrations_twice')
+    assert supabase_db.save_ads_batch('migrations_twice', [make_ad('1')])
+
+    apply_migrations(conn)
+
+    row = conn.execute("select count(*) from scraping_ads where entry_id = 'migrations_twice'").fetchone()
+    assert row[0] == 1
+
+
+def test_upsert_same_ad_twice(conn):
+    add_entry(conn, 'upsert_twice')
+
+    assert supabase_db.save_ads_batch('upsert_twice', [make_ad('42', "Avant")])
+    assert supabase_db.save_ads_batch('upsert_twice', [make_ad('42', "Après"), make_ad('43')])
+
+    assert supabase_db.count_entry_ads('upsert_twice') == 2
+    rows = conn.execute(
+        "select ad_id, advertiser, data->>'advertiser' from scraping_ads where entry_id = 'upsert_twice' order by ad_id"
+    ).fetchall()
+    assert rows == [('42', "Après", "Après"), ('43', "Annonceur", "Annonceur")]
+
+
+def test_migrate_history_results_twice(conn):
+    # Entrée au format d'avant la migration 001 (publicités dans la colonne JSON)
+    add_entry(conn, 'legacy_entry', [make_ad('7'), make_ad('8'), make_ad('7')])
+
+    assert supabase_db.migrate_history_results() == 1
+    assert supabase_db.migrate_history_results() == 0
+
+    assert supabase_db.count_entry_ads('legacy_entry') == 2
+    results, results_count = conn.execute(
+        "select results, results_count from scraping_history where id = 'legacy_entry'"
+    ).fetchone()
+    assert results == []
+    assert results_count == 2
+
+
+def test_merge_ad_catalog_twice(conn):
+    # Même publicité vue depuis deux pays : la seconde version complète la première
+    first = dict(make_ad('77'), cta_text='N/A', scraped_at='2025-03-01T08:00:00.000Z')
+    second = dict(make_ad('77'), country='BE', cta_text="Acheter", media_type='',
+                  scraped_at='2025-03-02T08:00:00.000Z')
+
+    supabase_db._merge_into_catalog([first])
+    supabase_db._merge_into_catalog([second])
+    # Relancé (écriture différée renvoyée) : résultat identique
+    supabase_db._merge_into_catalog([second])
+
+    country, media_type, scraped_at, data = conn.execute(
+        "select country, media_type, scraped_at, data from ad_catalog where ad_id = '77'"
+    ).fetchone()
+    assert (country, media_type, scraped_at) == ('FR', 'image', '2025-03-02T08:00:00.000Z')
+    assert data['cta_text'] == "Acheter"
+    assert data['country'] == 'FR'
+    assert conn.execute("select count(*) from ad_catalog where ad_id = '77'").fetchone()[0] == 1
@@ -7,8 +7,11 @@ En cas d'échec, demande une connexion manuelle avec confirmation
 import sys
 import json
 import asyncio
+import argparse
 from datetime import datetime
-from playwright.async_api import async_playwright
+from browser_pool import BrowserPool
+from resource_policy import ResourceBlocker, resolve_policy, RESOURCE_POLICIES
+import storage
 from pathlib import Path
 import io
 
@@ -18,7 +21,6 @@ if sys.platform == "win32":
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
 # Fichiers de configuration
-WHITELIST_FILE = "whitelist.json"
 STATUS_FILE = "fb_update_status.json"
 DEBUG_HTML_FILE = "debug_page_content.html"
 COOKIES_FILE = "fb_cookies.json"
@@ -71,26 +73,18 @@ def parse_date_french(date_str):
     return date_str
 
 def load_whitelist():
-    """Charge la whitelist"""
-    log(f"Loading whitelist from {WHITELIST_FILE}")
-    if Path(WHITELIST_FILE).exists():
-        try:
-            with open(WHITELIST_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                log(f"Loaded {len(data)} items from whitelist")
-                return data
-        except Exception as e:
-            log(f"Error loading whitelist: {e}", "ERROR")
-            return []
-    log(f"Whitelist file not found")
-    return []
+    """Charge la whitelist (stockage configuré, cf. storage.py)"""
+    data = storage.load_whitelist()
+    log(f"Loaded {len(data)} items from whitelist")
+    return data
 
-def save_whitelist(data):
-    """Sauvegarde la whitelist"""
-    log(f"Saving {len(data)} items to whitelist")
-    with open(WHITELIST_FILE, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-    log(f"Whitelist saved successfully")
+def save_page(item):
+    """Enregistre les champs récupérés d'une page de la whitelist (une seule ligne mise à jour)"""
+    storage.update_page('whitelist', item['id_page'], {
+        'id_permanent': item.get('id_permanent'),
+        'nom_page': item.get('nom_page'),
+        'date_creation': item.get('date_creation')
+    })
 
 def get_missing_ids():
     """Retourne la liste des pages sans id_permanent"""
@@ -477,7 +471,7 @@ async def scrape_permanent_id(id_page, page, context):
         log(traceback.format_exc(), "ERROR")
         return None, str(e)
 
-async def update_missing_permanent_ids():
+async def update_missing_permanent_ids(resource_policy=None):
     """
     Fonction principale : récupère les ID permanents manquants
     Utilise les cookies sauvegardés ou demande une connexion manuelle
@@ -504,23 +498,22 @@ async def update_missing_permanent_ids():
     update_status("running", 0, total, "", f"Démarrage du navigateur...", [])
     
     try:
-        async with async_playwright() as p:
-            # Lancer le navigateur en mode VISIBLE
-            browser = await p.chromium.launch(
-                headless=False,
-                args=[
-                    '--disable-blink-features=AutomationControlled',
-                    '--start-maximized'
-                ]
-            )
+        # Navigateur en mode VISIBLE (fermé en sortie de bloc)
+        pool = BrowserPool(
+            size=1,
+            launch_args=[
+                '--disable-blink-features=AutomationControlled',
+                '--start-maximized'
+            ]
+        )
+        async with pool, pool.context(
+            headless=False,
+            viewport={'width': 1280, 'height': 720},
+            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            locale='fr-FR'
+        ) as context:
             log("Browser launched in VISIBLE mode")
             
-            context = await browser.new_context(
-                viewport={'width': 1280, 'height': 720},
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                locale='fr-FR'
-            )
-            
             # Charger les cookies sauvegardés
             saved_cookies = load_cookies()
             if saved_cookies:
@@ -560,7 +553,6 @@ async def update_missing_permanent_ids():
                 if not confirmed:
                     log("User cancelled login", "WARNING")
                     update_status("error", 0, 0, "", "Connexion annulée par l'utilisateur", [])
-                    await browser.close()
                     return
                 
                 # Vérifier à nouveau la connexion
@@ -582,7 +574,6 @@ async def update_missing_permanent_ids():
                     confirmed = await wait_for_manual_confirmation(page)
                     
                     if not confirmed:
-                        await browser.close()
                         return
                     
                     # Revérifier
@@ -592,7 +583,6 @@ async def update_missing_permanent_ids():
                     if not is_logged_in:
                         log("❌ Login failed after retry", "ERROR")
                         update_status("error", 0, 0, "", "Impossible de se connecter", [])
-                        await browser.close()
                         return
                 
                 # Sauvegarder les cookies
@@ -602,6 +592,11 @@ async def update_missing_permanent_ids():
             
             log("✅ Successfully logged in!")
             update_status("running", 0, total, "", "Connexion réussie - Démarrage du traitement...", [])
+            
+            # Blocage des ressources seulement après la connexion
+            # (la page de login peut afficher un captcha image)
+            blocker = ResourceBlocker(resolve_policy(override=resource_policy))
+            await blocker.install(context)
             await asyncio.sleep(2)
             
             # Maintenant on peut traiter toutes les pages
@@ -631,6 +626,8 @@ async def update_missing_permanent_ids():
                             if result.get('pageCreationDate'):
                                 item['date_creation'] = parse_date_french(result['pageCreationDate'])
                             
+                            # Sauvegarder la page mise à jour
+                            save_page(item)
                             log(f"[SUCCESS] Updated {nom_page} with permanent ID: {result['permanentId']}")
                             success_count += 1
                             
@@ -651,9 +648,6 @@ async def update_missing_permanent_ids():
                         'error': error
                     })
                 
-                # Sauvegarder après chaque mise à jour
-                save_whitelist(whitelist)
-                
                 # Pause entre chaque page
                 if i < total:
                     log("Waiting 3 seconds before next page...")
@@ -661,6 +655,7 @@ async def update_missing_permanent_ids():
             
             log(f"\n=== UPDATE COMPLETED: {success_count}/{total} pages updated ===")
             update_status("completed", total, total, "", f"{success_count}/{total} page(s) mise(s) à jour", processed)
+            log(blocker.summary())
             
             # Sauvegarder les cookies à la fin
             log("💾 Saving cookies for future use...")
@@ -669,7 +664,6 @@ async def update_missing_permanent_ids():
             
             # Laisser le navigateur ouvert 5 secondes pour voir le résultat
             await asyncio.sleep(5)
-            await browser.close()
             
     except Exception as e:
         log(f"FATAL ERROR: {e}", "ERROR")
@@ -680,8 +674,12 @@ async def update_missing_permanent_ids():
 
 async def main():
     """Point d'entrée"""
+    parser = argparse.ArgumentParser(description='Récupère les ID permanents manquants dans la whitelist')
+    parser.add_argument('--resource-policy', choices=list(RESOURCE_POLICIES), help='Ressources bloquées (défaut: config.json)')
+    args = parser.parse_args()
+    
     try:
-        await update_missing_permanent_ids()
+        await update_missing_permanent_ids(args.resource_policy)
     except Exception as e:
         log(f"FATAL ERROR: {e}", "ERROR")
         import traceback
@@ -0,0 +1,124 @@
+"""
+watermarks.py
+Repères de la veille concurrentielle (publicités déjà connues par concurrent)
+
+Pour chaque concurrent (page_id), le repère garde les ad_id collectés lors
+des veilles précédentes avec leur date de début, ainsi que la date de
+début la plus récente vue. Il sert à :
+- arrêter le scroll dès qu'une série de publicités déjà connues défile
+  (le fil de la Ads Library montre les plus récentes d'abord)
+- marquer chaque publicité du rapport comme nouvelle ('new') ou déjà
+  vue ('seen')
+
+Le repère est limité aux WATERMARK_MAX_IDS publicités les plus récentes
+(par date de début) : les plus anciennes ne réapparaissent pas en haut du
+fil.
+"""
+
+import re
+from datetime import datetime
+
+from ads_network import MOIS_FR
+from page_matcher import fold_text
+
+WATERMARK_MAX_IDS = 1000
+KNOWN_RUN_STOP = 10  # publicités connues d'affilée avant l'arrêt du scroll
+
+# Mois sans accents : français (affichage fr-FR) et anglais
+_MONTHS = [(fold_text(name), index) for index, name in enumerate(MOIS_FR, start=1)] + [
+    (name, index) for index, name in enumerate(
+        ['january', 'february', 'march', 'april', 'may', 'june', 'july',
+         'august', 'september', 'october', 'november', 'december'], start=1)
+]
+_DAY_MONTH_YEAR = re.compile(r'(\d{1,2})\s+([a-z]+)\.?,?\s+(\d{4})')
+_MONTH_DAY_YEAR = re.compile(r'([a-z]+)\.?\s+(\d{1,2}),?\s+(\d{4})')
+
+
+def _month(word):
+    """Numéro du mois, nom complet ou abrégé ('févr', 'sept', 'Mar')"""
+    if len(word) < 3:
+        return None
+    found = {index for name, index in _MONTHS if name.startswith(word)}
+    return found.pop() if len(found) == 1 else None
+
+
+def parse_start_date(text):
+    """'12 mars 2025' ou 'Mar 12, 2025' -> '2025-03-12' (None si illisible)"""
+    folded = fold_text(str(text or ''))
+    match = _DAY_MONTH_YEAR.search(folded)
+    if match:
+        day, month, year = match.group(1), match.group(2), match.group(3)
+    else:
+        match = _MONTH_DAY_YEAR.search(folded)
+        if not match:
+            return None
+        month, day, year = match.group(1), match.group(2), match.group(3)
+    month = _month(month)
+    if month is None:
+        return None
+    try:
+        return datetime(int(year), month, int(day)).strftime('%Y-%m-%d')
+    except ValueError:
+        return None
+
+
+def empty_watermark(page_id):
+    return {'page_id': str(page_id), 'latest_start_date': None, 'ads': {}, 'updated_at': None}
+
+
+def is_known(ad, watermark):
+    """La publicité a-t-elle déjà été collectée pour ce concurrent ?"""
+    return bool(watermark) and str(ad.get('ad_id')) in watermark['ads']
+
+
+def tag_ads(ads, watermark):
+    """Ajoute scan_tag = 'new' / 'seen' à chaque publicité ; retourne le nombre de nouvelles"""
+    new_count = 0
+    for ad in ads:
+        known = is_known(ad, watermark)
+        ad['scan_tag'] = 'seen' if known else 'new'
+        new_count += not known
+    return new_count
+
+
+def update_watermark(watermark, ads, max_ids=WATERMARK_MAX_IDS):
+    """Repère complété par les publicités d'une veille (nouveau dict)"""
+    known = dict(watermark['ads'])
+    for ad in ads:
+        ad_id = ad.get('ad_id')
+        if ad_id and ad_id != 'N/A':
+            known[str(ad_id)] = parse_start_date(ad.get('start_date')) or known.get(str(ad_id))
+
+    # Les plus récentes d'abord ; sans date lisible : conservées en dernier
+    if len(known) > max_ids:
+        ordered = sorted(known.items(), key=lambda item: item[1] or '', reverse=True)
+        known = dict(ordered[:max_ids])
+
+    dates = [date for date in known.values() if date]
+    return {
+        'page_id': watermark['page_id'],
+        'latest_start_date': max(dates) if dates else None,
+        'ads': known,
+        'updated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
+class KnownRun:
+    """Compte les publicités connues d'affilée, dans l'ordre du fil"""
+
+    def __init__(self, watermark, stop_after=KNOWN_RUN_STOP):
+        self.watermark = watermark
+        # Premier passage (repère vide) : pas d'arrêt anticipé
+        self.stop_after = stop_after if watermark and watermark['ads'] else None
+        self.run = 0
+        self.known = 0
+
+    def add(self, ads):
+        """Prend en compte de nouvelles publicités ; True si le scroll peut s'arrêter"""
+        for ad in ads:
+            if is_known(ad, self.watermark):
+                self.run += 1
+                self.known += 1
+            else:
+                self.run = 0
+        return self.stop_after is not None and self.run >= self.stop_after
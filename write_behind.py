@@ -0,0 +1,306 @@
+"""
+write_behind.py
+File d'écriture différée des publicités scrapées
+
+La boucle de scroll ne doit pas attendre la base distante : chaque
+sauvegarde automatique est d'abord écrite dans un spool local (JSONL,
+fsync à chaque ajout), puis une tâche de fond envoie les lots à la base
+(dans un thread, hors de la boucle asyncio) et réessaie en cas d'échec.
+
+- Un lot envoyé est marqué comme tel dans le spool (ligne {"ack": id})
+- Les lots pas encore envoyés (base indisponible, arrêt brutal) sont
+  renvoyés au démarrage suivant d'une file, uniquement s'ils sont orphelins :
+  chaque lot porte l'identifiant de sa file (PID compris), et les lots
+  d'une file encore active (autre session, autre processus) ne sont pas repris
+- Un lot refusé MAX_FLUSH_ATTEMPTS fois de suite est laissé dans le spool
+  (renvoyé au prochain démarrage) pour ne pas bloquer les lots suivants
+- Le spool est compacté quand tous ses lots ont été envoyés
+
+USAGE:
+    writer = WriteBehindQueue(store_entry_ads)
+    async with writer:
+        writer.enqueue(entry_id, ads)   # retour immédiat
+    # sortie du bloc : envoi des lots restants (ou conservation dans le spool)
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import uuid
+
+from process_utils import pid_alive
+
+logger = logging.getLogger(__name__)
+
+SPOOL_FILE = os.path.join("spool", "pending_ads.jsonl")
+FLUSH_BATCH_SIZE = 500  # publicités max par envoi
+RETRY_DELAYS = (1, 2, 5, 10, 30, 60)  # secondes entre deux tentatives
+MAX_FLUSH_ATTEMPTS = len(RETRY_DELAYS) + 1  # tentatives par lot avant de passer au suivant
+DRAIN_TIMEOUT = 30  # secondes accordées à l'envoi des lots restants en fin de job
+
+
+class AdSpool:
+    """Journal local en ajout seul : un lot par ligne, puis son accusé d'envoi"""
+
+    def __init__(self, path=SPOOL_FILE):
+        self.path = path
+        # Plusieurs files (sessions Streamlit) peuvent partager le même fichier
+        self._lock = threading.Lock()
+        # Files actives de ce processus, et lots orphelins repris par l'une d'elles
+        self._owners = set()
+        self._claims = {}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._terminate_last_line()
+
+    def _terminate_last_line(self):
+        # Arrêt brutal pendant une écriture : la ligne tronquée est isolée
+        # pour que les lignes suivantes restent lisibles
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            with open(self.path, 'rb+') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+
+    def _append_line(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def register(self, owner):
+        """Déclare une file active : ses lots ne sont pas repris par les autres"""
+        with self._lock:
+            self._owners.add(owner)
+
+    def unregister(self, owner):
+        """File arrêtée : ses lots non envoyés (et ceux qu'elle avait repris) redeviennent orphelins"""
+        with self._lock:
+            self._owners.discard(owner)
+            self._claims = {record_id: claimant for record_id, claimant in self._claims.items() if claimant != owner}
+
+    def _is_orphan(self, record):
+        owner = self._claims.get(record['id'], record.get('owner'))
+        if not owner:
+            # Lot écrit avant l'ajout du propriétaire
+            return True
+        pid = int(owner.split(':', 1)[0])
+        if pid == os.getpid():
+            return owner not in self._owners
+        return not pid_alive(pid)
+
+    def append(self, entry_id, ads, owner=None):
+        """Écrit un lot sur disque ; retourne son identifiant"""
+        record_id = uuid.uuid4().hex
+        self._append_line({'id': record_id, 'owner': owner, 'entry_id': entry_id, 'ads': ads})
+        return record_id
+
+    def ack(self, record_ids):
+        """Marque des lots comme envoyés"""
+        for record_id in record_ids:
+            self._append_line({'ack': record_id})
+
+    def _read(self):
+        records, acked = {}, set()
+        if not os.path.exists(self.path):
+            return records, acked
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    item = json.loads(line)
+                except ValueError:
+                    # Dernière ligne tronquée par un arrêt brutal
+                    continue
+                if 'ack' in item:
+                    acked.add(item['ack'])
+                else:
+                    records[item['id']] = item
+        return records, acked
+
+    def pending(self):
+        """Lots écrits mais pas encore envoyés, dans l'ordre d'écriture"""
+        with self._lock:
+            records, acked = self._read()
+        return [record for record_id, record in records.items() if record_id not in acked]
+
+    def claim_orphans(self, owner):
+        """Lots en attente dont la file n'est plus active, réservés pour la file owner"""
+        with self._lock:
+            records, acked = self._read()
+            orphans = [
+                record for record_id, record in records.items()
+                if record_id not in acked and self._is_orphan(record)
+            ]
+            for record in orphans:
+                self._claims[record['id']] = owner
+        return orphans
+
+    def compact(self):
+        """Réécrit le spool avec les seuls lots en attente (fichier supprimé s'il n'y en a plus)"""
+        with self._lock:
+            records, acked = self._read()
+            pending = [record for record_id, record in records.items() if record_id not in acked]
+            if not pending:
+                if os.path.exists(self.path):
+                    os.remove(self.path)
+                return
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for record in pending:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+
+
+_spools = {}
+_spools_lock = threading.Lock()
+
+
+def get_spool(path=SPOOL_FILE):
+    """Spool partagé par toutes les files du processus pour un même fichier"""
+    with _spools_lock:
+        if path not in _spools:
+            _spools[path] = AdSpool(path)
+        return _spools[path]
+
+
+class WriteBehindQueue:
+    """
+    File d'écriture différée (API asyncio)
+
+    flush_fn(entry_id, ads) est appelée dans un thread ; elle doit lever une
+    exception en cas d'échec (le lot reste alors dans le spool et sera renvoyé).
+    """
+
+    def __init__(self, flush_fn, spool=None, batch_size=FLUSH_BATCH_SIZE, drain_timeout=DRAIN_TIMEOUT,
+                 max_attempts=MAX_FLUSH_ATTEMPTS):
+        self.flush_fn = flush_fn
+        self.spool = spool or get_spool()
+        self.batch_size = batch_size
+        self.drain_timeout = drain_timeout
+        self.max_attempts = max_attempts
+        self._queue = None
+        self._task = None
+        # PID en tête : un autre processus sait si la file est toujours active
+        self.owner = f"{os.getpid()}:{uuid.uuid4().hex}"
+        self.enqueued = 0
+        self.replayed = 0
+        self.flushed_batches = 0
+        self.flushed_ads = 0
+        self.failed_attempts = 0
+        self.abandoned_batches = 0
+
+    async def start(self):
+        """Démarre la tâche d'envoi et reprend les lots orphelins du spool"""
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self.spool.register(self.owner)
+            for record in self.spool.claim_orphans(self.owner):
+                self._queue.put_nowait(record)
+                self.replayed += 1
+            if self.replayed:
+                logger.info(f"💾 {self.replayed} lot(s) du spool à renvoyer")
+            self._task = asyncio.create_task(self._run())
+        return self
+
+    def enqueue(self, entry_id, ads):
+        """Écrit les publicités dans le spool et les confie à la tâche d'envoi (sans attendre la base)"""
+        if not ads:
+            return
+        ads = list(ads)
+        record_id = self.spool.append(entry_id, ads, owner=self.owner)
+        self._queue.put_nowait({'id': record_id, 'entry_id': entry_id, 'ads': ads})
+        self.enqueued += 1
+
+    def _next_batch(self, first):
+        """Regroupe les lots en attente d'une même entrée (jusqu'à batch_size publicités)"""
+        batch = [first]
+        size = len(first['ads'])
+        skipped = []
+        while not self._queue.empty() and size < self.batch_size:
+            record = self._queue.get_nowait()
+            if record['entry_id'] == first['entry_id'] and size + len(record['ads']) <= self.batch_size:
+                batch.append(record)
+                size += len(record['ads'])
+            else:
+                skipped.append(record)
+        for record in skipped:
+            # Remis en file : put_nowait compte une tâche de plus, déjà comptée au premier ajout
+            self._queue.put_nowait(record)
+            self._queue.task_done()
+        return batch
+
+    async def _run(self):
+        while True:
+            first = await self._queue.get()
+            batch = self._next_batch(first)
+            ads = [ad for record in batch for ad in record['ads']]
+            sent = False
+            for attempt in range(self.max_attempts):
+                try:
+                    await asyncio.to_thread(self.flush_fn, first['entry_id'], ads)
+                    sent = True
+                    break
+                except Exception as e:
+                    self.failed_attempts += 1
+                    if attempt + 1 == self.max_attempts:
+                        logger.error(
+                            f"Envoi de {len(ads)} publicités abandonné après {self.max_attempts} tentatives ({e}) :"
+                            f" lot conservé dans {self.spool.path}"
+                        )
+                        break
+                    delay = RETRY_DELAYS[min(attempt, len(RETRY_DELAYS) - 1)]
+                    logger.warning(f"Envoi de {len(ads)} publicités échoué ({e}), nouvel essai dans {delay}s")
+                    await asyncio.sleep(delay)
+            if sent:
+                self.spool.ack([record['id'] for record in batch])
+                self.flushed_batches += 1
+                self.flushed_ads += len(ads)
+            else:
+                # Pas d'accusé : le lot reste dans le spool et sera renvoyé au prochain démarrage
+                self.abandoned_batches += 1
+            for _ in batch:
+                self._queue.task_done()
+
+    async def close(self):
+        """
+        Envoie les lots restants (au plus drain_timeout secondes) puis arrête la tâche
+
+        Les lots toujours en attente restent dans le spool pour le prochain démarrage.
+        """
+        if self._task is None:
+            return
+        drained = True
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=self.drain_timeout)
+        except asyncio.TimeoutError:
+            drained = False
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self.spool.unregister(self.owner)
+        self.spool.compact()
+        if not drained or self.abandoned_batches:
+            logger.warning(f"💾 {len(self.spool.pending())} lot(s) en attente conservés dans {self.spool.path}")
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def summary(self):
+        return (
+            f"Écriture différée : {self.flushed_ads} publicités envoyées en {self.flushed_batches} lot(s)"
+            f" ({self.failed_attempts} échec(s) réessayé(s), {self.abandoned_batches} lot(s) laissé(s) dans le spool,"
+            f" {self.replayed} lot(s) repris du spool)"
+        )